@@ -1,10 +1,72 @@
 # Complete BigShorts chatbot using local LLM with all original tools and functionality
-from llama_cpp import Llama
 import yaml
+import hashlib
+import json
 from typing import Dict, List, Union
 import random
 import re
 import os
+import asyncio
+import contextvars
+import time
+import logging
+from types import SimpleNamespace
+
+from structured_log import configure_logging, get_logger
+from singleflight import SingleFlight, flight_key
+from image_manifest import load_manifest, annotate_guides
+from llm_backends import LLMBackend, LLM_BACKEND, create_backend
+
+logger = get_logger("chatbot")
+
+# Record of how the current query was answered. A context variable rather
+# than a thread-local: worker threads each keep their own value, and so does
+# every asyncio task running aprocess_query on the event loop.
+_current_query: contextvars.ContextVar[SimpleNamespace] = contextvars.ContextVar("query_state")
+
+class _QueryState:
+    """Attribute access to the current thread's or task's query record"""
+
+    def __getattr__(self, name):
+        record = _current_query.get(None)
+        if record is None:
+            raise AttributeError(name)
+        return getattr(record, name)
+
+    def __setattr__(self, name, value):
+        record = _current_query.get(None)
+        if record is None:
+            record = SimpleNamespace()
+            _current_query.set(record)
+        setattr(record, name, value)
+
+_query_state = _QueryState()
+
+def reset_query_state():
+    """Clear the current thread's (or task's) query record before running process_query"""
+    _current_query.set(SimpleNamespace(lane="deterministic", path="unknown", generation=None, coalesced=False))
+
+def get_query_state() -> dict:
+    """Return how the current thread's (or task's) last query was answered
+
+    lane is 'llm' if the query reached the model, else 'deterministic'; path names
+    the branch of process_query that produced the answer; generation holds the
+    LLM token counts and stage timings (None if the model was not called or
+    the answer was shared from an identical in-flight generation, in which
+    case coalesced is True).
+    """
+    return {
+        "lane": getattr(_query_state, "lane", "deterministic"),
+        "path": getattr(_query_state, "path", "unknown"),
+        "generation": getattr(_query_state, "generation", None),
+        "coalesced": getattr(_query_state, "coalesced", False)
+    }
+
+# How long a request waits on an identical in-flight generation before giving up
+SHARED_GENERATION_TIMEOUT = 120
+
+# Returned by BigShortsChatbot._route_query when no rule-based handler applies
+_NEEDS_LLM = object()
 
 # Define strict allowed parameters
 ALLOWED_CONTENT_TYPES = [
@@ -596,1178 +658,1192 @@ def generate_interactive_video_ideas() -> str:
     selected_idea = random.choice(ideas)
     return f"Here's an interactive idea for your Snip: {selected_idea}"
 
-def content_creation_guide(content_type: str) -> dict:
-    """Provides detailed guidance about different types of content creation on BigShorts
-    Args:
-        content_type: The type of content user wants to create (e.g., 'SHOT', 'SNIP', 'ssup', 'collab')
-    Returns:
-        dict: Contains steps, tips, and image paths for visual guidance
-    """
-    # Standardize input to match allowed content types
-    std_content_type = content_type.lower()
-
-    # Special handling for editing queries
-    if "edit" in std_content_type or "editing" in std_content_type:
-        # Try to match exact editing content types first
-        for allowed_type in ALLOWED_CONTENT_TYPES:
-            if allowed_type.lower() == std_content_type:
-                std_content_type = allowed_type
-                break
-            
-        # If no exact match, try to extract the content being edited
-        if std_content_type not in [ct.lower() for ct in ALLOWED_CONTENT_TYPES]:
-            for mapping_key, mapping_value in CONTENT_TYPE_MAPPING.items():
-                if mapping_key.lower() in std_content_type and "edit" in mapping_key.lower():
-                    std_content_type = mapping_value.lower()
-                    break
-    else:
-        # Regular content type handling
-        for mapping_key, mapping_value in CONTENT_TYPE_MAPPING.items():
-            if mapping_key.lower() in std_content_type:
-                std_content_type = mapping_value.lower()
-                break
-    
-    # Only allow predefined content types
-    if std_content_type.lower() not in [ct.lower() for ct in ALLOWED_CONTENT_TYPES]:
-        return {
-            "type": "content_guide",
-            "content": {
-                "title": "Content Type Not Found",
-                "steps": [],
+# Step-by-step creation guides served by content_creation_guide and /api/guide.
+# Treat as immutable at runtime: CATALOG_VERSION (and the ETags derived from it)
+# is computed from this data once at import.
+CONTENT_GUIDES = {
+    "shot": {
+        "title": "Creating a BigShorts SHOT",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Open the BigShorts app and tap the Creation Button",
+                "image_path": "Shot/Group_1449.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Choose 'SHOT' from the Creation Wheel",
+                "image_path": "Shot/Group_1450.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Capture a SHOT or upload an existing photo from your Device",
+                "image_path": "Shot/Group_1451.webp",
+                "tips": "SHOT can include multiple Pictures"
+                
+            },
+            {
+                "step": 4,
+                "description": "Edit your SHOT using BigShorts tools",
+                "image_path": "Shot/Group_1452.webp",
+                "tips": "Try our AI-powered filters and effects"
+            },
+            {
+                "step": 5,
+                "description": "Add captions, hashtags, and description Or Collab with your Friends and post",
+                "image_path": "Shot/Group_1453.webp",
+                "tips": "Use trending hashtags for better reach"
             }
-        }
-
-    guides_case_insensitive = {}
-    
-    guides = {
-        "shot": {
-            "title": "Creating a BigShorts SHOT",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Open the BigShorts app and tap the Creation Button",
-                    "image_path": "Shot/Group_1449.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Choose 'SHOT' from the Creation Wheel",
-                    "image_path": "Shot/Group_1450.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Capture a SHOT or upload an existing photo from your Device",
-                    "image_path": "Shot/Group_1451.webp",
-                    "tips": "SHOT can include multiple Pictures"
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "Edit your SHOT using BigShorts tools",
-                    "image_path": "Shot/Group_1452.webp",
-                    "tips": "Try our AI-powered filters and effects"
-                },
-                {
-                    "step": 5,
-                    "description": "Add captions, hashtags, and description Or Collab with your Friends and post",
-                    "image_path": "Shot/Group_1453.webp",
-                    "tips": "Use trending hashtags for better reach"
-                }
-            ],
-        },
-        "ssup": {
-            "title": "Creating a BigShorts SSUP",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Open the BigShorts app and tap the Your SSUP Button",
-                    "image_path": "Shot/Group_1439.webp",
-                   
-                },
-                {
-                    "step": 2,
-                    "description": "Capture a video/image or upload an existing one from your Device",
-                    "image_path": "Shot/Group_1523.webp",
-                   
-                },
-                {
-                    "step": 3,
-                    "description": "Edit your SSUP using BigShorts tools and tap done",
-                    "image_path": "Shot/Group_1442.webp",
-                    "tips": "Try our AI-powered filters and effects"
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "Select your desired Duration, choose who can see your SSUP and Share",
-                    "image_path": "Shot/Group_1443.webp",
-                    "tips": "Choose who can see your SSUP"
-                    
-                }
-            ],
-        },
-        "snip": {
-            "title": "Creating a BigShorts SNIP",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Open the BigShorts app and tap the Creation Button",
-                    "image_path": "Shot/Group_1444.webp",
-                    "tips": "Ensure stable internet connection"
-                },
-                {
-                    "step": 2,
-                    "description": "Choose 'SNIP' from the Creation Wheel",
-                    "image_path": "Shot/Group_1445.webp",
-                },
-                {
-                    "step": 3,
-                    "description": "Capture video or choose a video and click next",
-                    "image_path": "Shot/Group_1523.webp",
-                },
-                {
-                    "step": 4,
-                    "description": "Edit your SNIP using BigShorts tools and tap done",
-                    "image_path": "Shot/Group_1447.webp",
-                },
-                {
-                    "step": 5,
-                    "description": "Add captions, hashtags, and description Or Collab with your Friends",
-                    "image_path": "Shot/Group_1448.webp",
-                    "tips": "Use trending hashtags for better reach"
-                }
-            ],
-        },
-        "collab": {
-            "title": "Creating Collaborative Content",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "While posting, Tap Collaborate with your friends to add mentions in the end.",
-                    "image_path": "Shot/Group_1454.webp",
-                    "tips": "Available for creators with 1000+ followers"
-                },
-                {
-                    "step": 2,
-                    "description": "Search for a user by typing their name in the Search Mention bar, then select them from the list.",
-                    "image_path": "Shot/Group_1455.webp",
-                    "tips": "Can add up to 4 collaborators"
-                },
-                {
-                    "step": 3,
-                    "description": "Once done, you can either save as a draft or post it!",
-                    "image_path": "Shot/Group_1456.webp",
-                    "tips": "Clearly define each creator's role"
-                },
-                {
-                    "step": 4,
-                    "description": "On another account, To approve a collaboration, tap the Notifications button at the top.",
-                    "image_path": "Shot/Group_1457.webp",
-                    "tips": "Clearly define each creator's role"
-                },
-                {
-                    "step": 5,
-                    "description": "Find the Requested to Collaborate notification, then tap Accept — and you're done! 🎉",
-                    "image_path": "Shot/Group_1458.webp",
-                    "tips": "Clearly define each creator's role"
-                }
-            ],
-        },
-        "Editing a shot": {
-            "title": "Editing a BigShorts SHOT",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Apply desired filter and adjust brightness, apart from many effects lets explore image in image.",
-                    "image_path": "Shot/Group_1475.webp",
-                    "tips": "Try our AI-powered filters and effects"
-                },{
-                    "step": 2,
-                    "description": "Choose filter of choice and select image",
-                    "image_path": "Shot/Group_1476.webp",
-                    
-                },{
-                    "step": 3,
-                    "description": "Choose the image you want, then tap on done to proceed",
-                    "image_path": "Shot/Group_1477.webp",
-                    
-                },{
-                    "step": 4,
-                    "description": "Edit the image as needed, then tap on tick mark to proceed",
-                    "image_path": "Shot/Group_1478.webp",
-                    
-                },{
-                    "step": 5,
-                    "description": "Place the image in image on screen as desired and tap done",
-                    "image_path": "Shot/Group_1479.webp",
-                    
-                },{
-                    "step": 7,
-                    "description": "Add captions, hashtags, and description Or Collab with your Friends and post",
-                    "image_path": "Shot/Group_1481.webp",
-                }
-            ]
-        },
-        "Invite friends": {
-            "title": "Inviting friends",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "In the Me section, tap Add Friends from the top bar (highlighted in red).",
-                    "image_path": "Shot/Group_1533.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Invite your family and friends easily!",
-                    "image_path": "Shot/Group_1534.webp",
-                    
-                }
-            ]
-        },
-        "Feedback": {
-            "title": "Feedback",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Tap in the Me section and Tap the 3 lines menu at the top right corner to open settings",
-                    "image_path": "Shot/Group_1539.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Select Feedback (highlighted in red).",
-                    "image_path": "Shot/Group_1540.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Fill in your necessary details",
-                    "image_path": "Shot/Group_1541.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "After filling you feedback/suggestions tap on Submit",
-                    "image_path": "Shot/Group_1542.webp",
-                    
-                }
-            ]
-        },
-        "Multiple accounts": {
-            "title": "Multiple accounts",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "In Me section, you can switch or add multiple accounts by long-pressing the Me button or on top left click on your username",
-                    "image_path": "Shot/Group_1530.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Select the account by tapping the radio button or add account.",
-                    "image_path": "Shot/Group_1531.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Heres your changed account Me section",
-                    "image_path": "Shot/Group_1532.webp",
- 
-                }
-            ]
-        },
-        "Account overview": {
-            "title": "Account overview",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "In Me section, Tap the Account Overview button at the top (highlighted in red).",
-                    "image_path": "Shot/Group_1505.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "View and filter stats for different time periods by tapping the Filter button (highlighted in red).",
-                    "image_path": "Shot/Group_1506.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Scroll to see more metrics and you can also change period for which you want a overview",
-                    "image_path": "Shot/Group_1507.webp",
-                    
-                }
-            ]
-        },
-        "Store Draft": {
-            "title": "Storing draft",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Click on Save to Draft at the last stage before posting",
-                    "image_path": "Shot/Group_1550.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "To view or post the content later, navigate to Me section (highlighted in yellow) and tap on the Draft icon (highlighted in red).",
-                    "image_path": "Shot/Group_1551.webp",
-                    
-                }
-            ]
-        },
-        "Change Password": {
-            "title": "Changing password",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "In Me section, Tap the Hamburger menu at the top (highlighted in red) to open settings.",
-                    "image_path": "Shot/Group_1502.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Select Change Password (highlighted in red).",
-                    "image_path": "Shot/Group_1503.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Enter your current password and new password, then confirm the change.",
-                    "image_path": "Shot/Group_1504.webp",
-                    
-                }
-            ]
-        },
-        "Notification": {
-            "title": "Viewing notifications",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "On the Home page, tap on the Notification Bell icon at the top.",
-                    "image_path": "Shot/Group_1555.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Check out all your notifications here.",
-                    "image_path": "Shot/Group_1556.webp",
-                    
-                }
-            ]
-        },
-        "Change theme": {
-            "title": "Changing theme",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "In Me section, Tap the Hamburger menu at the top to open settings.",
-                    "image_path": "Shot/Group_1535.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Select App Theme Preference (highlighted in red).",
-                    "image_path": "Shot/Group_1536.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Choose a theme by tapping on it, based on your preference.",
-                    "image_path": "Shot/Group_1537.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "Your new Theme has been applied.",
-                    "image_path": "Shot/Group_1538.webp",
-                    
-                }
-            ]
-        },
-        "Report": {
-            "title": "Reporting a user",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "On a post, tap on the three-dots menu.",
-                    "image_path": "Shot/Group_1543.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": " Select Report (highlighted in red).",
-                    "image_path": "Shot/Group_1544.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Choose the category of the reported content and add a comment if required.",
-                    "image_path": "Shot/Group_1545.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "Tap Submit to finalize the report.",
-                    "image_path": "Shot/Group_1546.webp",
-                    
-                }
-            ]
-        },
-        "Moment": {
-            "title": "creating a moment",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "On Me page, Tap the Hamburger menu at the top to open settings.",
-                    "image_path": "Shot/Group_1496.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Select Archives (highlighted in red).",
-                    "image_path": "Shot/Group_1497.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Tap the three-dots menu at the top.",
-                    "image_path": "Shot/Group_1498.webp",
-                },
-                {
-                    "step": 4,
-                    "description": "Select Create a Moment",
-                    "image_path": "Shot/Group_1499.webp",
-                    
-                },
-                {
-                    "step": 5,
-                    "description": "Choose the archive(s) you want to include, add a title (highlighted in red), then tap Confirm at the top (Highlighted in yellow).",
-                    "image_path": "Shot/Group_1500.webp",
-                },
-                {
-                    "step": 6,
-                    "description": "Hooray! 🎉 Your Moment is now visible on your profile!",
-                    "image_path": "Shot/Group_1501.webp",
-                    
-                }
-            ]
-        },
-        "Delete Post": {
-            "title": "Deleting a post",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Open the post you want to delete.",
-                    "image_path": "Shot/Group_1511.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Tap the three-dots menu and select Delete Shot (highlighted in red)",
-                    "image_path": "Shot/Group_1512.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Tap on delete Shot",
-                    "image_path": "Shot/Group_1513.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "Confirm with Yes — and it's deleted!",
-                    "image_path": "Shot/Group_1514.webp",
-                    
-                }
-            ]
-        },
-        "Post insights": {
-            "title": "Post insights",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "On Me section, Tap on the post you want to check insights for.",
-                    "image_path": "Shot/Group_1508.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Click on Insights (highlighted in red).",
-                    "image_path": "Shot/Group_1509.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "View all key metrics related to your post.",
-                    "image_path": "Shot/Group_1510.webp",
-                    
-                }
-            ]
-        },
-        "Saved Posts": {
-            "title": "Saving posts",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "To save a post, tap the bookmark icon below a post (highlighted in yellow), Navigate to Me (highlighted in red)",
-                    "image_path": "Shot/Group_1526.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Tap on the Saved section (highlighted in red).",
-                    "image_path": "Shot/Group_1527.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "View all your saved photos, videos, and music.",
-                    "image_path": "Shot/Group_1528.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "Tap on any folder to check them out.",
-                    "image_path": "Shot/Group_1529.webp",
-                    
-                }
-            ]
-        },
-        "Edit Profile": {
-            "title": "Editing your Profile",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "In Me section, tap Edit Profile.",
-                    "image_path": "Shot/Group_1520.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Update your personal details and profile picture, To change or remove your profile picture, tap the pencil icon on the image.",
-                    "image_path": "Shot/Group_1521.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Choose to take a photo or select one from your gallery or remove photo",
-                    "image_path": "Shot/Group_1522.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "Choose desired photo",
-                    "image_path": "Shot/Group_1523.webp",
-                    
-                },
-                {
-                    "step":5,
-                    "description": "Rotate, Crop and adjust the image, then tap the tick icon at the top (highlighted in red) to save changes.",
-                    "image_path": "Shot/Group_1524.webp",
-                    
-                },
-                {
-                    "step":6,
-                    "description": "Finally, save your profile by clicking on top right save button.",
-                    "image_path": "Shot/Group_1525.webp",
-                    
-                }
-            ]
-        },
-        "Edit Post": {
-            "title": "Editing a post",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Open the post you want to edit.",
-                    "image_path": "Shot/Group_1515.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Tap the three-dot menu.",
-                    "image_path": "Shot/Group_1516.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Select “Edit Shot” (highlighted in red).",
-                    "image_path": "Shot/Group_1517.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "Make the necessary changes like change description, add collab, set who can watch the post, change location",
-                    "image_path": "Shot/Group_1518.webp",
-                    
-                },
-                {
-                    "step": 5,
-                    "description": "Then tap Update Post — done!",
-                    "image_path": "Shot/Group_1519.webp",
-                    
-                }
-            ]
-        },
-        "Block/unblock User": {
-            "title": "Blocking and unblocking users",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "On the selected user’s post, tap the three-dot menu.",
-                    "image_path": "Shot/Group_1482.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Select Block User — and you're done! 🚫",
-                    "image_path": "Shot/Group_1483.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Go to Me from the bottom navigation bar and click on 3 lines on top right.",
-                    "image_path": "Shot/Group_1484.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "Select Blocked Users (highlighted in red).",
-                    "image_path": "Shot/Group_1485.webp",
-                    
-                },
-                {
-                    "step": 5,
-                    "description": "Here, you can view all blocked users or unblock them if needed.",
-                    "image_path": "Shot/Group_1486.webp",
-                    
-                }
-            ]
-        },
-        "Hide/Unhide Users": {
-            "title": "Hiding and unhiding users",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "On the selected user's post, tap the three-dot menu.",
-                    "image_path": "Shot/Group_1491.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Tap Hide Content (highlighted in red), and the user's content is Hidden!.",
-                    "image_path": "Shot/Group_1492.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Go to Me section from the bottom navigation bar, and Tap the Hamburger menu at the top.",
-                    "image_path": "Shot/Group_1493.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "Select Hidden Users.",
-                    "image_path": "Shot/Group_1494.webp",
-                    
-                },
-                {
-                    "step": 5,
-                    "description": "Here, you can view the list of hidden users and unhide them if needed.",
-                    "image_path": "Shot/Group_1495.webp",
-                    
-                }
-            ]
-        },
-        "Messages": {
-            "title": "Messaging a user",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Click on the message icon on the top right corner to send a message ",
-                    "image_path": "Shot/Group_1552.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Choose the person you want to message ",
-                    "image_path": "Shot/Group_1553.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "To attach(image or videos) in your dm click on the attach icon or you can also record audio and send",
-                    "image_path": "Shot/Group_1554.webp",
-                }
-            ]
-        },
-        "Discovery": {
-            "title": "Navigating discovery page",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Click search icon on top bar in the Home Page (Highlighted in red)",
-                    "image_path": "Shot/Group_1488.webp",
-                    
-                },
-                {
-                    "step": 2,
-                    "description": "Here you can discover trending content, to search tap on search icon",
-                    "image_path": "Shot/Group_1489.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "You can search users, hashtag in our search barr",
-                    "image_path": "Shot/Group_1490.webp",
-                    
-                }
-            ]
-        },
-        "Editing a Ssup": {
-            "title": "Editing a BigShorts Ssup",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Click on the edit button, after choosing a content to upload",
-                    "image_path": "Shot/Group_1468.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "You can adjust(Brightness, contrast, saturation, sharpness), retouch, makeup and add effects or text and then click on the Save button",
-                    "image_path": "Shot/Group_1469.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "You can also add various effects (like sticker, filter, location, links, image in images, etc), lets explore music",
-                    "image_path": "Shot/Group_1470.webp",
-                    
-                },{
-                    "step": 4,
-                    "description": "Select the music you want",
-                    "image_path": "Shot/Group_1471.webp",
-                },
-                {
-                    "step": 5,
-                    "description": "Choose the portion of the music and click Apply sound",
-                    "image_path": "Shot/Group_1472.webp",
-                },
-                {
-                    "step": 6,
-                    "description": "After you have applied your desired effects click on done",
-                    "image_path": "Shot/Group_1473.webp",
-                },
-                {
-                    "step": 7,
-                    "description": "Select your desired Duration, choose who can see your SSUP and Share",
-                    "image_path": "Shot/Group_1474.webp",
-                }
-            ]
-        },
-        "Interactive snip": {
-            "title": "Making an Interactive Snip",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "While editing a snip, add button(highlighted in red) to add interactive elements",
-                    "image_path": "Shot/Group_1592.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Edit the button as needed",
-                    "image_path": "Shot/Group_1593.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Click on the interactive tap button (highlighted in red) to add more interactive elements",
-                    "image_path": "Shot/Group_1594.webp",
-                    
-                },{
-                    "step": 4,
-                    "description": "Select a type of interactive element",
-                    "image_path": "Shot/Group_1595.webp",
-                },
-                {
-                    "step": 5,
-                    "description": "Capture a snip or select from gallery",
-                    "image_path": "Shot/Group_1596.webp",
-                    
-                },
-                {
-                    "step": 6,
-                    "description": "Click on timeline, to edit interactive duration",
-                    "image_path": "Shot/Group_1597.webp",
-                    
-                },{
-                    "step": 7,
-                    "description": "You can view and adjust the interactive elements timeline here",
-                    "image_path": "Shot/Group_1598.webp",
-                },
-                {
-                    "step": 8,
-                    "description": "Click on interactive tree hierarchy (highlighted in red)",
-                    "image_path": "Shot/Group_1599.webp",
-                    
-                },
-                {
-                    "step": 9,
-                    "description": "Here you can view hierarchy tree of interactive elements",
-                    "image_path": "Shot/Group_1600.webp",
-                    
-                },
-                {
-                    "step": 10,
-                    "description": "Click on post to publish your interactive video.",
-                    "image_path": "Shot/Group_1601.webp",
-                    
-                }
-            ]
-        },
-        "Mini": {
-            "title": "Creating a Mini",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Open the BigShorts app and tap the Creation Button",
-                    "image_path": "Shot/Group_1557.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Choose 'Mini' from the Creation Wheel",
-                    "image_path": "Shot/Group_1558.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Capture a Mini or upload an existing one from your Device and click next",
-                    "image_path": "Shot/Group_1559.webp",
-                    
-                },{
-                    "step": 4,
-                    "description": "Edit Your Mini using BigShorts tools and tap done",
-                    "image_path": "Shot/Group_1560.webp",
-                    
-                },{
-                    "step": 5,
-                    "description": "Pick a cover image for your Mini, add description, title, allow comment or who can watch the Mini",
-                    "image_path": "Shot/Group_1561.webp",
-                    
-                },{
-                    "step": 6,
-                    "description": "After it, tap on Post and you're done!",
-                    "image_path": "Shot/Group_1584.webp",
-                    
-                }
-            ]
-        },
-        "Mini Series": {
-            "title": "Creating a Mini Series",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "On Me section, Tap on the Create Mini Series",
-                    "image_path": "Shot/Group_1576.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Select a cover image for the Mini Series.",
-                    "image_path": "Shot/Group_1577.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Choose an image from gallery",
-                    "image_path": "Shot/Group_1578.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "Add season title, description and eventually schedule time.",
-                    "image_path": "Shot/Group_1580.webp",
-                    
-                },
-                {
-                    "step": 5,
-                    "description": "And then click on Create Mini Series (highlighted in red)",
-                    "image_path": "Shot/Group_1581.webp",
-                    
-                },
-                {
-                    "step": 6,
-                    "description": "Select desired number of Mini that you want to add to Mini Series",
-                    "image_path": "Shot/Group_1582.webp",
-                    
-                },
-                {
-                    "step": 7,
-                    "description": "And then tap on Add Episodes",
-                    "image_path": "Shot/Group_1583.webp",
-                    
-                },
-                {
-                    "step": 8,
-                    "description": "Viola! your Mini Series is created!",
-                    "image_path": "Shot/Group_1584.webp",
-                    
-                }
-            ]
-        },
-        "Editing a Mini": {
-            "title": "Editing a BigShorts Mini",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Open the BigShorts app and tap the Creation Button",
-                    "image_path": "Shot/Group_1563.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Choose 'Mini' from the Creation Wheel",
-                    "image_path": "Shot/Group_1564.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Capture a Mini or upload an existing one from your Device and click next",
-                    "image_path": "Shot/Group_1565.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "When you chose a video to upload, next you can edit it by Rotate, split, trimming or deleted a splitted clip then tap on tick mark",
-                    "image_path": "Shot/Group_1566.webp",
-                   
-                },
-                {
-                    "step": 5,
-                    "description": "You Can Adjust Brightness Levels and Apply Filters as desired and then tap the Done Icon",
-                    "image_path": "Shot/Group_1567.webp",
-                    
-                },
-                {
-                    "step": 6,
-                    "description": "Tap on Record button",
-                    "image_path": "Shot/Group_1568.webp",
-                    
-                }
-            ]
-        },
-        "Editing a Snip": {
-            "title": "Editing a BigShorts Snip",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "When uploaded a snip, you can cick on edit for video editing",
-                    "image_path": "Shot/Group_1460.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Let's Apply a Filter to the snip, click on Filters",
-                    "image_path": "Shot/Group_1461.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Choose the desired filter and click on tick mark to save",
-                    "image_path": "Shot/Group_1462.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "Click Done when you have finished editing",
-                    "image_path": "Shot/Group_1463.webp",
-                    
-                },{
-                    "step": 5,
-                    "description": "Add Your caption and Click Post to share your Snip",
-                    "image_path": "Shot/Group_1464.webp",
-                    
-                }
-            ]
-        },
-        "Ssup Repost": {
-            "title": "Ssup Repost",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Open your friends chats, who have mentioned you, and tap add to ssup (Shown beside mentioned story)",
-                    "image_path": "Shot/Group_1547.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "You can apply effects and then tap post",
-                    "image_path": "Shot/Group_1548.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Select your desired Duration, choose who can see your SSUP and Share",
-                    "image_path": "Shot/Group_1549.webp",
-                    
-                }
-            ]
-        },
-        "Edit Mini Series": {
-            "title": "Editing a Mini Series",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "In Me section, Tap on the Mini Series icon (highlighted in yellow), and tap on the Mini Series you want to edit (highlighted in red)",
-                    "image_path": "Shot/Group_1585.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Tap on three dots on top right corner",
-                    "image_path": "Shot/Group_1586.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Tap on edit on Mini Series",
-                    "image_path": "Shot/Group_1587.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "Edit the cover image, season title or description and click on Edit Mini Series",
-                    "image_path": "Shot/Group_1588.webp",
-                    
-                },
-                {
-                    "step": 5,
-                    "description": "Select new Mini to be added in series or remove one.",
-                    "image_path": "Shot/Group_1589.webp",
-                    
-                },
-                {
-                    "step": 6,
-                    "description": "Then tap on + Add episodes",
-                    "image_path": "Shot/Group_1590.webp",
-                    
-                },
-                {
-                    "step": 7,
-                    "description": "Your series  is edited!",
-                    "image_path": "Shot/Group_1591.webp",
-                    
-                }
-            ]
-        },
-        "Requested Message": {
-            "title": "Requested Message",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "Open messages screen and tap on Requested (highlighted in red)",
-                    "image_path": "Shot/Group_1602.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Tap on the requesed user chat",
-                    "image_path": "Shot/Group_1603.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Choose to approve or deny the user's chat",
-                    "image_path": "Shot/Group_1604.webp",
-                    
-                },
-                {
-                    "step": 4,
-                    "description": "If accepted, you can chat with them now onwards!",
-                    "image_path": "Shot/Group_1605.webp",
-                    
-                }
-            ]
-        },
-        "Snip to Mini": {
-            "title": "Linking Mini Dramas to Snip",
-            "steps": [
-                {
-                    "step": 1,
-                    "description": "While editing a snip, add button(highlighted in red) to add interactive elements",
-                    "image_path": "Shot/Group_165.webp",
-                    "tips": "Make sure you're on the latest app version for all features"
-                },
-                {
-                    "step": 2,
-                    "description": "Edit the button as needed",
-                    "image_path": "Shot/Group_166.webp",
-                    
-                },
-                {
-                    "step": 3,
-                    "description": "Click on the interactive tap button (highlighted in red) to add  interactive elements",
-                    "image_path": "Shot/Group_167.webp",
-                    
-                },{
-                    "step": 4,
-                    "description": "Select Attach Existing Mini from the options",
-                    "image_path": "Shot/Group_168.webp",
-                },
-                {
-                    "step": 5,
-                    "description": "Select a Mini Drama to link from your uploaded list and tap Link existing Mini button",
-                    "image_path": "Shot/Group_169.webp",
-                    
-                },
-                {
-                    "step": 6,
-                    "description": "Click on interactive tree hierarchy (highlighted in red)",
-                    "image_path": "Shot/Group_170.webp",
-                    
-                },
-                {
-                    "step": 7,
-                    "description": "Here you can view hierarchy tree of interactive elements",
-                    "image_path": "Shot/Group_171.webp",
-                    
-                },
-                {
-                    "step": 8,
-                    "description": "Edit the Snip further if required and Tap Done",
-                    "image_path": "Shot/Group_172.webp",
-                    
-                },
-                {
-                    "step": 9,
-                    "description": "Add a caption, tag friends, and click Post to share your Snip",
-                    "image_path": "Shot/Group_173.webp",  
-                }
-            ]
-        },
-    }
-    
+        ],
+    },
+    "ssup": {
+        "title": "Creating a BigShorts SSUP",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Open the BigShorts app and tap the Your SSUP Button",
+                "image_path": "Shot/Group_1439.webp",
+               
+            },
+            {
+                "step": 2,
+                "description": "Capture a video/image or upload an existing one from your Device",
+                "image_path": "Shot/Group_1523.webp",
+               
+            },
+            {
+                "step": 3,
+                "description": "Edit your SSUP using BigShorts tools and tap done",
+                "image_path": "Shot/Group_1442.webp",
+                "tips": "Try our AI-powered filters and effects"
+                
+            },
+            {
+                "step": 4,
+                "description": "Select your desired Duration, choose who can see your SSUP and Share",
+                "image_path": "Shot/Group_1443.webp",
+                "tips": "Choose who can see your SSUP"
+                
+            }
+        ],
+    },
+    "snip": {
+        "title": "Creating a BigShorts SNIP",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Open the BigShorts app and tap the Creation Button",
+                "image_path": "Shot/Group_1444.webp",
+                "tips": "Ensure stable internet connection"
+            },
+            {
+                "step": 2,
+                "description": "Choose 'SNIP' from the Creation Wheel",
+                "image_path": "Shot/Group_1445.webp",
+            },
+            {
+                "step": 3,
+                "description": "Capture video or choose a video and click next",
+                "image_path": "Shot/Group_1523.webp",
+            },
+            {
+                "step": 4,
+                "description": "Edit your SNIP using BigShorts tools and tap done",
+                "image_path": "Shot/Group_1447.webp",
+            },
+            {
+                "step": 5,
+                "description": "Add captions, hashtags, and description Or Collab with your Friends",
+                "image_path": "Shot/Group_1448.webp",
+                "tips": "Use trending hashtags for better reach"
+            }
+        ],
+    },
+    "collab": {
+        "title": "Creating Collaborative Content",
+        "steps": [
+            {
+                "step": 1,
+                "description": "While posting, Tap Collaborate with your friends to add mentions in the end.",
+                "image_path": "Shot/Group_1454.webp",
+                "tips": "Available for creators with 1000+ followers"
+            },
+            {
+                "step": 2,
+                "description": "Search for a user by typing their name in the Search Mention bar, then select them from the list.",
+                "image_path": "Shot/Group_1455.webp",
+                "tips": "Can add up to 4 collaborators"
+            },
+            {
+                "step": 3,
+                "description": "Once done, you can either save as a draft or post it!",
+                "image_path": "Shot/Group_1456.webp",
+                "tips": "Clearly define each creator's role"
+            },
+            {
+                "step": 4,
+                "description": "On another account, To approve a collaboration, tap the Notifications button at the top.",
+                "image_path": "Shot/Group_1457.webp",
+                "tips": "Clearly define each creator's role"
+            },
+            {
+                "step": 5,
+                "description": "Find the Requested to Collaborate notification, then tap Accept — and you're done! 🎉",
+                "image_path": "Shot/Group_1458.webp",
+                "tips": "Clearly define each creator's role"
+            }
+        ],
+    },
+    "Editing a shot": {
+        "title": "Editing a BigShorts SHOT",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Apply desired filter and adjust brightness, apart from many effects lets explore image in image.",
+                "image_path": "Shot/Group_1475.webp",
+                "tips": "Try our AI-powered filters and effects"
+            },{
+                "step": 2,
+                "description": "Choose filter of choice and select image",
+                "image_path": "Shot/Group_1476.webp",
+                
+            },{
+                "step": 3,
+                "description": "Choose the image you want, then tap on done to proceed",
+                "image_path": "Shot/Group_1477.webp",
+                
+            },{
+                "step": 4,
+                "description": "Edit the image as needed, then tap on tick mark to proceed",
+                "image_path": "Shot/Group_1478.webp",
+                
+            },{
+                "step": 5,
+                "description": "Place the image in image on screen as desired and tap done",
+                "image_path": "Shot/Group_1479.webp",
+                
+            },{
+                "step": 7,
+                "description": "Add captions, hashtags, and description Or Collab with your Friends and post",
+                "image_path": "Shot/Group_1481.webp",
+            }
+        ]
+    },
+    "Invite friends": {
+        "title": "Inviting friends",
+        "steps": [
+            {
+                "step": 1,
+                "description": "In the Me section, tap Add Friends from the top bar (highlighted in red).",
+                "image_path": "Shot/Group_1533.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Invite your family and friends easily!",
+                "image_path": "Shot/Group_1534.webp",
+                
+            }
+        ]
+    },
+    "Feedback": {
+        "title": "Feedback",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Tap in the Me section and Tap the 3 lines menu at the top right corner to open settings",
+                "image_path": "Shot/Group_1539.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Select Feedback (highlighted in red).",
+                "image_path": "Shot/Group_1540.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Fill in your necessary details",
+                "image_path": "Shot/Group_1541.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "After filling you feedback/suggestions tap on Submit",
+                "image_path": "Shot/Group_1542.webp",
+                
+            }
+        ]
+    },
+    "Multiple accounts": {
+        "title": "Multiple accounts",
+        "steps": [
+            {
+                "step": 1,
+                "description": "In Me section, you can switch or add multiple accounts by long-pressing the Me button or on top left click on your username",
+                "image_path": "Shot/Group_1530.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Select the account by tapping the radio button or add account.",
+                "image_path": "Shot/Group_1531.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Heres your changed account Me section",
+                "image_path": "Shot/Group_1532.webp",
+
+            }
+        ]
+    },
+    "Account overview": {
+        "title": "Account overview",
+        "steps": [
+            {
+                "step": 1,
+                "description": "In Me section, Tap the Account Overview button at the top (highlighted in red).",
+                "image_path": "Shot/Group_1505.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "View and filter stats for different time periods by tapping the Filter button (highlighted in red).",
+                "image_path": "Shot/Group_1506.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Scroll to see more metrics and you can also change period for which you want a overview",
+                "image_path": "Shot/Group_1507.webp",
+                
+            }
+        ]
+    },
+    "Store Draft": {
+        "title": "Storing draft",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Click on Save to Draft at the last stage before posting",
+                "image_path": "Shot/Group_1550.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "To view or post the content later, navigate to Me section (highlighted in yellow) and tap on the Draft icon (highlighted in red).",
+                "image_path": "Shot/Group_1551.webp",
+                
+            }
+        ]
+    },
+    "Change Password": {
+        "title": "Changing password",
+        "steps": [
+            {
+                "step": 1,
+                "description": "In Me section, Tap the Hamburger menu at the top (highlighted in red) to open settings.",
+                "image_path": "Shot/Group_1502.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Select Change Password (highlighted in red).",
+                "image_path": "Shot/Group_1503.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Enter your current password and new password, then confirm the change.",
+                "image_path": "Shot/Group_1504.webp",
+                
+            }
+        ]
+    },
+    "Notification": {
+        "title": "Viewing notifications",
+        "steps": [
+            {
+                "step": 1,
+                "description": "On the Home page, tap on the Notification Bell icon at the top.",
+                "image_path": "Shot/Group_1555.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Check out all your notifications here.",
+                "image_path": "Shot/Group_1556.webp",
+                
+            }
+        ]
+    },
+    "Change theme": {
+        "title": "Changing theme",
+        "steps": [
+            {
+                "step": 1,
+                "description": "In Me section, Tap the Hamburger menu at the top to open settings.",
+                "image_path": "Shot/Group_1535.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Select App Theme Preference (highlighted in red).",
+                "image_path": "Shot/Group_1536.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Choose a theme by tapping on it, based on your preference.",
+                "image_path": "Shot/Group_1537.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "Your new Theme has been applied.",
+                "image_path": "Shot/Group_1538.webp",
+                
+            }
+        ]
+    },
+    "Report": {
+        "title": "Reporting a user",
+        "steps": [
+            {
+                "step": 1,
+                "description": "On a post, tap on the three-dots menu.",
+                "image_path": "Shot/Group_1543.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": " Select Report (highlighted in red).",
+                "image_path": "Shot/Group_1544.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Choose the category of the reported content and add a comment if required.",
+                "image_path": "Shot/Group_1545.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "Tap Submit to finalize the report.",
+                "image_path": "Shot/Group_1546.webp",
+                
+            }
+        ]
+    },
+    "Moment": {
+        "title": "creating a moment",
+        "steps": [
+            {
+                "step": 1,
+                "description": "On Me page, Tap the Hamburger menu at the top to open settings.",
+                "image_path": "Shot/Group_1496.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Select Archives (highlighted in red).",
+                "image_path": "Shot/Group_1497.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Tap the three-dots menu at the top.",
+                "image_path": "Shot/Group_1498.webp",
+            },
+            {
+                "step": 4,
+                "description": "Select Create a Moment",
+                "image_path": "Shot/Group_1499.webp",
+                
+            },
+            {
+                "step": 5,
+                "description": "Choose the archive(s) you want to include, add a title (highlighted in red), then tap Confirm at the top (Highlighted in yellow).",
+                "image_path": "Shot/Group_1500.webp",
+            },
+            {
+                "step": 6,
+                "description": "Hooray! 🎉 Your Moment is now visible on your profile!",
+                "image_path": "Shot/Group_1501.webp",
+                
+            }
+        ]
+    },
+    "Delete Post": {
+        "title": "Deleting a post",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Open the post you want to delete.",
+                "image_path": "Shot/Group_1511.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Tap the three-dots menu and select Delete Shot (highlighted in red)",
+                "image_path": "Shot/Group_1512.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Tap on delete Shot",
+                "image_path": "Shot/Group_1513.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "Confirm with Yes — and it's deleted!",
+                "image_path": "Shot/Group_1514.webp",
+                
+            }
+        ]
+    },
+    "Post insights": {
+        "title": "Post insights",
+        "steps": [
+            {
+                "step": 1,
+                "description": "On Me section, Tap on the post you want to check insights for.",
+                "image_path": "Shot/Group_1508.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Click on Insights (highlighted in red).",
+                "image_path": "Shot/Group_1509.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "View all key metrics related to your post.",
+                "image_path": "Shot/Group_1510.webp",
+                
+            }
+        ]
+    },
+    "Saved Posts": {
+        "title": "Saving posts",
+        "steps": [
+            {
+                "step": 1,
+                "description": "To save a post, tap the bookmark icon below a post (highlighted in yellow), Navigate to Me (highlighted in red)",
+                "image_path": "Shot/Group_1526.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Tap on the Saved section (highlighted in red).",
+                "image_path": "Shot/Group_1527.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "View all your saved photos, videos, and music.",
+                "image_path": "Shot/Group_1528.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "Tap on any folder to check them out.",
+                "image_path": "Shot/Group_1529.webp",
+                
+            }
+        ]
+    },
+    "Edit Profile": {
+        "title": "Editing your Profile",
+        "steps": [
+            {
+                "step": 1,
+                "description": "In Me section, tap Edit Profile.",
+                "image_path": "Shot/Group_1520.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Update your personal details and profile picture, To change or remove your profile picture, tap the pencil icon on the image.",
+                "image_path": "Shot/Group_1521.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Choose to take a photo or select one from your gallery or remove photo",
+                "image_path": "Shot/Group_1522.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "Choose desired photo",
+                "image_path": "Shot/Group_1523.webp",
+                
+            },
+            {
+                "step":5,
+                "description": "Rotate, Crop and adjust the image, then tap the tick icon at the top (highlighted in red) to save changes.",
+                "image_path": "Shot/Group_1524.webp",
+                
+            },
+            {
+                "step":6,
+                "description": "Finally, save your profile by clicking on top right save button.",
+                "image_path": "Shot/Group_1525.webp",
+                
+            }
+        ]
+    },
+    "Edit Post": {
+        "title": "Editing a post",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Open the post you want to edit.",
+                "image_path": "Shot/Group_1515.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Tap the three-dot menu.",
+                "image_path": "Shot/Group_1516.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Select “Edit Shot” (highlighted in red).",
+                "image_path": "Shot/Group_1517.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "Make the necessary changes like change description, add collab, set who can watch the post, change location",
+                "image_path": "Shot/Group_1518.webp",
+                
+            },
+            {
+                "step": 5,
+                "description": "Then tap Update Post — done!",
+                "image_path": "Shot/Group_1519.webp",
+                
+            }
+        ]
+    },
+    "Block/unblock User": {
+        "title": "Blocking and unblocking users",
+        "steps": [
+            {
+                "step": 1,
+                "description": "On the selected user’s post, tap the three-dot menu.",
+                "image_path": "Shot/Group_1482.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Select Block User — and you're done! 🚫",
+                "image_path": "Shot/Group_1483.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Go to Me from the bottom navigation bar and click on 3 lines on top right.",
+                "image_path": "Shot/Group_1484.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "Select Blocked Users (highlighted in red).",
+                "image_path": "Shot/Group_1485.webp",
+                
+            },
+            {
+                "step": 5,
+                "description": "Here, you can view all blocked users or unblock them if needed.",
+                "image_path": "Shot/Group_1486.webp",
+                
+            }
+        ]
+    },
+    "Hide/Unhide Users": {
+        "title": "Hiding and unhiding users",
+        "steps": [
+            {
+                "step": 1,
+                "description": "On the selected user's post, tap the three-dot menu.",
+                "image_path": "Shot/Group_1491.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Tap Hide Content (highlighted in red), and the user's content is Hidden!.",
+                "image_path": "Shot/Group_1492.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Go to Me section from the bottom navigation bar, and Tap the Hamburger menu at the top.",
+                "image_path": "Shot/Group_1493.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "Select Hidden Users.",
+                "image_path": "Shot/Group_1494.webp",
+                
+            },
+            {
+                "step": 5,
+                "description": "Here, you can view the list of hidden users and unhide them if needed.",
+                "image_path": "Shot/Group_1495.webp",
+                
+            }
+        ]
+    },
+    "Messages": {
+        "title": "Messaging a user",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Click on the message icon on the top right corner to send a message ",
+                "image_path": "Shot/Group_1552.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Choose the person you want to message ",
+                "image_path": "Shot/Group_1553.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "To attach(image or videos) in your dm click on the attach icon or you can also record audio and send",
+                "image_path": "Shot/Group_1554.webp",
+            }
+        ]
+    },
+    "Discovery": {
+        "title": "Navigating discovery page",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Click search icon on top bar in the Home Page (Highlighted in red)",
+                "image_path": "Shot/Group_1488.webp",
+                
+            },
+            {
+                "step": 2,
+                "description": "Here you can discover trending content, to search tap on search icon",
+                "image_path": "Shot/Group_1489.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "You can search users, hashtag in our search barr",
+                "image_path": "Shot/Group_1490.webp",
+                
+            }
+        ]
+    },
+    "Editing a Ssup": {
+        "title": "Editing a BigShorts Ssup",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Click on the edit button, after choosing a content to upload",
+                "image_path": "Shot/Group_1468.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "You can adjust(Brightness, contrast, saturation, sharpness), retouch, makeup and add effects or text and then click on the Save button",
+                "image_path": "Shot/Group_1469.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "You can also add various effects (like sticker, filter, location, links, image in images, etc), lets explore music",
+                "image_path": "Shot/Group_1470.webp",
+                
+            },{
+                "step": 4,
+                "description": "Select the music you want",
+                "image_path": "Shot/Group_1471.webp",
+            },
+            {
+                "step": 5,
+                "description": "Choose the portion of the music and click Apply sound",
+                "image_path": "Shot/Group_1472.webp",
+            },
+            {
+                "step": 6,
+                "description": "After you have applied your desired effects click on done",
+                "image_path": "Shot/Group_1473.webp",
+            },
+            {
+                "step": 7,
+                "description": "Select your desired Duration, choose who can see your SSUP and Share",
+                "image_path": "Shot/Group_1474.webp",
+            }
+        ]
+    },
+    "Interactive snip": {
+        "title": "Making an Interactive Snip",
+        "steps": [
+            {
+                "step": 1,
+                "description": "While editing a snip, add button(highlighted in red) to add interactive elements",
+                "image_path": "Shot/Group_1592.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Edit the button as needed",
+                "image_path": "Shot/Group_1593.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Click on the interactive tap button (highlighted in red) to add more interactive elements",
+                "image_path": "Shot/Group_1594.webp",
+                
+            },{
+                "step": 4,
+                "description": "Select a type of interactive element",
+                "image_path": "Shot/Group_1595.webp",
+            },
+            {
+                "step": 5,
+                "description": "Capture a snip or select from gallery",
+                "image_path": "Shot/Group_1596.webp",
+                
+            },
+            {
+                "step": 6,
+                "description": "Click on timeline, to edit interactive duration",
+                "image_path": "Shot/Group_1597.webp",
+                
+            },{
+                "step": 7,
+                "description": "You can view and adjust the interactive elements timeline here",
+                "image_path": "Shot/Group_1598.webp",
+            },
+            {
+                "step": 8,
+                "description": "Click on interactive tree hierarchy (highlighted in red)",
+                "image_path": "Shot/Group_1599.webp",
+                
+            },
+            {
+                "step": 9,
+                "description": "Here you can view hierarchy tree of interactive elements",
+                "image_path": "Shot/Group_1600.webp",
+                
+            },
+            {
+                "step": 10,
+                "description": "Click on post to publish your interactive video.",
+                "image_path": "Shot/Group_1601.webp",
+                
+            }
+        ]
+    },
+    "Mini": {
+        "title": "Creating a Mini",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Open the BigShorts app and tap the Creation Button",
+                "image_path": "Shot/Group_1557.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Choose 'Mini' from the Creation Wheel",
+                "image_path": "Shot/Group_1558.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Capture a Mini or upload an existing one from your Device and click next",
+                "image_path": "Shot/Group_1559.webp",
+                
+            },{
+                "step": 4,
+                "description": "Edit Your Mini using BigShorts tools and tap done",
+                "image_path": "Shot/Group_1560.webp",
+                
+            },{
+                "step": 5,
+                "description": "Pick a cover image for your Mini, add description, title, allow comment or who can watch the Mini",
+                "image_path": "Shot/Group_1561.webp",
+                
+            },{
+                "step": 6,
+                "description": "After it, tap on Post and you're done!",
+                "image_path": "Shot/Group_1584.webp",
+                
+            }
+        ]
+    },
+    "Mini Series": {
+        "title": "Creating a Mini Series",
+        "steps": [
+            {
+                "step": 1,
+                "description": "On Me section, Tap on the Create Mini Series",
+                "image_path": "Shot/Group_1576.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Select a cover image for the Mini Series.",
+                "image_path": "Shot/Group_1577.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Choose an image from gallery",
+                "image_path": "Shot/Group_1578.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "Add season title, description and eventually schedule time.",
+                "image_path": "Shot/Group_1580.webp",
+                
+            },
+            {
+                "step": 5,
+                "description": "And then click on Create Mini Series (highlighted in red)",
+                "image_path": "Shot/Group_1581.webp",
+                
+            },
+            {
+                "step": 6,
+                "description": "Select desired number of Mini that you want to add to Mini Series",
+                "image_path": "Shot/Group_1582.webp",
+                
+            },
+            {
+                "step": 7,
+                "description": "And then tap on Add Episodes",
+                "image_path": "Shot/Group_1583.webp",
+                
+            },
+            {
+                "step": 8,
+                "description": "Viola! your Mini Series is created!",
+                "image_path": "Shot/Group_1584.webp",
+                
+            }
+        ]
+    },
+    "Editing a Mini": {
+        "title": "Editing a BigShorts Mini",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Open the BigShorts app and tap the Creation Button",
+                "image_path": "Shot/Group_1563.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Choose 'Mini' from the Creation Wheel",
+                "image_path": "Shot/Group_1564.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Capture a Mini or upload an existing one from your Device and click next",
+                "image_path": "Shot/Group_1565.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "When you chose a video to upload, next you can edit it by Rotate, split, trimming or deleted a splitted clip then tap on tick mark",
+                "image_path": "Shot/Group_1566.webp",
+               
+            },
+            {
+                "step": 5,
+                "description": "You Can Adjust Brightness Levels and Apply Filters as desired and then tap the Done Icon",
+                "image_path": "Shot/Group_1567.webp",
+                
+            },
+            {
+                "step": 6,
+                "description": "Tap on Record button",
+                "image_path": "Shot/Group_1568.webp",
+                
+            }
+        ]
+    },
+    "Editing a Snip": {
+        "title": "Editing a BigShorts Snip",
+        "steps": [
+            {
+                "step": 1,
+                "description": "When uploaded a snip, you can cick on edit for video editing",
+                "image_path": "Shot/Group_1460.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Let's Apply a Filter to the snip, click on Filters",
+                "image_path": "Shot/Group_1461.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Choose the desired filter and click on tick mark to save",
+                "image_path": "Shot/Group_1462.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "Click Done when you have finished editing",
+                "image_path": "Shot/Group_1463.webp",
+                
+            },{
+                "step": 5,
+                "description": "Add Your caption and Click Post to share your Snip",
+                "image_path": "Shot/Group_1464.webp",
+                
+            }
+        ]
+    },
+    "Ssup Repost": {
+        "title": "Ssup Repost",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Open your friends chats, who have mentioned you, and tap add to ssup (Shown beside mentioned story)",
+                "image_path": "Shot/Group_1547.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "You can apply effects and then tap post",
+                "image_path": "Shot/Group_1548.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Select your desired Duration, choose who can see your SSUP and Share",
+                "image_path": "Shot/Group_1549.webp",
+                
+            }
+        ]
+    },
+    "Edit Mini Series": {
+        "title": "Editing a Mini Series",
+        "steps": [
+            {
+                "step": 1,
+                "description": "In Me section, Tap on the Mini Series icon (highlighted in yellow), and tap on the Mini Series you want to edit (highlighted in red)",
+                "image_path": "Shot/Group_1585.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Tap on three dots on top right corner",
+                "image_path": "Shot/Group_1586.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Tap on edit on Mini Series",
+                "image_path": "Shot/Group_1587.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "Edit the cover image, season title or description and click on Edit Mini Series",
+                "image_path": "Shot/Group_1588.webp",
+                
+            },
+            {
+                "step": 5,
+                "description": "Select new Mini to be added in series or remove one.",
+                "image_path": "Shot/Group_1589.webp",
+                
+            },
+            {
+                "step": 6,
+                "description": "Then tap on + Add episodes",
+                "image_path": "Shot/Group_1590.webp",
+                
+            },
+            {
+                "step": 7,
+                "description": "Your series  is edited!",
+                "image_path": "Shot/Group_1591.webp",
+                
+            }
+        ]
+    },
+    "Requested Message": {
+        "title": "Requested Message",
+        "steps": [
+            {
+                "step": 1,
+                "description": "Open messages screen and tap on Requested (highlighted in red)",
+                "image_path": "Shot/Group_1602.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Tap on the requesed user chat",
+                "image_path": "Shot/Group_1603.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Choose to approve or deny the user's chat",
+                "image_path": "Shot/Group_1604.webp",
+                
+            },
+            {
+                "step": 4,
+                "description": "If accepted, you can chat with them now onwards!",
+                "image_path": "Shot/Group_1605.webp",
+                
+            }
+        ]
+    },
+    "Snip to Mini": {
+        "title": "Linking Mini Dramas to Snip",
+        "steps": [
+            {
+                "step": 1,
+                "description": "While editing a snip, add button(highlighted in red) to add interactive elements",
+                "image_path": "Shot/Group_165.webp",
+                "tips": "Make sure you're on the latest app version for all features"
+            },
+            {
+                "step": 2,
+                "description": "Edit the button as needed",
+                "image_path": "Shot/Group_166.webp",
+                
+            },
+            {
+                "step": 3,
+                "description": "Click on the interactive tap button (highlighted in red) to add  interactive elements",
+                "image_path": "Shot/Group_167.webp",
+                
+            },{
+                "step": 4,
+                "description": "Select Attach Existing Mini from the options",
+                "image_path": "Shot/Group_168.webp",
+            },
+            {
+                "step": 5,
+                "description": "Select a Mini Drama to link from your uploaded list and tap Link existing Mini button",
+                "image_path": "Shot/Group_169.webp",
+                
+            },
+            {
+                "step": 6,
+                "description": "Click on interactive tree hierarchy (highlighted in red)",
+                "image_path": "Shot/Group_170.webp",
+                
+            },
+            {
+                "step": 7,
+                "description": "Here you can view hierarchy tree of interactive elements",
+                "image_path": "Shot/Group_171.webp",
+                
+            },
+            {
+                "step": 8,
+                "description": "Edit the Snip further if required and Tap Done",
+                "image_path": "Shot/Group_172.webp",
+                
+            },
+            {
+                "step": 9,
+                "description": "Add a caption, tag friends, and click Post to share your Snip",
+                "image_path": "Shot/Group_173.webp",  
+            }
+        ]
+    },
+}
+
+# Attach hashed image URLs, sizes and dimensions from the build-time manifest
+# (build_image_manifest.py); they are part of the catalog hash below
+_IMAGE_MANIFEST = load_manifest()
+if _IMAGE_MANIFEST:
+    _missing_images = annotate_guides(CONTENT_GUIDES, _IMAGE_MANIFEST)
+    if _missing_images:
+        logger.warning("%d guide steps reference images missing from the manifest", _missing_images)
+
+# Guides keyed by lowercase name ("Editing a Mini" -> "editing a mini")
+_GUIDES_BY_KEY = {key.lower(): value for key, value in CONTENT_GUIDES.items()}
+
+# Content hash of the guide catalog; changes whenever any guide text or image changes
+CATALOG_VERSION = hashlib.sha256(
+    json.dumps(CONTENT_GUIDES, sort_keys=True, ensure_ascii=False).encode("utf-8")
+).hexdigest()[:12]
+
+
+def content_creation_guide(content_type: str) -> dict:
+    """Provides detailed guidance about different types of content creation on BigShorts
+    Args:
+        content_type: The type of content user wants to create (e.g., 'SHOT', 'SNIP', 'ssup', 'collab')
+    Returns:
+        dict: Contains steps, tips, and image paths for visual guidance
+    """
+    # Standardize input to match allowed content types
+    std_content_type = content_type.lower()
 
-    for key, value in guides.items():
-        guides_case_insensitive[key.lower()] = value
+    # Special handling for editing queries
+    if "edit" in std_content_type or "editing" in std_content_type:
+        # Try to match exact editing content types first
+        for allowed_type in ALLOWED_CONTENT_TYPES:
+            if allowed_type.lower() == std_content_type:
+                std_content_type = allowed_type
+                break
+            
+        # If no exact match, try to extract the content being edited
+        if std_content_type not in [ct.lower() for ct in ALLOWED_CONTENT_TYPES]:
+            for mapping_key, mapping_value in CONTENT_TYPE_MAPPING.items():
+                if mapping_key.lower() in std_content_type and "edit" in mapping_key.lower():
+                    std_content_type = mapping_value.lower()
+                    break
+    else:
+        # Regular content type handling
+        for mapping_key, mapping_value in CONTENT_TYPE_MAPPING.items():
+            if mapping_key.lower() in std_content_type:
+                std_content_type = mapping_value.lower()
+                break
+    
+    # Only allow predefined content types
+    if std_content_type.lower() not in [ct.lower() for ct in ALLOWED_CONTENT_TYPES]:
+        return {
+            "type": "content_guide",
+            "content": {
+                "title": "Content Type Not Found",
+                "steps": [],
+            }
+        }
     
     # CRITICAL FIX: Look up key by its lowercase version
     # This handles cases where "editing a Mini" in the request
     # needs to match "Editing a Mini" in the guides dictionary
     lookup_key = std_content_type.lower()
     
-    # Debug output if needed
-    print(f"Looking for: {lookup_key}")
-    print(f"Available keys: {list(guides_case_insensitive.keys())}")
+    # Debug output if needed (off unless LOG_LEVEL=DEBUG)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Looking for guide %r in %s", lookup_key, list(_GUIDES_BY_KEY.keys()))
     
     # Look up the guide using the lowercase key
-    guide = guides_case_insensitive.get(lookup_key)
+    guide = _GUIDES_BY_KEY.get(lookup_key)
 
 
     if guide is None:
@@ -1944,30 +2020,34 @@ def suggest_trending_content(content_type: str = "all") -> dict:
 
 # Integrating all tools into a cohesive chatbot with local LLM
 class BigShortsChatbot:
-    def __init__(self, model_path):
-        """Initialize the chatbot with a local LLM model"""
-        print(f"Loading model from {model_path}...")
-        self.llm = Llama(
-            model_path=model_path,
-            n_ctx=2048,  # Larger context size for better conversations
-            n_gpu_layers=0,
-            n_threads=8, 
-            n_batch=4096, 
-            use_mlock=True,  # Lock model in RAM
-            use_mmap=False,
-            prefetch=True,
-            top_k=40, top_p=0.9,
-            temperature=0.5,# Use GPU acceleration if available
-            verbose=False
-        )
-        print("Model loaded successfully!")
+    def __init__(self, model_path: str = None, backend: LLMBackend = None):
+        """Initialize the chatbot with a local LLM model
+
+        backend overrides the one create_backend() picks from LLM_BACKEND
+        (in-process llama.cpp loaded from model_path unless configured otherwise).
+        """
+        if backend is None:
+            backend = create_backend(
+                model_path=model_path,
+                n_ctx=2048,  # Larger context size for better conversations
+                n_gpu_layers=0,
+                n_threads=8, 
+                n_batch=4096, 
+                use_mlock=True,  # Lock model in RAM
+                use_mmap=False,
+                prefetch=True,
+                top_k=40, top_p=0.9,
+                temperature=0.5,# Use GPU acceleration if available
+                verbose=False
+            )
+        self.backend = backend
         
         # Load custom prompt templates
         try:
             with open("prompts.yaml", 'r') as stream:
                 self.prompt_templates = yaml.safe_load(stream)
         except (FileNotFoundError, yaml.YAMLError):
-            print("Warning: prompts.yaml not found or invalid, using default prompts")
+            logger.warning("prompts.yaml not found or invalid, using default prompts")
             self.prompt_templates = {
                 "final_answer": {
                     "pre_messages": "You are a helpful social media assistant for the BigShorts platform. Focus on helping users with platform features.",
@@ -1977,6 +2057,9 @@ class BigShortsChatbot:
         
         self.sessions = {}
         
+        # Identical concurrent LLM prompts share one generation
+        self.inflight = SingleFlight()
+        
         # Define off-topic keywords
         self.off_topic_keywords = [
             "politics", "news", "weather", "sports", "dating", "games", "gaming", 
@@ -2164,9 +2247,9 @@ class BigShortsChatbot:
             # Extract the previous content
             prev_content = prev_message.get("content", {})
             
-            # Debug logging
-            print(f"DEBUG - Previous message type: {type(prev_content)}")
-            print(f"DEBUG - Previous message content: {prev_content}")
+            # Debug logging (off unless LOG_LEVEL=DEBUG)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Previous message type: %s, content: %s", type(prev_content), prev_content)
             
             # If previous message was a suggestion about a specific content type
             if isinstance(prev_content, dict) and prev_content.get("type") == "suggestion":
@@ -2193,7 +2276,7 @@ class BigShortsChatbot:
         
         except Exception as e:
             # Comprehensive error handling
-            print(f"Exception in 'yes' handler: {str(e)}")
+            logger.exception("Exception in 'yes' handler: %s", e)
             
             # Provide a detailed fallback response
             return {
@@ -2213,8 +2296,18 @@ class BigShortsChatbot:
     
         return any(pattern in query_lower for pattern in user_search_patterns)
 
-    def generate_llm_response(self, query: str, session_id: str) -> str:
-        """Generate a response using the local LLM for a specific session"""
+    # Stop sequences and sampling settings shared by the sync and async paths
+    LLM_STOP = ["</s>", "[INST]", "User:", "Human:"]
+    LLM_MAX_TOKENS = 128
+    LLM_TEMPERATURE = 0.5
+
+    @property
+    def supports_async(self) -> bool:
+        """True when aprocess_query can await the backend on the event loop"""
+        return self.backend.supports_async
+
+    def _build_llm_prompt(self, query: str, session_id: str):
+        """Return (system_prompt, history, prompt) for an LLM answer"""
         # Get system prompt
         system_prompt = self.prompt_templates.get("system_prompt", "")
     
@@ -2227,34 +2320,269 @@ class BigShortsChatbot:
     
         # Format prompt with conversation history for context (Mistral format)
         prompt = f"<s>[INST] {system_prompt}\n\nConversation history:\n{history}\n\nUser's question: {query}\n\nProvide a helpful response about the BigShorts platform: [/INST]"
-    
+        return system_prompt, history, prompt
+
+    def _record_generation(self, prompt_tokens: int, completion_tokens: int, started: float, prompt_built: float,
+                           first_token_at: float, decode_done: float, finished: float):
+        _query_state.generation = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "prompt_build_seconds": prompt_built - started,
+            "prefill_seconds": first_token_at - prompt_built,
+            "decode_seconds": decode_done - first_token_at,
+            "cleanup_seconds": finished - decode_done,
+            # perf_counter() readings, for stage tracing
+            "stage_times": [
+                ("prompt_build", started, prompt_built),
+                ("prefill", prompt_built, first_token_at),
+                ("decode", first_token_at, decode_done),
+                ("cleanup", decode_done, finished)
+            ]
+        }
+
+    def generate_llm_response(self, query: str, session_id: str, on_token=None) -> str:
+        """Generate a response using the local LLM for a specific session
+
+        on_token, if given, is called with each generated token as it arrives.
+        If it raises, the leader stops streaming to it but keeps decoding while
+        followers are waiting on the same generation.
+        """
+        _query_state.lane = "llm"
+        started = time.perf_counter()
+        system_prompt, history, prompt = self._build_llm_prompt(query, session_id)
+        prompt_built = time.perf_counter()
+        
+        # If an identical prompt is already generating, share its result (and
+        # its token stream) instead of decoding it again
+        key = flight_key(system_prompt, history, query)
+        flight, is_leader = self.inflight.join(key)
+        if not is_leader:
+            _query_state.coalesced = True
+            try:
+                if on_token is not None:
+                    for token in flight.stream(timeout=SHARED_GENERATION_TIMEOUT):
+                        on_token(token)
+                return flight.wait(timeout=SHARED_GENERATION_TIMEOUT)
+            finally:
+                self.inflight.leave(key, flight)
+        
+        completion_tokens = 0
+        fallback = f"I encountered a technical issue. Can I help you with creating content on BigShorts instead?"
         try:
-            # Generate response with the model
-            result = self.llm(
+            # Stream the generation so prefill (time to first token) and decode
+            # can be timed separately
+            tokens = self.backend.stream(
                 prompt,
-                max_tokens=128,
-                temperature=0.5,
-                stop=["</s>", "[INST]", "User:", "Human:"]
+                max_tokens=self.LLM_MAX_TOKENS,
+                temperature=self.LLM_TEMPERATURE,
+                stop=self.LLM_STOP
             )
+            
+            pieces = []
+            first_token_at = None
+            detached = False
+            for token in tokens:
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                pieces.append(token)
+                flight.publish(token)
+                if on_token is not None:
+                    try:
+                        on_token(token)
+                    except Exception as e:
+                        # This caller's stream is gone, but followers may still
+                        # be waiting on the generation; keep decoding for them
+                        logger.warning("Streaming to the leader failed: %s", e)
+                        on_token = None
+                        detached = True
+                        self.inflight.leave(key, flight)
+                if detached and flight.subscribers <= 0:
+                    tokens.close()
+                    completion_tokens = len(pieces)
+                    flight.finish(fallback)
+                    return fallback
+            decode_done = time.perf_counter()
+            completion_tokens = len(pieces)
+            if first_token_at is None:
+                first_token_at = decode_done
         
             # Extract and clean response
-            response = result["choices"][0]["text"].strip()
+            response = "".join(pieces).strip()
             response = self._clean_agent_response(response)
-        
+            
+            self._record_generation(self.backend.count_tokens(prompt), completion_tokens, started, prompt_built,
+                                    first_token_at, decode_done, time.perf_counter())
+            flight.finish(response)
             return response
         
         except Exception as e:
-            print(f"LLM error: {str(e)}")
-            return f"I encountered a technical issue. Can I help you with creating content on BigShorts instead?"
+            logger.exception("LLM error: %s", e)
+            flight.finish(fallback)
+            return fallback
+        
+        finally:
+            self.inflight.complete(key, flight, completion_tokens)
+
+    async def agenerate_llm_response(self, query: str, session_id: str, on_token=None) -> str:
+        """generate_llm_response for async backends, awaited on the event loop
+
+        The generation runs in its own task, which the leader and any followers
+        subscribe to. Cancelling one caller only unsubscribes it; the backend
+        request is cancelled once no caller is left waiting.
+        """
+        _query_state.lane = "llm"
+        started = time.perf_counter()
+        system_prompt, history, prompt = self._build_llm_prompt(query, session_id)
+        prompt_built = time.perf_counter()
+        
+        key = flight_key(system_prompt, history, query)
+        flight, is_leader = self.inflight.join(key)
+        if is_leader:
+            flight.task = asyncio.ensure_future(self._agenerate_flight(key, flight, prompt, started, prompt_built))
+            timeout = None
+        else:
+            _query_state.coalesced = True
+            timeout = SHARED_GENERATION_TIMEOUT
+        try:
+            if on_token is not None:
+                async for token in flight.astream(timeout=timeout):
+                    on_token(token)
+            return await flight.await_result(timeout=timeout)
+        finally:
+            if self.inflight.leave(key, flight) <= 0 and not flight.done and flight.task is not None:
+                flight.task.cancel()
+
+    async def _agenerate_flight(self, key: str, flight, prompt: str, started: float, prompt_built: float) -> None:
+        """Decode one shared generation and publish it to `flight`"""
+        completion_tokens = 0
+        fallback = f"I encountered a technical issue. Can I help you with creating content on BigShorts instead?"
+        try:
+            pieces = []
+            first_token_at = None
+            async for token in self.backend.astream(
+                prompt,
+                max_tokens=self.LLM_MAX_TOKENS,
+                temperature=self.LLM_TEMPERATURE,
+                stop=self.LLM_STOP
+            ):
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                pieces.append(token)
+                flight.publish(token)
+            decode_done = time.perf_counter()
+            completion_tokens = len(pieces)
+            if first_token_at is None:
+                first_token_at = decode_done
             
+            response = self._clean_agent_response("".join(pieces).strip())
+            prompt_tokens = await self.backend.acount_tokens(prompt)
+            # The task runs in a copy of the leader's context, so this lands
+            # on the leader's query record
+            self._record_generation(prompt_tokens, completion_tokens, started, prompt_built,
+                                    first_token_at, decode_done, time.perf_counter())
+            flight.finish(response)
+        
+        except asyncio.CancelledError:
+            flight.finish(fallback)
+            raise
+        
+        except Exception as e:
+            logger.exception("LLM error: %s", e)
+            flight.finish(fallback)
+        
+        finally:
+            self.inflight.complete(key, flight, completion_tokens)
     
-    def process_query(self, user_input: str, session_id: str = None) -> Union[str, dict]:
-        """Process user queries and return response with optional visual guide"""
-        # Handle session_id
+    def process_query(self, user_input: str, session_id: str = None, on_token=None) -> Union[str, dict]:
+        """Process user queries and return response with optional visual guide
+
+        on_token is passed to generate_llm_response to stream LLM answers.
+        """
+        if session_id is None:
+            session_id = "default"
+        response = self._route_query(user_input, session_id)
+        if response is not _NEEDS_LLM:
+            return response
         
+        # Use the LLM for other queries
+        return self.answer_with_llm(user_input, session_id, on_token)
+
+    def answer_with_llm(self, user_input: str, session_id: str, on_token=None) -> dict:
+        """LLM half of process_query, for a query route_batch left unanswered"""
+        _query_state.path = "llm"
+        try:
+            llm_response = self.generate_llm_response(user_input, session_id, on_token)
+        except Exception as e:
+            return self._llm_error_reply(session_id, e)
+        return self._llm_reply(session_id, llm_response)
+
+    async def aprocess_query(self, user_input: str, session_id: str = None, on_token=None) -> Union[str, dict]:
+        """process_query for async backends: routing runs inline, the LLM call is awaited
+
+        Routing is plain Python over in-memory tables, so running it on the
+        event loop is cheaper than a hop to the thread pool.
+        """
         if session_id is None:
             session_id = "default"
-            
+        response = self._route_query(user_input, session_id)
+        if response is not _NEEDS_LLM:
+            return response
+        return await self.aanswer_with_llm(user_input, session_id, on_token)
+
+    async def aanswer_with_llm(self, user_input: str, session_id: str, on_token=None) -> dict:
+        """answer_with_llm for async backends"""
+        _query_state.path = "llm"
+        try:
+            llm_response = await self.agenerate_llm_response(user_input, session_id, on_token)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return self._llm_error_reply(session_id, e)
+        return self._llm_reply(session_id, llm_response)
+
+    def route_batch(self, items: List[tuple]) -> List[tuple]:
+        """Run the rule-based handlers over many (user_input, session_id) pairs
+
+        Returns a (response, state) pair per item, where state is what
+        get_query_state() would report. response is None for items that need
+        the model; their user message is already in the session history, so
+        finish them with answer_with_llm / aanswer_with_llm.
+        """
+        results = []
+        for user_input, session_id in items:
+            reset_query_state()
+            response = self._route_query(user_input, session_id)
+            results.append((None if response is _NEEDS_LLM else response, get_query_state()))
+        return results
+
+    def _llm_reply(self, session_id: str, llm_response: str) -> dict:
+        self.sessions[session_id].append({"role": "assistant", "content": llm_response})
+        
+        # 50% chance to add trending content suggestions
+        if random.random() < 0.5:
+            trending_suggestions = suggest_trending_content("all")
+            return {
+                "type": "combined",
+                "content": {
+                    "message": llm_response,
+                    "trending": trending_suggestions["content"]
+                }
+            }
+        else:
+            return {"type": "message", "content": llm_response}
+
+    def _llm_error_reply(self, session_id: str, error: Exception) -> dict:
+        _query_state.path = "llm_error"
+        logger.error("Error generating response: %s", error, exc_info=error)
+        error_response = {
+            "type": "error",
+            "content": "I'm sorry, I couldn't process that request. Can I help you with creating SHOT, SNIP, SSUP, Mini, or Collab content? Or would you like guidance on other features like editing, moments, or playlists?"
+        }
+        self.sessions[session_id].append({"role": "assistant", "content": error_response})
+        return error_response
+
+    def _route_query(self, user_input: str, session_id: str):
+        """Answer with the rule-based handlers, or return _NEEDS_LLM for the model"""
         # Create session if it doesn't exist
         if session_id not in self.sessions:
             self.sessions[session_id] = []
@@ -2368,7 +2696,7 @@ class BigShortsChatbot:
                 # Test if the response is JSON serializable
                 json.dumps(response)
             except Exception as e:
-                print(f"Error serializing greeting response: {e}")
+                logger.warning("Error serializing greeting response: %s", e)
                 # Fallback to a simpler response
                 response = {
                     "type": "message",
@@ -2376,6 +2704,7 @@ class BigShortsChatbot:
                 }
             
             self.sessions[session_id].append({"role": "assistant", "content": response})
+            _query_state.path = "greeting"
             return response
 
         what_is_patterns = [
@@ -2407,6 +2736,7 @@ class BigShortsChatbot:
                 }
         
                 self.sessions[session_id].append({"role": "assistant", "content": response})
+                _query_state.path = "content_explanation"
                 return response
                 
         if self._is_user_search_query(user_input):
@@ -2415,6 +2745,7 @@ class BigShortsChatbot:
                 "content": "I'm here to help with BigShorts features. I cannot access user data or find specific profiles. What would you like to know about creating content?"
             }
             self.sessions[session_id].append({"role": "assistant", "content": response})
+            _query_state.path = "user_search"
             return response
     
         # Handle help or guidance requests
@@ -2438,6 +2769,7 @@ class BigShortsChatbot:
             
                 response = {"type": "message", "content": category_response}
                 self.sessions[session_id].append({"role": "assistant", "content": response})
+                _query_state.path = "help_overview"
                 return response
         
         # Handle trending content requests FIRST (before content type detection)
@@ -2445,18 +2777,22 @@ class BigShortsChatbot:
             if "snips" in user_input.lower() or "videos" in user_input.lower() or "video" in user_input.lower():
                 response = suggest_trending_content("snips")
                 self.sessions[session_id].append({"role": "assistant", "content": response})
+                _query_state.path = "trending"
                 return response
             elif "creators" in user_input.lower() or "users" in user_input.lower() or "people" in user_input.lower():
                 response = suggest_trending_content("creators")
                 self.sessions[session_id].append({"role": "assistant", "content": response})
+                _query_state.path = "trending"
                 return response
             elif "shots" in user_input.lower() or "photos" in user_input.lower() or "pictures" in user_input.lower():
                 response = suggest_trending_content("shots")
                 self.sessions[session_id].append({"role": "assistant", "content": response})
+                _query_state.path = "trending"
                 return response
             else:
                 response = suggest_trending_content("all")
                 self.sessions[session_id].append({"role": "assistant", "content": response})
+                _query_state.path = "trending"
                 return response
 
         # Detect content type in query
@@ -2470,6 +2806,7 @@ class BigShortsChatbot:
                 "content": "I see you're asking about BigShorts! I can help you with creating content (SHOT, SNIP, SSUP, Mini), managing your account, using platform features, or troubleshooting issues. What specific aspect of BigShorts would you like to know more about?"
             }
             self.sessions[session_id].append({"role": "assistant", "content": generic_response})
+            _query_state.path = "bigshorts_generic"
             return generic_response
 
         if content_type != "none":
@@ -2477,6 +2814,7 @@ class BigShortsChatbot:
             if "edit" in content_type.lower() or "editing" in content_type.lower():
                 response = content_creation_guide(content_type)
                 self.sessions[session_id].append({"role": "assistant", "content": response})
+                _query_state.path = "edit_guide"
                 return response
 
         if user_input.startswith("FAQ:"):
@@ -2503,6 +2841,7 @@ class BigShortsChatbot:
                         }
                     }
                     self.sessions[session_id].append({"role": "assistant", "content": bigcoins_info})
+                    _query_state.path = "faq_bigcoins"
                     return bigcoins_info
                 
                 # If it's an issue, handle it as an issue
@@ -2511,14 +2850,16 @@ class BigShortsChatbot:
                     if issue_type:
                         response = {"type": "issue", "content": handle_common_issues(issue_type)}
                         self.sessions[session_id].append({"role": "assistant", "content": response})
+                        _query_state.path = "faq_issue"
                         return response
                 
                 # Otherwise treat it as a content guide request
                 response = content_creation_guide(selected_content_type)
                 self.sessions[session_id].append({"role": "assistant", "content": response})
+                _query_state.path = "faq_guide"
                 return response
             except Exception as e:
-                print(f"Error handling FAQ selection: {str(e)}")
+                logger.warning("Error handling FAQ selection: %s", e)
                 # If something goes wrong, fallback to regular processing
                 pass
 
@@ -2580,6 +2921,7 @@ class BigShortsChatbot:
                     guide = content_creation_guide(content_type)
                     explanation = self.content_explanations.get(content_type, f"Here's information about {content_type}.")
                     self.sessions[session_id].append({"role": "assistant", "content": f"{explanation} Let me show you the guide:"})
+                    _query_state.path = "content_basic_inquiry"
                     return guide
 
                 # Get natural phrasing for the content type
@@ -2590,23 +2932,27 @@ class BigShortsChatbot:
                     "content": f"It looks like you're interested in {content_type}. Would you like me to show you how to {natural_phrase}? Reply 'yes' or ask 'how to {natural_phrase}'."
                 }
                 self.sessions[session_id].append({"role": "assistant", "content": suggestion_response})
+                _query_state.path = "suggestion"
                 return suggestion_response
         
             # If it includes action verbs, provide the content guide
             if any(x in user_input.lower() for x in action_verbs):
                 response = content_creation_guide(content_type)
                 self.sessions[session_id].append({"role": "assistant", "content": response})
+                _query_state.path = "content_guide"
                 return response
 
         # Handle "yes" replies to suggestions about content creation
         if user_input.lower().strip() in ["yes", "yeah", "sure", "ok", "okay"]:
             response = self.handle_yes_reply(session_id)
+            _query_state.path = "yes_reply"
             return response
 
         # Check for off-topic queries
         if self._is_off_topic(user_input):
             response = get_off_topic_response()
             self.sessions[session_id].append({"role": "assistant", "content": response})
+            _query_state.path = "off_topic"
             return {"type": "message", "content": response}
 
         # Handle issues, ideas, and platform sections
@@ -2615,11 +2961,13 @@ class BigShortsChatbot:
             if issue != "unknown":
                 response = {"type": "issue", "content": handle_common_issues(issue)}
                 self.sessions[session_id].append({"role": "assistant", "content": response})
+                _query_state.path = "issue"
                 return response
 
         if "snip ideas" in user_input.lower() or "interactive ideas" in user_input.lower() or "ideas for snip" in user_input.lower():
             response = {"type": "idea", "content": generate_interactive_video_ideas()}
             self.sessions[session_id].append({"role": "assistant", "content": response})
+            _query_state.path = "ideas"
             return response
 
         # Check for platform section questions
@@ -2627,34 +2975,11 @@ class BigShortsChatbot:
             if section in user_input.lower():
                 response = {"type": "guide", "content": platform_guide(section)}
                 self.sessions[session_id].append({"role": "assistant", "content": response})
+                _query_state.path = "platform_section"
                 return response
             
-        # Use the LLM for other queries (with 50% chance to add trending content)
-        try:
-            llm_response = self.generate_llm_response(user_input)
-            self.sessions[session_id].append({"role": "assistant", "content": llm_response})
-        
-            # 50% chance to add trending content suggestions
-            if random.random() < 0.5:
-                trending_suggestions = suggest_trending_content("all")
-                return {
-                    "type": "combined",
-                    "content": {
-                        "message": llm_response,
-                        "trending": trending_suggestions["content"]
-                    }
-                }
-            else:
-                return {"type": "message", "content": llm_response}
-            
-        except Exception as e:
-            print(f"Error generating response: {str(e)}")
-            error_response = {
-                "type": "error",
-                "content": "I'm sorry, I couldn't process that request. Can I help you with creating SHOT, SNIP, SSUP, Mini, or Collab content? Or would you like guidance on other features like editing, moments, or playlists?"
-            }
-            self.sessions[session_id].append({"role": "assistant", "content": error_response})
-            return error_response
+        # Everything else goes to the LLM (see process_query / aprocess_query)
+        return _NEEDS_LLM
             
     def get_conversation_history(self, session_id: str = None) -> List[Dict[str, str]]:
         """Return the conversation history for a specific session"""
@@ -2669,11 +2994,12 @@ def run_chatbot():
     """Run the chatbot in an interactive loop"""
     # Check if model exists in the models directory
     model_path = "models/mistral-7b-instruct-v0.2.Q4_K_M.gguf"
-    if not os.path.exists(model_path):
+    if LLM_BACKEND == "llama" and not os.path.exists(model_path):
         print(f"Model not found at {model_path}")
         print("Please run the setup code first to download the model, or update the path.")
         return
     
+    configure_logging()
     try:
         chatbot = BigShortsChatbot(model_path)
         
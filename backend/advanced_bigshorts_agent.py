@@ -2,12 +2,13 @@
 import os
 import json
 from typing import Dict, List, Union, Optional, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.tools import Tool, StructuredTool
-from langchain.memory import ConversationBufferMemory
 from langchain_community.llms import LlamaCpp
 from langchain.prompts import PromptTemplate
 from langchain.callbacks.manager import CallbackManager
@@ -25,28 +26,51 @@ except ImportError:
     RAG_AVAILABLE = False
     print("RAG features unavailable. Install chromadb or faiss-cpu for RAG support.")
 
+from rag_index import load_or_build_index
+from kb_ingest import load_help_center
+from hybrid_search import HybridRetriever, snippet
+from query_embeddings import BatchingQueryEmbedder
+from agent_memory import TokenWindowMemory, IdleSummarizer, token_counter
+from agent_metrics import AgentRunMetrics, AgentMetrics
+from agent_router import history_text
+from tool_cache import ToolCache, add_coroutines
+from inference_worker import InferenceWorker, WorkerLLM
+from react_grammar import IterationHistogram
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Tools that block, run off the event loop by aprocess_query, and the threads for them
+BLOCKING_TOOLS = ["knowledge_search"]
+AGENT_TOOL_THREADS = int(os.environ.get("AGENT_TOOL_THREADS", "4"))
+
 # Import constants from the basic version
 from bigshorts_langchain_agent import (
     ALLOWED_CONTENT_TYPES, ALLOWED_ISSUE_TYPES, CONTENT_TYPE_MAPPING,
     CONTENT_GUIDES, ISSUE_SOLUTIONS,
     content_creation_tool_func, handle_issue_tool_func,
     platform_guide_tool_func, generate_interactive_ideas_func,
-    get_trending_content_func
+    get_trending_content_func, build_router, TOOL_TTLS, CATALOG_TOOLS, agent_llm,
+    STREAM_TO_STDOUT
 )
 
 
 class AdvancedBigShortsAgent:
     """Advanced agent with RAG, session management, and analytics"""
     
-    def __init__(self, model_path: str, enable_rag: bool = True):
-        """Initialize the advanced agent"""
+    def __init__(self, model_path: str, enable_rag: bool = True, stream_stdout: bool = STREAM_TO_STDOUT):
+        """Initialize the advanced agent
+        
+        stream_stdout echoes tokens and agent steps to stdout; otherwise
+        progress is only recorded as metrics (get_analytics, self.metrics).
+        """
         
         self.model_path = model_path
         self.enable_rag = enable_rag and RAG_AVAILABLE
+        self.stream_stdout = stream_stdout
         self.sessions: Dict[str, Dict] = {}
         
         # Initialize LLM
-        callback_manager = CallbackManager([StreamingStdOutCallbackHandler()])
+        callback_manager = CallbackManager([StreamingStdOutCallbackHandler()]) if stream_stdout else None
         
         self.llm = LlamaCpp(
             model_path=model_path,
@@ -61,81 +85,150 @@ class AdvancedBigShortsAgent:
             verbose=False,
         )
         
+        # Every generation runs on one inference thread, whether it comes from
+        # process_query (blocking), aprocess_query (awaited) or the summarizer
+        self.inference = InferenceWorker()
+        self.agent_model = WorkerLLM(llm=self.llm, worker=self.inference, callbacks=self.llm.callbacks)
+        
         # Initialize RAG if enabled
+        self.rag_stats = None
+        self.help_center = None
+        self.retriever = None
+        self.query_embeddings = None
         if self.enable_rag:
             self._setup_rag()
         
+        # Conversation memory is token-budgeted; older turns are summarized
+        # in the background while the model is idle. Summaries queue on the
+        # inference thread too: a cancelled query's generation may still be
+        # finishing there after model_in_use() has let go.
+        self.count_tokens = token_counter(self.llm)
+        self.summarizer = IdleSummarizer(self.agent_model)
+        
         # Create tools
         self.tools = self._create_tools()
         
+        # Cached tool results, rendered once as compact observations
+        self.tool_cache = ToolCache()
+        self.tool_cache.wrap_tools(self.tools, TOOL_TTLS)
+        self.tool_pool = ThreadPoolExecutor(max_workers=AGENT_TOOL_THREADS, thread_name_prefix="agent_tool")
+        add_coroutines(self.tools, BLOCKING_TOOLS, self.tool_pool)
+        
+        # Obvious requests go straight to a tool, skipping the LLM
+        self.router = build_router(self.tools)
+        
         # Create agent template
         self.prompt_template = self._create_prompt_template()
         
+        # One agent and executor serve every session. They hold no
+        # conversation state: each invoke gets the session's history as input.
+        # Agent steps are grammar-constrained when llama.cpp supports it.
+        react_llm, self.react_mode = agent_llm(self.agent_model, self.tools)
+        self.iteration_stats = IterationHistogram()
+        self.metrics = AgentMetrics()
+        self.agent = create_react_agent(
+            llm=react_llm,
+            tools=self.tools,
+            prompt=self.prompt_template
+        )
+        self.executor = AgentExecutor(
+            agent=self.agent,
+            tools=self.tools,
+            verbose=stream_stdout,
+            handle_parsing_errors=True,
+            max_iterations=5,
+            early_stopping_method="generate"
+        )
+        
         # Analytics
         self.analytics = {
             "total_queries": 0,
             "tool_usage": {},
             "popular_content_types": {},
-            "common_issues": {}
+            "common_issues": {},
+            "prompt_tokens": {"agent_queries": 0, "total": 0, "max": 0, "last": 0}
         }
     
     def _setup_rag(self):
-        """Setup RAG with vector store"""
+        """Setup RAG with vector store
+        
+        The index is saved under RAG_INDEX_DIR keyed by a hash of the documents
+        and the embedding model, and memory-mapped on later starts; documents
+        are only re-embedded when that hash changes.
+        """
         try:
-            # Create embeddings
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2"
-            )
+            started = time.perf_counter()
+            # Load the embedding model (still needed to embed queries)
+            self.embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+            model_loaded = time.perf_counter()
             
-            # Create knowledge base documents
-            documents = []
-            
-            # Add content guides to knowledge base
-            for content_type, guide in CONTENT_GUIDES.items():
-                doc_text = f"Content Type: {content_type}\n"
-                doc_text += f"Title: {guide['title']}\n\n"
-                for step in guide.get('steps', []):
-                    doc_text += f"Step {step['step']}: {step['description']}\n"
-                    if 'tips' in step:
-                        doc_text += f"Tip: {step['tips']}\n"
-                
-                documents.append(Document(
-                    page_content=doc_text,
-                    metadata={"type": "content_guide", "content_type": content_type}
-                ))
-            
-            # Add issue solutions to knowledge base
-            for issue_type, solution in ISSUE_SOLUTIONS.items():
-                documents.append(Document(
-                    page_content=f"Issue: {issue_type}\nSolution: {solution}",
-                    metadata={"type": "issue_solution", "issue_type": issue_type}
-                ))
-            
-            # Create vector store
-            self.vectorstore = FAISS.from_documents(documents, self.embeddings)
+            self.vectorstore, index_info = load_or_build_index(
+                self._knowledge_documents(), self.embeddings, EMBEDDING_MODEL
+            )
+            # Help-center articles ingested by kb_ingest.py, if any
+            self.help_center = load_help_center(self.embeddings)
+            # BM25 over the same documents, fused with the vector ranking.
+            # Queries are embedded through an LRU cache, and concurrent
+            # misses are encoded in one batch.
+            self.query_embeddings = BatchingQueryEmbedder(self.embeddings)
+            self.retriever = HybridRetriever([self.vectorstore, self.help_center], self.query_embeddings)
+            self.rag_stats = dict(
+                index_info,
+                help_center_chunks=self.help_center.index.ntotal if self.help_center is not None else 0,
+                model_load_seconds=round(model_loaded - started, 3),
+                startup_seconds=round(time.perf_counter() - started, 3)
+            )
             
-            print("RAG enabled: Knowledge base created with vector store")
+            print(f"RAG enabled: {index_info['documents']} documents, index {index_info['source']} "
+                  f"in {index_info['seconds']:.2f}s (RAG startup {self.rag_stats['startup_seconds']:.2f}s)")
             
         except Exception as e:
             print(f"RAG setup failed: {e}")
             self.enable_rag = False
     
+    def _knowledge_documents(self) -> List[Document]:
+        """Guides and issue solutions as vector store documents"""
+        documents = []
+        
+        # Add content guides to knowledge base
+        for content_type, guide in CONTENT_GUIDES.items():
+            doc_text = f"Content Type: {content_type}\n"
+            doc_text += f"Title: {guide['title']}\n\n"
+            for step in guide.get('steps', []):
+                doc_text += f"Step {step['step']}: {step['description']}\n"
+                if 'tips' in step:
+                    doc_text += f"Tip: {step['tips']}\n"
+            
+            documents.append(Document(
+                page_content=doc_text,
+                metadata={"type": "content_guide", "content_type": content_type}
+            ))
+        
+        # Add issue solutions to knowledge base
+        for issue_type, solution in ISSUE_SOLUTIONS.items():
+            documents.append(Document(
+                page_content=f"Issue: {issue_type}\nSolution: {solution}",
+                metadata={"type": "issue_solution", "issue_type": issue_type}
+            ))
+        
+        return documents
+    
     def _rag_search_tool(self, query: str) -> str:
         """Search the knowledge base using RAG"""
         if not self.enable_rag:
             return "RAG not available"
         
         try:
-            # Search for relevant documents
-            docs = self.vectorstore.similarity_search(query, k=3)
+            # Guides and help center, keyword and vector rankings fused
+            docs = self.retriever.search(query, k=3)
             
             if not docs:
                 return "No relevant information found"
             
-            # Format results
+            # Format results, each cut around the part that matched
             results = "Here's what I found in the knowledge base:\n\n"
             for i, doc in enumerate(docs, 1):
-                results += f"{i}. {doc.page_content[:200]}...\n\n"
+                results += f"{i}. {snippet(doc.page_content, query)}\n\n"
             
             return results
             
@@ -238,39 +331,69 @@ Current Question: {input}
         )
     
     def create_session(self, session_id: str) -> None:
-        """Create a new conversation session"""
+        """Create a new conversation session
+
+        A session is only its record: the conversation memory plus counters.
+        The agent and executor are shared.
+        """
         if session_id not in self.sessions:
-            memory = ConversationBufferMemory(
-                memory_key="chat_history",
-                return_messages=True
-            )
-            
-            agent = create_react_agent(
-                llm=self.llm,
-                tools=self.tools,
-                prompt=self.prompt_template
-            )
-            
-            executor = AgentExecutor(
-                agent=agent,
-                tools=self.tools,
-                memory=memory,
-                verbose=True,
-                handle_parsing_errors=True,
-                max_iterations=5,
-                early_stopping_method="generate"
-            )
-            
+            now = datetime.now().isoformat()
             self.sessions[session_id] = {
-                "executor": executor,
-                "memory": memory,
-                "created_at": datetime.now().isoformat(),
+                "memory": TokenWindowMemory(self.count_tokens),
+                "created_at": now,
                 "query_count": 0,
-                "last_activity": datetime.now().isoformat()
+                "last_activity": now,
+                "last_prompt_tokens": 0
             }
     
-    def process_query(self, user_input: str, session_id: str = "default") -> Union[str, dict]:
-        """Process a user query with session support"""
+    def process_query(self, user_input: str, session_id: str = "default", callbacks: Optional[list] = None) -> Union[str, dict]:
+        """Process a user query with session support
+
+        callbacks are LangChain callback handlers for this run only (e.g. to
+        stream agent steps and tokens to a client).
+        """
+        response = self._answer_directly(user_input, session_id)
+        if response is not None:
+            return response
+        
+        # Process through agent
+        try:
+            chat_history, _ = self.sessions[session_id]["memory"].render()
+            run = AgentRunMetrics(self.count_tokens)
+            with self.summarizer.model_in_use():
+                result = self.executor.invoke(
+                    {"input": user_input, "chat_history": chat_history},
+                    config={"callbacks": (callbacks or []) + [run]}
+                )
+            return self._finish_query(user_input, session_id, run, result)
+        except Exception as e:
+            return self._query_error(e)
+    
+    async def aprocess_query(self, user_input: str, session_id: str = "default", callbacks: Optional[list] = None) -> Union[str, dict]:
+        """process_query for an event loop: awaits the agent instead of holding a thread
+
+        LLM calls queue on the inference thread; cached tools run inline and
+        blocking ones on the tool pool. Cancelling the task stops the run at
+        its next token.
+        """
+        response = self._answer_directly(user_input, session_id)
+        if response is not None:
+            return response
+        
+        try:
+            chat_history, _ = self.sessions[session_id]["memory"].render()
+            run = AgentRunMetrics(self.count_tokens)
+            async with self.summarizer.amodel_in_use():
+                result = await self.executor.ainvoke(
+                    {"input": user_input, "chat_history": chat_history},
+                    config={"callbacks": (callbacks or []) + [run]}
+                )
+            return self._finish_query(user_input, session_id, run, result)
+        except Exception as e:
+            return self._query_error(e)
+    
+    def _answer_directly(self, user_input: str, session_id: str) -> Optional[dict]:
+        """Book the query, and answer it without the agent when possible (else None)"""
         
         # Create session if it doesn't exist
         self.create_session(session_id)
@@ -311,30 +434,62 @@ Current Question: {input}
             
             return content_creation_tool_func(content_type)
         
-        # Process through agent
-        try:
-            session = self.sessions[session_id]
-            result = session["executor"].invoke({"input": user_input})
-            
-            output = result.get("output", "I couldn't process that request.")
-            
-            if isinstance(output, dict):
-                return output
-            
-            return {"type": "message", "content": output}
-            
-        except Exception as e:
-            print(f"Error processing query: {e}")
-            return {
-                "type": "error",
-                "content": "I encountered an issue. Can I help you with creating SHOT, SNIP, SSUP, Mini, or Collab content?"
-            }
+        # Unambiguous requests: answer from the tool, no LLM calls
+        routed = self.router.route(user_input)
+        if routed is not None:
+            memory = self.sessions[session_id]["memory"]
+            memory.add_turn("human", user_input)
+            memory.add_turn("ai", history_text(routed))
+            return routed
+        
+        return None
+    
+    def _finish_query(self, user_input: str, session_id: str, run: AgentRunMetrics, result: Dict) -> dict:
+        """Record a finished agent run in analytics and memory; returns the response"""
+        session = self.sessions[session_id]
+        memory = session["memory"]
+        self._record_run(session, run)
+        
+        output = result.get("output", "I couldn't process that request.")
+        memory.add_turn("human", user_input)
+        memory.add_turn("ai", output if isinstance(output, str) else json.dumps(output))
+        if memory.needs_summary():
+            self.summarizer.schedule(memory)
+        
+        if isinstance(output, dict):
+            return output
+        
+        return {"type": "message", "content": output}
+    
+    def _query_error(self, error: Exception) -> dict:
+        print(f"Error processing query: {error}")
+        return {
+            "type": "error",
+            "content": "I encountered an issue. Can I help you with creating SHOT, SNIP, SSUP, Mini, or Collab content?"
+        }
+    
+    def _record_run(self, session: Dict, run: AgentRunMetrics) -> None:
+        """Feed one agent run's timings, tokens and tool calls to the analytics"""
+        self.metrics.record(run)
+        self.iteration_stats.record(self.react_mode, run.llm_calls, run.parse_errors)
+        for call in run.tool_records:
+            self.analytics["tool_usage"][call["name"]] = self.analytics["tool_usage"].get(call["name"], 0) + 1
+        
+        # Per-query prompt tokens, summed over the ReAct iterations
+        usage = self.analytics["prompt_tokens"]
+        usage["agent_queries"] += 1
+        usage["total"] += run.prompt_tokens
+        usage["max"] = max(usage["max"], run.prompt_tokens)
+        usage["last"] = run.prompt_tokens
+        session["last_prompt_tokens"] = run.prompt_tokens
+        if self.stream_stdout:
+            print(f"Prompt tokens: {run.prompt_tokens} over {run.llm_calls} LLM calls "
+                  f"(largest prompt {run.max_prompt_tokens})")
     
     def get_session_history(self, session_id: str = "default") -> List[str]:
-        """Get conversation history for a session"""
+        """Get conversation history for a session (turns not yet folded into its summary)"""
         if session_id in self.sessions:
-            memory = self.sessions[session_id]["memory"]
-            return [msg.content for msg in memory.chat_memory.messages]
+            return [text for _, text in self.sessions[session_id]["memory"].messages()]
         return []
     
     def get_analytics(self) -> Dict:
@@ -342,16 +497,30 @@ Current Question: {input}
         return {
             **self.analytics,
             "active_sessions": len(self.sessions),
+            "memory_summarizer": self.summarizer.stats(),
+            "pre_router": self.router.stats(),
+            "tool_cache": self.tool_cache.stats(),
+            "react_iterations": self.iteration_stats.stats(),
+            "agent_runs": self.metrics.stats(),
+            "inference_worker": self.inference.stats(),
+            "rag_index": self.rag_stats,
+            "rag_search": self.retriever.stats() if self.retriever is not None else None,
+            "query_embeddings": self.query_embeddings.stats() if self.query_embeddings is not None else None,
             "sessions": {
                 sid: {
                     "query_count": sdata["query_count"],
                     "created_at": sdata["created_at"],
+                    "last_prompt_tokens": sdata["last_prompt_tokens"],
                     "last_activity": sdata["last_activity"]
                 }
                 for sid, sdata in self.sessions.items()
             }
         }
     
+    def reload_catalog(self):
+        """Forget cached guide and issue answers (call after changing the catalog)"""
+        self.tool_cache.invalidate(CATALOG_TOOLS)
+    
     def save_analytics(self, filepath: str = "analytics.json"):
         """Save analytics to file"""
         with open(filepath, 'w') as f:
@@ -373,7 +542,7 @@ def run_advanced_agent():
         return
     
     print("Initializing Advanced BigShorts Agent...")
-    agent = AdvancedBigShortsAgent(model_path, enable_rag=True)
+    agent = AdvancedBigShortsAgent(model_path, enable_rag=True, stream_stdout=True)
     print("\nAdvanced Agent ready! Features: Multi-session, RAG, Analytics")
     print("Commands: 'exit' to quit, 'analytics' to view stats, 'new session' to start fresh\n")
     
@@ -0,0 +1,261 @@
+# Token-budgeted conversation memory for the LangChain agents
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Tokens of {chat_history} per prompt: running summary plus the newest turns
+HISTORY_TOKEN_BUDGET = int(os.environ.get("AGENT_HISTORY_TOKENS", "512"))
+# Longest summary the background summarizer writes
+SUMMARY_MAX_TOKENS = int(os.environ.get("AGENT_SUMMARY_TOKENS", "128"))
+# Turns that left the window but are not summarized yet; beyond this the
+# oldest are dropped so an always-busy model cannot make memory grow
+MAX_UNSUMMARIZED_TURNS = 20
+
+SUMMARY_PROMPT = """Progressively summarize the conversation between a BigShorts user and the assistant Gyan.Ai. Keep what the user wants to create, the problems they reported and any details they gave. Reply with the new summary only, in at most three sentences.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{lines}
+
+New summary:"""
+
+
+def token_counter(llm) -> Callable[[str], int]:
+    """llm.get_num_tokens when the model can tokenize, else a 4-characters-per-token estimate"""
+    try:
+        llm.get_num_tokens("BigShorts")
+        return llm.get_num_tokens
+    except Exception:
+        return lambda text: len(text) // 4 + 1
+
+
+class TokenWindowMemory:
+    """The newest turns that fit a token budget, plus a summary of older ones
+
+    render() never calls the model. Turns that no longer fit are left out of
+    the prompt until IdleSummarizer folds them into the summary.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int], budget: int = HISTORY_TOKEN_BUDGET):
+        self.count_tokens = count_tokens
+        self.budget = budget
+        self.summary = ""
+        self.summary_tokens = 0
+        self.dropped_turns = 0
+        # (role, text, tokens); _first is the absolute index of _turns[0]
+        self._turns: List[Tuple[str, str, int]] = []
+        self._first = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _line(role: str, text: str) -> str:
+        return f"{'Human' if role == 'human' else 'AI'}: {text}"
+
+    def _overflow(self) -> int:
+        """How many of the oldest turns do not fit the window (lock held)"""
+        room = self.budget - self.summary_tokens
+        used = 0
+        for index in range(len(self._turns) - 1, -1, -1):
+            used += self._turns[index][2]
+            if used > room:
+                return index + 1
+        return 0
+
+    def add_turn(self, role: str, text: str) -> None:
+        tokens = self.count_tokens(self._line(role, text))
+        with self._lock:
+            self._turns.append((role, text, tokens))
+            excess = self._overflow() - MAX_UNSUMMARIZED_TURNS
+            if excess > 0:
+                del self._turns[:excess]
+                self._first += excess
+                self.dropped_turns += excess
+
+    def render(self) -> Tuple[str, int]:
+        """Text for {chat_history} and its token count"""
+        with self._lock:
+            window = self._turns[self._overflow():]
+            lines = [f"Summary of earlier conversation: {self.summary}"] if self.summary else []
+            lines.extend(self._line(role, text) for role, text, _ in window)
+            return "\n".join(lines), self.summary_tokens + sum(tokens for _, _, tokens in window)
+
+    def needs_summary(self) -> bool:
+        with self._lock:
+            return self._overflow() > 0
+
+    def messages(self) -> List[Tuple[str, str]]:
+        """Turns still held verbatim, oldest first"""
+        with self._lock:
+            return [(role, text) for role, text, _ in self._turns]
+
+    def summarize(self, generate: Callable[[str, str], Optional[str]]) -> bool:
+        """Fold the turns outside the window into the summary
+
+        generate(summary, lines) returns the new summary, or None to give up
+        (the turns stay pending). Runs without the lock, so turns added
+        meanwhile are kept.
+        """
+        with self._lock:
+            count = self._overflow()
+            if not count:
+                return False
+            first = self._first
+            lines = "\n".join(self._line(role, text) for role, text, _ in self._turns[:count])
+            previous = self.summary
+        summary = generate(previous, lines)
+        if summary is None:
+            return False
+        tokens = self.count_tokens(summary)
+        with self._lock:
+            folded = first + count - self._first
+            if folded > 0:
+                del self._turns[:folded]
+                self._first += folded
+            self.summary = summary
+            self.summary_tokens = tokens
+        return True
+
+
+def _release(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class IdleSummarizer:
+    """Background thread that writes summaries while no query uses the model
+
+    Queries wrap their model use in model_in_use(), or amodel_in_use() on
+    an event loop. A summary only starts when no query is running or
+    waiting, and is abandoned at the next token once a query arrives, so a
+    request waits at most one token for it.
+    """
+
+    def __init__(self, llm, max_tokens: int = SUMMARY_MAX_TOKENS):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._summarizing = False
+        self._pending = deque()
+        self._queued = set()
+        # (loop, future) of async queries waiting for a summary to stop
+        self._released = []
+        self._thread = None
+        self.summaries = 0
+        self.abandoned = 0
+        self.failures = 0
+        self.summary_seconds = 0.0
+
+    @contextmanager
+    def model_in_use(self):
+        with self._cond:
+            self._waiting += 1
+            while self._summarizing:
+                self._cond.wait()
+            self._waiting -= 1
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    @asynccontextmanager
+    async def amodel_in_use(self):
+        """model_in_use() that waits for a running summary without blocking the loop"""
+        released = None
+        with self._cond:
+            self._waiting += 1
+            if self._summarizing:
+                loop = asyncio.get_running_loop()
+                released = loop.create_future()
+                self._released.append((loop, released))
+        try:
+            if released is not None:
+                await released
+        except BaseException:
+            with self._cond:
+                self._waiting -= 1
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            # No summary starts while we were waiting, so none is running now
+            self._waiting -= 1
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def schedule(self, memory: TokenWindowMemory) -> None:
+        with self._cond:
+            if memory in self._queued:
+                return
+            self._queued.add(memory)
+            self._pending.append(memory)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="memory_summarizer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending or self._active or self._waiting:
+                    self._cond.wait()
+                memory = self._pending.popleft()
+                self._queued.discard(memory)
+                self._summarizing = True
+            started = time.perf_counter()
+            abandoned = self.abandoned
+            try:
+                memory.summarize(self._generate)
+            except Exception as e:
+                # Dropped rather than retried at once; the session's next
+                # query schedules it again
+                self.failures += 1
+                print(f"Memory summary failed: {e}")
+            finally:
+                self.summary_seconds += time.perf_counter() - started
+                with self._cond:
+                    self._summarizing = False
+                    self._cond.notify_all()
+                    released, self._released = self._released, []
+                for loop, future in released:
+                    loop.call_soon_threadsafe(_release, future)
+            if self.abandoned > abandoned and memory.needs_summary():
+                # Abandoned for a query; pick it up again once the model is idle
+                self.schedule(memory)
+
+    def _generate(self, summary: str, lines: str) -> Optional[str]:
+        prompt = SUMMARY_PROMPT.format(summary=summary or "(none yet)", lines=lines)
+        pieces = []
+        for chunk in self.llm.stream(prompt, stop=["\n\n"]):
+            if self._waiting:
+                self.abandoned += 1
+                return None
+            pieces.append(chunk)
+            if len(pieces) >= self.max_tokens:
+                break
+        self.summaries += 1
+        return "".join(pieces).strip()
+
+    def stats(self) -> Dict:
+        return {
+            "pending": len(self._pending),
+            "summaries": self.summaries,
+            "abandoned": self.abandoned,
+            "failures": self.failures,
+            "summary_seconds": round(self.summary_seconds, 2)
+        }
+
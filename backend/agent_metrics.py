@@ -0,0 +1,198 @@
+# Per-query timing and token metrics for the LangChain agents
+#
+# AgentRunMetrics is attached to one AgentExecutor run. It times every LLM
+# call (prefill = start to first streamed token, decode = first token to
+# end), counts prompt and completion tokens, and times every tool call.
+# AgentMetrics aggregates finished runs for get_analytics() and a Prometheus
+# registry (api_server serves it at /metrics).
+import threading
+import time
+from typing import Any, Callable, Dict, List
+from uuid import UUID
+
+from langchain.callbacks.base import BaseCallbackHandler
+
+from metrics import MetricsRegistry, LATENCY_BUCKETS, TOKEN_BUCKETS, TOKENS_PER_SECOND_BUCKETS
+
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 6, 8)
+
+
+class AgentRunMetrics(BaseCallbackHandler):
+    """Callback handler recording one agent run's LLM and tool calls"""
+
+    # Cheap and non-blocking: on async runs call it on the loop rather than
+    # hopping to a thread for every token
+    run_inline = True
+
+    def __init__(self, count_tokens: Callable[[str], int]):
+        self.count_tokens = count_tokens
+        # Finished calls
+        self.llm_records: List[Dict] = []
+        self.tool_records: List[Dict] = []
+        self.parse_errors = 0
+        # In flight, by run id
+        self._llm: Dict[UUID, Dict] = {}
+        self._tools: Dict[UUID, Dict] = {}
+
+    # Totals over the run's LLM calls
+
+    @property
+    def llm_calls(self) -> int:
+        return len(self.llm_records)
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(record["prompt_tokens"] for record in self.llm_records)
+
+    @property
+    def max_prompt_tokens(self) -> int:
+        return max((record["prompt_tokens"] for record in self.llm_records), default=0)
+
+    @property
+    def completion_tokens(self) -> int:
+        return sum(record["completion_tokens"] for record in self.llm_records)
+
+    # LLM calls
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs) -> None:
+        self._llm[run_id] = {
+            "started": time.perf_counter(),
+            "first_token": None,
+            "tokens": 0,
+            "prompt_tokens": sum(self.count_tokens(prompt) for prompt in prompts)
+        }
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs) -> None:
+        call = self._llm.get(run_id)
+        if call is None:
+            return
+        if call["first_token"] is None:
+            call["first_token"] = time.perf_counter()
+        call["tokens"] += 1
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        call = self._llm.pop(run_id, None)
+        if call is None:
+            return
+        ended = time.perf_counter()
+        tokens = call["tokens"]
+        if not tokens:
+            # Not streamed: count the text, and the whole call is prefill
+            text = "".join(g.text for generations in response.generations for g in generations)
+            tokens = self.count_tokens(text) if text else 0
+        first_token = call["first_token"] or ended
+        self.llm_records.append({
+            "prompt_tokens": call["prompt_tokens"],
+            "completion_tokens": tokens,
+            "prefill_seconds": first_token - call["started"],
+            "decode_seconds": ended - first_token
+        })
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._llm.pop(run_id, None)
+
+    # Tool calls
+
+    def on_agent_action(self, action, **kwargs) -> None:
+        if action.tool == "_Exception":
+            # handle_parsing_errors turned an unparsable step into this
+            self.parse_errors += 1
+
+    def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs) -> None:
+        self._tools[run_id] = {"name": (serialized or {}).get("name", "unknown"), "started": time.perf_counter()}
+
+    def _tool_done(self, run_id: UUID, ok: bool) -> None:
+        call = self._tools.pop(run_id, None)
+        if call is not None:
+            self.tool_records.append({"name": call["name"], "seconds": time.perf_counter() - call["started"],
+                                      "ok": ok})
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs) -> None:
+        self._tool_done(run_id, True)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs) -> None:
+        self._tool_done(run_id, False)
+
+
+class AgentMetrics:
+    """Totals over finished agent runs, plus Prometheus series for them"""
+
+    def __init__(self, prefix: str = "bigshorts_agent"):
+        self.registry = MetricsRegistry()
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.prefill_seconds = 0.0
+        self.decode_seconds = 0.0
+        self.tools: Dict[str, Dict] = {}
+
+        registry = self.registry
+        self._queries = registry.counter(f"{prefix}_queries_total", "Agent runs finished")
+        self._iterations = registry.histogram(
+            f"{prefix}_iterations", "LLM calls per agent run", ITERATION_BUCKETS)
+        self._parse_errors = registry.counter(f"{prefix}_parse_errors_total", "Agent steps that did not parse")
+        self._prompt_tokens = registry.histogram(
+            f"{prefix}_llm_prompt_tokens", "Prompt tokens per LLM call", TOKEN_BUCKETS)
+        self._completion_tokens = registry.histogram(
+            f"{prefix}_llm_completion_tokens", "Completion tokens per LLM call", TOKEN_BUCKETS)
+        self._prefill = registry.histogram(
+            f"{prefix}_llm_prefill_seconds", "LLM call start to first token")
+        self._decode = registry.histogram(
+            f"{prefix}_llm_decode_seconds", "LLM call first token to end")
+        self._decode_rate = registry.histogram(
+            f"{prefix}_llm_decode_tokens_per_second", "Decode throughput per LLM call", TOKENS_PER_SECOND_BUCKETS)
+        self._tool_seconds = registry.histogram(
+            f"{prefix}_tool_seconds", "Tool call latency", LATENCY_BUCKETS, labelnames=("tool",))
+        self._tool_calls = registry.counter(
+            f"{prefix}_tool_calls_total", "Tool calls", ("tool", "status"))
+
+    def record(self, run: AgentRunMetrics) -> None:
+        self._queries.inc()
+        self._iterations.observe(run.llm_calls)
+        if run.parse_errors:
+            self._parse_errors.inc(amount=run.parse_errors)
+        for call in run.llm_records:
+            self._prompt_tokens.observe(call["prompt_tokens"])
+            self._completion_tokens.observe(call["completion_tokens"])
+            self._prefill.observe(call["prefill_seconds"])
+            self._decode.observe(call["decode_seconds"])
+            if call["decode_seconds"] > 0 and call["completion_tokens"] > 1:
+                self._decode_rate.observe((call["completion_tokens"] - 1) / call["decode_seconds"])
+        for call in run.tool_records:
+            self._tool_seconds.observe(call["seconds"], call["name"])
+            self._tool_calls.inc(call["name"], "ok" if call["ok"] else "error")
+
+        with self._lock:
+            self.queries += 1
+            self.llm_calls += run.llm_calls
+            self.prompt_tokens += run.prompt_tokens
+            self.completion_tokens += run.completion_tokens
+            self.prefill_seconds += sum(call["prefill_seconds"] for call in run.llm_records)
+            self.decode_seconds += sum(call["decode_seconds"] for call in run.llm_records)
+            for call in run.tool_records:
+                tool = self.tools.setdefault(call["name"], {"calls": 0, "errors": 0, "seconds": 0.0})
+                tool["calls"] += 1
+                tool["errors"] += not call["ok"]
+                tool["seconds"] += call["seconds"]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            calls = self.llm_calls
+            return {
+                "queries": self.queries,
+                "llm_calls": calls,
+                "avg_iterations": round(calls / self.queries, 2) if self.queries else 0.0,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "avg_prefill_seconds": round(self.prefill_seconds / calls, 3) if calls else 0.0,
+                "avg_decode_seconds": round(self.decode_seconds / calls, 3) if calls else 0.0,
+                "decode_tokens_per_second": round(self.completion_tokens / self.decode_seconds, 1)
+                if self.decode_seconds else 0.0,
+                "tools": {
+                    name: {"calls": tool["calls"], "errors": tool["errors"],
+                           "avg_ms": round(tool["seconds"] / tool["calls"] * 1000, 2)}
+                    for name, tool in sorted(self.tools.items())
+                }
+            }
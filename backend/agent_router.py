@@ -0,0 +1,186 @@
+# Deterministic pre-routing for the LangChain agents
+#
+# "How do I create a snip?" needs no reasoning: the keyword and alias tables
+# already say which tool answers it and with what argument. PreRouter catches
+# such requests before AgentExecutor, calls the tool directly and returns its
+# structured output without a single LLM call. Anything ambiguous (several
+# content types or issues, a term the tools have no answer for, negated or
+# compound requests, verbs no tool serves) still goes to the agent.
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Queries longer than this are usually compound; leave them to the agent
+MAX_ROUTED_WORDS = 16
+
+# Extra phrasings of the issue types, beyond their own names
+ISSUE_KEYWORDS = {
+    "login": ["log in", "logging in", "sign in", "signing in", "log into", "logged out"],
+    "upload": ["uploading", "uploads", "posting"],
+    "notification": ["notifications", "alerts", "push"],
+    "password": ["forgot password", "reset password"],
+    "connection": ["offline", "internet", "wifi"],
+}
+
+_PROBLEM = re.compile(
+    r"\b(can ?not|can'?t|unable|won'?t|doesn'?t|isn'?t|not (working|loading|showing|getting|receiving)|"
+    r"fail(s|ed|ing)?|error|issue|problem|trouble|stuck|broken|crash(es|ed|ing)?)\b"
+)
+# Only the bare "create a <type>" shape: "share a snip to instagram" or "add
+# music to my snip" is a different question the creation guide doesn't answer
+_CREATE = re.compile(
+    r"^((hi|hey|hello) )?(how (do|can|should|would) (i|you) |how to |(can|could) i |i (want|need|would like) to |"
+    r"help me |steps to )?(create|make|post|record|film|shoot|start|publish) (an? |my |the )?(new )?(?P<what>[\w' ]+)$"
+)
+# Any verb acting on the content; "what is sharing a snip" is not a definition
+_ACTION = re.compile(
+    r"\b(creat(e|ing)|mak(e|ing)|post(ing)?|shar(e|ing)|record(ing)?|film(ing)?|shoot(ing)?|start(ing)?|"
+    r"publish(ing)?|upload(ing)?|add(ing)?|new)\b"
+)
+_DEFINE = re.compile(r"^(what'?s|what is|what are|tell me about|explain)\b")
+# Requests to see what is trending, not "how do I make my snip go viral"
+_TRENDING = re.compile(
+    r"^((hi|hey|hello) )?((can you |please )?(show|list|give|find|tell)( me)?|what'?s|what is|what are|which)\b"
+    r".*\b(trending|popular|viral|hot right now)\b|^(trending|popular|viral)\b"
+)
+_IDEAS = re.compile(r"\binteractive\b.*\bideas?\b|\bideas?\b.*\binteractive\b")
+# Negation outside a problem phrase: "how do I not create a snip"
+_NEGATION = re.compile(r"\b(no|not|never|don'?t|didn'?t|without|stop|instead|rather)\b")
+# Things no tool does; "can't cancel my upload" is not an upload issue
+_OTHER_INTENT = re.compile(
+    r"\b(delete|deleting|remove|removing|cancel(l?ing)?|deactivate|unsubscribe|block|unblock|report|"
+    r"download|hide|undo|restore|recover|refund|disable|turn off|archive|transfer)\b"
+)
+# Clause boundaries; a second clause of two or more words is a second request
+_CLAUSE = re.compile(r"[?.!,;]+|\b(but|also|however|although|though|then)\b")
+
+
+def _phrase_pattern(phrase: str) -> re.Pattern:
+    # Whole words, plural allowed: "snips", "stories" stay separate entries
+    return re.compile(r"\b" + re.escape(phrase.lower()) + r"s?\b")
+
+
+class PreRouter:
+    """Maps unambiguous requests straight to a tool call
+
+    content_types and aliases come from the agent module (ALLOWED_CONTENT_TYPES,
+    CONTENT_TYPE_MAPPING); guides, issue_solutions and sections are the keys
+    the tools can actually answer for. tools maps tool names to plain
+    callables.
+    """
+
+    def __init__(self, tools: Dict[str, Callable], content_types: Iterable[str], aliases: Dict[str, str],
+                 guides: Iterable[str], issue_types: Iterable[str], issue_solutions: Iterable[str],
+                 sections: Iterable[str]):
+        self.tools = tools
+        self.guides = {key.lower() for key in guides}
+        self.issue_solutions = {key.lower() for key in issue_solutions}
+        self.sections = {key.lower() for key in sections}
+
+        # Longest phrases first, so "snip to mini" wins over "snip" and "mini"
+        phrases: Dict[str, str] = {ct.lower(): ct.lower() for ct in content_types}
+        phrases.update({alias.lower(): target.lower() for alias, target in aliases.items()})
+        self._content = [(_phrase_pattern(phrase), target)
+                         for phrase, target in sorted(phrases.items(), key=lambda item: -len(item[0]))]
+
+        issues: Dict[str, str] = {issue.lower(): issue.lower() for issue in issue_types}
+        for issue, keywords in ISSUE_KEYWORDS.items():
+            issues.update({keyword: issue for keyword in keywords})
+        self._issues = [(_phrase_pattern(phrase), target)
+                        for phrase, target in sorted(issues.items(), key=lambda item: -len(item[0]))]
+
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.routed = 0
+        self.by_tool: Dict[str, int] = {}
+
+    @staticmethod
+    def _mentions(text: str, patterns: List[Tuple[re.Pattern, str]]) -> set:
+        found = set()
+        for pattern, target in patterns:
+            text, count = pattern.subn(" ", text)
+            if count:
+                found.add(target)
+        return found
+
+    def _content_named(self, phrase: str) -> Optional[str]:
+        """The content type `phrase` names in full, if any"""
+        for pattern, target in self._content:
+            if pattern.fullmatch(phrase.strip()):
+                return target
+        return None
+
+    @staticmethod
+    def _compound(user_input: str) -> bool:
+        clauses = [part for part in _CLAUSE.split(user_input.lower()) if part and len(part.split()) >= 2]
+        return len(clauses) > 1
+
+    def match(self, user_input: str) -> Optional[Tuple[str, tuple]]:
+        """(tool name, args) for an unambiguous request, else None
+
+        Only matches when the tool has a real answer for the argument;
+        otherwise the agent may still find one with its other tools.
+        """
+        text = " ".join(re.sub(r"[^\w' ]+", " ", user_input.lower()).split())
+        if not text or len(text.split()) > MAX_ROUTED_WORDS:
+            return None
+        if self._compound(user_input) or _OTHER_INTENT.search(text):
+            return None
+        # "can't" and "not working" describe the problem; any other negation
+        # may turn the request around
+        if _NEGATION.search(_PROBLEM.sub(" ", text)):
+            return None
+
+        if _PROBLEM.search(text):
+            # "video" or "app" often ride along; count the issues we can solve
+            issues = self._mentions(text, self._issues) & self.issue_solutions
+            return ("handle_issue", (issues.pop(),)) if len(issues) == 1 else None
+        if _IDEAS.search(text):
+            return "interactive_ideas", ()
+
+        content = self._mentions(text, self._content)
+        if _TRENDING.search(text):
+            # "what's trending on snips" asks something the tool can't narrow down
+            return None if content else ("trending_content", ())
+        if len(content) != 1:
+            return None
+        target = content.pop()
+        creating = _CREATE.search(text)
+        if creating and self._content_named(creating.group("what")) == target and target in self.guides:
+            return "content_creation_guide", (target,)
+        if not _ACTION.search(text) and _DEFINE.search(text) and target in self.sections:
+            return "platform_guide", (target,)
+        return None
+
+    def route(self, user_input: str) -> Optional[dict]:
+        """The tool's structured answer for an unambiguous request, else None"""
+        matched = self.match(user_input)
+        with self._lock:
+            self.queries += 1
+            if matched is not None:
+                self.routed += 1
+                self.by_tool[matched[0]] = self.by_tool.get(matched[0], 0) + 1
+        if matched is None:
+            return None
+        tool, args = matched
+        output = self.tools[tool](*args)
+        if isinstance(output, dict):
+            return output
+        return {"type": "message", "content": output}
+
+    def stats(self) -> Dict:
+        return {
+            "queries": self.queries,
+            "routed": self.routed,
+            "routed_fraction": round(self.routed / self.queries, 3) if self.queries else 0.0,
+            "by_tool": dict(self.by_tool)
+        }
+
+
+def history_text(response: dict) -> str:
+    """Short conversation-memory line for a routed answer (guides are too long to keep)"""
+    content = response.get("content")
+    if isinstance(content, str):
+        return content
+    title = content.get("title") or content.get("message") if isinstance(content, dict) else None
+    return f"[Showed {response.get('type', 'an answer')}{': ' + title if title else ''}]"
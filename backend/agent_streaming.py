@@ -0,0 +1,188 @@
+# Bridge from a LangChain agent run to an asyncio consumer (WebSocket frames)
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, AsyncIterator, Dict, Optional
+
+from langchain.callbacks.base import AsyncCallbackHandler, BaseCallbackHandler
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+# Tool observations can be whole guides; progress frames only carry a preview
+OBSERVATION_PREVIEW_CHARS = 500
+
+# Queued by close() after the last frame when there is room
+_END = {"type": "end"}
+
+
+class StreamCancelled(Exception):
+    """Raised inside the agent run once the consumer has gone away"""
+
+
+class _FrameQueue:
+    """Bounded frame queue read by frames(), and the frames agent callbacks produce"""
+
+    def __init__(self, maxsize: int, put_timeout: float):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._put_timeout = put_timeout
+        self._cancelled = threading.Event()
+        self._closed = False
+        self._buffer = ""
+        self._in_final_answer = False
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def _finish(self) -> None:
+        self._closed = True
+        if not self._queue.full():
+            self._queue.put_nowait(_END)
+
+    async def frames(self) -> AsyncIterator[Dict]:
+        """Yield frames until close(), merging tokens that queued up meanwhile"""
+        pending = None
+        while True:
+            if pending is None:
+                if self._closed and self._queue.empty():
+                    return
+                frame = await self._queue.get()
+            else:
+                frame, pending = pending, None
+            if frame is _END:
+                return
+            if frame["type"] == "token":
+                text = frame["token"]
+                while not self._queue.empty():
+                    following = self._queue.get_nowait()
+                    if following is _END or following["type"] != "token":
+                        pending = following
+                        break
+                    text += following["token"]
+                frame = dict(frame, token=text)
+            yield frame
+
+    def _start_completion(self) -> None:
+        # Each ReAct iteration is a new completion; only the one that writes
+        # the final answer streams tokens
+        self._buffer = ""
+        self._in_final_answer = False
+
+    def _token_frame(self, token: str) -> Optional[Dict]:
+        if self._in_final_answer:
+            return {"type": "token", "token": token, "final": False}
+        self._buffer += token
+        if FINAL_ANSWER_MARKER in self._buffer:
+            self._in_final_answer = True
+            rest = self._buffer.split(FINAL_ANSWER_MARKER, 1)[1].lstrip()
+            if rest:
+                return {"type": "token", "token": rest, "final": False}
+        return None
+
+    @staticmethod
+    def _step_frame(action) -> Dict:
+        thought = action.log.split("Action:", 1)[0].replace("Thought:", "").strip()
+        return {"type": "step", "tool": action.tool, "tool_input": action.tool_input,
+                "thought": thought, "final": False}
+
+    @staticmethod
+    def _observation_frame(output: Any) -> Dict:
+        return {"type": "observation", "observation": str(output)[:OBSERVATION_PREVIEW_CHARS], "final": False}
+
+
+class AgentEventStream(_FrameQueue, BaseCallbackHandler):
+    """Callback handler that turns agent progress into frames for a WebSocket
+
+    Frames are plain dicts with a "type" of "step" (the agent chose a tool),
+    "observation" (the tool returned) or "token" (final-answer text), all with
+    "final": False. They pass through a bounded queue: when the client reads
+    slowly, the agent thread blocks in the callback (backpressure) for up to
+    `put_timeout` seconds before the run is abandoned. Once cancel() is called
+    the next callback raises StreamCancelled, which stops the AgentExecutor.
+
+    Create it on the event loop; callbacks run in the worker thread.
+    """
+
+    # Let StreamCancelled propagate out of the callback manager
+    raise_error = True
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = 64, put_timeout: float = 30.0):
+        super().__init__(maxsize, put_timeout)
+        self._loop = loop
+
+    def _emit(self, frame: Optional[Dict]) -> None:
+        if self._cancelled.is_set():
+            raise StreamCancelled()
+        if frame is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._queue.put(frame), self._loop)
+        try:
+            future.result(self._put_timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            self._cancelled.set()
+            raise StreamCancelled("client stopped reading")
+
+    def close(self) -> None:
+        """Mark the end of the stream (call from the worker when the run ends)
+
+        Never blocks, so a run abandoned on a stalled client still ends the
+        consumer's iteration once it drains the queue.
+        """
+        self._loop.call_soon_threadsafe(self._finish)
+
+    # LangChain callbacks (worker thread)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts, **kwargs) -> None:
+        self._start_completion()
+
+    def on_llm_new_token(self, token: str, **kwargs) -> None:
+        self._emit(self._token_frame(token))
+
+    def on_agent_action(self, action, **kwargs) -> None:
+        self._emit(self._step_frame(action))
+
+    def on_tool_end(self, output: Any, **kwargs) -> None:
+        self._emit(self._observation_frame(output))
+
+
+class AsyncAgentEventStream(_FrameQueue, AsyncCallbackHandler):
+    """AgentEventStream for runs awaited on the event loop (AgentExecutor.ainvoke)
+
+    Same frames, queue and backpressure, but the callbacks await the queue
+    instead of blocking a thread. Cancelling the task running the agent is
+    the usual way to stop it; cancel() also works.
+    """
+
+    raise_error = True
+
+    def __init__(self, maxsize: int = 64, put_timeout: float = 30.0):
+        super().__init__(maxsize, put_timeout)
+
+    async def _emit(self, frame: Optional[Dict]) -> None:
+        if self._cancelled.is_set():
+            raise StreamCancelled()
+        if frame is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.put(frame), self._put_timeout)
+        except asyncio.TimeoutError:
+            self._cancelled.set()
+            raise StreamCancelled("client stopped reading")
+
+    def close(self) -> None:
+        """Mark the end of the stream (call on the loop when the run ends)"""
+        self._finish()
+
+    # LangChain callbacks (event loop)
+
+    async def on_llm_start(self, serialized: Dict[str, Any], prompts, **kwargs) -> None:
+        self._start_completion()
+
+    async def on_llm_new_token(self, token: str, **kwargs) -> None:
+        await self._emit(self._token_frame(token))
+
+    async def on_agent_action(self, action, **kwargs) -> None:
+        await self._emit(self._step_frame(action))
+
+    async def on_tool_end(self, output: Any, **kwargs) -> None:
+        await self._emit(self._observation_frame(output))
@@ -1,11 +1,19 @@
 # FastAPI Wrapper for BigShorts LangChain Agent
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+import asyncio
+import os
+import weakref
 import uvicorn
 
 from advanced_bigshorts_agent import AdvancedBigShortsAgent
+from agent_streaming import AgentEventStream, AsyncAgentEventStream
+from metrics import MetricsRegistry
 
 # Initialize FastAPI
 app = FastAPI(
@@ -26,6 +34,98 @@ app.add_middleware(
 # Initialize agent (singleton)
 agent = None
 
+# Queries run as agent.aprocess_query on the event loop: a query waiting for
+# the model (the agent's inference thread) holds no thread of its own. With
+# AGENT_ASYNC=0 they run the blocking process_query in a thread pool instead.
+AGENT_ASYNC = os.environ.get("AGENT_ASYNC", "1") == "1"
+# Threads for the blocking path. Generations are serialized on the inference
+# thread either way; more threads only let tool calls and prompt rendering overlap.
+AGENT_CONCURRENCY = int(os.environ.get("AGENT_CONCURRENCY", "1"))
+# Admission control: queries running or waiting beyond this are turned away
+# with 503, and a query that waits AGENT_QUEUE_TIMEOUT seconds for a worker gives up
+AGENT_MAX_PENDING = int(os.environ.get("AGENT_MAX_PENDING", "16"))
+AGENT_QUEUE_TIMEOUT = float(os.environ.get("AGENT_QUEUE_TIMEOUT", "30"))
+# WebSocket streaming: frames buffered per connection before the agent thread
+# waits for the client, and how long it waits before abandoning the run
+WS_BUFFER_FRAMES = int(os.environ.get("WS_BUFFER_FRAMES", "64"))
+WS_SEND_TIMEOUT = float(os.environ.get("WS_SEND_TIMEOUT", "30"))
+
+agent_pool = ThreadPoolExecutor(max_workers=AGENT_CONCURRENCY, thread_name_prefix="agent_worker")
+# Async queries cost no thread, so every admitted query may run
+agent_slots = asyncio.Semaphore(AGENT_MAX_PENDING if AGENT_ASYNC else AGENT_CONCURRENCY)
+# One query at a time per session, since a session's memory is not thread-safe
+session_locks = weakref.WeakValueDictionary()
+admission = {"pending": 0, "running": 0, "completed": 0, "rejected": 0, "timed_out": 0}
+
+# Prometheus metrics at /metrics: admission here, agent runs in agent.metrics
+metrics_registry = MetricsRegistry()
+for _name, _help in (("pending", "Agent queries waiting for a worker"),
+                     ("running", "Agent queries running")):
+    metrics_registry.gauge(f"bigshorts_agent_{_name}", _help, func=partial(admission.get, _name))
+for _name, _help in (("completed", "Agent queries finished"),
+                     ("rejected", "Agent queries turned away at admission"),
+                     ("timed_out", "Agent queries that gave up waiting for a worker")):
+    metrics_registry.gauge(f"bigshorts_agent_{_name}_total", _help, func=partial(admission.get, _name))
+
+
+class AgentBusy(Exception):
+    """No capacity for another agent query right now"""
+
+
+@asynccontextmanager
+async def agent_slot(session_id: str):
+    """Admit a query and hold a worker slot for it, or raise AgentBusy"""
+    if admission["pending"] + admission["running"] >= AGENT_MAX_PENDING:
+        admission["rejected"] += 1
+        raise AgentBusy("Too many queries in progress")
+    admission["pending"] += 1
+    admitted = False
+    try:
+        lock = session_locks.get(session_id)
+        if lock is None:
+            lock = session_locks[session_id] = asyncio.Lock()
+        async with lock:
+            try:
+                await asyncio.wait_for(agent_slots.acquire(), AGENT_QUEUE_TIMEOUT)
+            except asyncio.TimeoutError:
+                admission["timed_out"] += 1
+                raise AgentBusy("Timed out waiting for an agent worker")
+            admission["pending"] -= 1
+            admission["running"] += 1
+            admitted = True
+            try:
+                yield
+            finally:
+                agent_slots.release()
+                admission["running"] -= 1
+                admission["completed"] += 1
+    finally:
+        if not admitted:
+            admission["pending"] -= 1
+
+
+async def run_agent_query(message: str, session_id: str) -> Dict:
+    """agent.aprocess_query (or process_query in a worker thread), under admission control"""
+    async with agent_slot(session_id):
+        if AGENT_ASYNC:
+            return await agent.aprocess_query(message, session_id)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(agent_pool, agent.process_query, message, session_id)
+
+
+def _run_streaming(message: str, session_id: str, stream: AgentEventStream) -> Dict:
+    try:
+        return agent.process_query(message, session_id, callbacks=[stream])
+    finally:
+        stream.close()
+
+
+async def _arun_streaming(message: str, session_id: str, stream: AsyncAgentEventStream) -> Dict:
+    try:
+        return await agent.aprocess_query(message, session_id, callbacks=[stream])
+    finally:
+        stream.close()
+
 # Request/Response models
 class QueryRequest(BaseModel):
     message: str
@@ -47,9 +147,16 @@ class AnalyticsResponse(BaseModel):
 async def startup_event():
     global agent
     model_path = "models/mistral-7b-instruct-v0.2.Q4_K_M.gguf"
-    agent = AdvancedBigShortsAgent(model_path, enable_rag=True)
+    loop = asyncio.get_running_loop()
+    agent = await loop.run_in_executor(agent_pool, partial(AdvancedBigShortsAgent, model_path, enable_rag=True))
     print("BigShorts Agent initialized and ready!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    agent_pool.shutdown(wait=True)
+    if agent is not None:
+        agent.inference.shutdown()
+
 # Health check
 @app.get("/")
 async def root():
@@ -62,7 +169,22 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "agent_ready": agent is not None}
+    return {
+        "status": "healthy",
+        "agent_ready": agent is not None,
+        "agent_async": AGENT_ASYNC,
+        "agent_concurrency": AGENT_CONCURRENCY,
+        "max_pending": AGENT_MAX_PENDING,
+        "queries": dict(admission)
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus text-format metrics: admission, LLM calls, tools and iterations"""
+    body = metrics_registry.render()
+    if agent is not None:
+        body += agent.metrics.registry.render()
+    return Response(content=body, media_type=metrics_registry.content_type)
 
 # Query endpoint
 @app.post("/query", response_model=QueryResponse)
@@ -72,11 +194,13 @@ async def process_query(request: QueryRequest):
         raise HTTPException(status_code=503, detail="Agent not initialized")
     
     try:
-        response = agent.process_query(request.message, request.session_id)
+        response = await run_agent_query(request.message, request.session_id)
         return QueryResponse(
             response=response,
             session_id=request.session_id
         )
+    except AgentBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -143,9 +267,43 @@ async def get_issue_types():
 from fastapi import WebSocket
 from fastapi.websockets import WebSocketDisconnect
 
+async def stream_agent_query(websocket: WebSocket, message: str, session_id: str) -> Dict:
+    """Run one query, sending step/observation/token frames while it runs
+
+    Returns the agent's response; the caller sends it as the final frame.
+    """
+    loop = asyncio.get_running_loop()
+    if AGENT_ASYNC:
+        stream = AsyncAgentEventStream(maxsize=WS_BUFFER_FRAMES, put_timeout=WS_SEND_TIMEOUT)
+    else:
+        stream = AgentEventStream(loop, maxsize=WS_BUFFER_FRAMES, put_timeout=WS_SEND_TIMEOUT)
+    async with agent_slot(session_id):
+        if AGENT_ASYNC:
+            future = asyncio.ensure_future(_arun_streaming(message, session_id, stream))
+        else:
+            future = loop.run_in_executor(agent_pool, _run_streaming, message, session_id, stream)
+        try:
+            async for frame in stream.frames():
+                await websocket.send_json(frame)
+            return await future
+        except BaseException:
+            # Client gone: stop the agent (an async run is cancelled outright,
+            # a thread at its next callback), and keep the slot until it has
+            # actually let go
+            if AGENT_ASYNC:
+                future.cancel()
+            stream.cancel()
+            await asyncio.wait({future})
+            raise
+
 @app.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
-    """WebSocket endpoint for real-time chat"""
+    """WebSocket endpoint for real-time chat
+
+    For each message the server sends progress frames ("step",
+    "observation", "token") with "final": false, then the response with
+    "final": true.
+    """
     await websocket.accept()
     
     try:
@@ -153,11 +311,20 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             # Receive message
             message = await websocket.receive_text()
             
-            # Process with agent
-            response = agent.process_query(message, session_id)
+            if not agent:
+                await websocket.send_json({"type": "error", "content": "Agent not initialized", "final": True})
+                continue
+            
+            # Process with agent, streaming its progress
+            try:
+                response = await stream_agent_query(websocket, message, session_id)
+            except AgentBusy as e:
+                response = {"type": "error", "content": str(e), "busy": True}
+            if not isinstance(response, dict):
+                response = {"type": "message", "content": str(response)}
             
             # Send response
-            await websocket.send_json(response)
+            await websocket.send_json({**response, "final": True})
             
     except WebSocketDisconnect:
         print(f"WebSocket disconnected for session: {session_id}")
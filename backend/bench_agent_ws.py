@@ -0,0 +1,202 @@
+# WebSocket benchmark: blocking vs async agent path in api_server
+#
+# Serves api_server.app with uvicorn on a local port and opens --sessions
+# concurrent /ws/{session_id} connections. Each sends --queries questions that
+# go through the ReAct agent (not the greeting/FAQ/router shortcuts) and
+# waits for the final frame. The server side reports peak threads and peak RSS.
+# Each mode runs in its own interpreter because AGENT_ASYNC is read at import:
+#
+#   python bench_agent_ws.py                       # 128 sessions, simulated model
+#   python bench_agent_ws.py --sessions 256 --queries 3
+#   python bench_agent_ws.py --model models/mistral-7b-instruct-v0.2.Q4_K_M.gguf
+#
+# Without --model the agent gets SimulatedLlama, which sleeps (releasing the
+# GIL, as llama.cpp does) for a fixed prefill and per-token time. Generations
+# are serialized on the inference thread in both modes, so throughput is
+# bounded by the model either way; the comparison is what the server spends
+# on waiting sessions (threads, memory, latency overhead).
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from latency_histogram import LatencyHistogram
+
+QUESTIONS = [
+    "tell me about snips and shots",
+    "compare a snip and a shot for me",
+    "snips or shots for a product launch",
+]
+
+
+def simulated_llama(prefill_ms: float, token_ms: float):
+    """A LlamaCpp stand-in that replays a two-step ReAct run"""
+    from langchain_core.language_models.llms import LLM
+    from langchain_core.outputs import GenerationChunk
+
+    class SimulatedLlama(LLM):
+        @property
+        def _llm_type(self) -> str:
+            return "simulated_llama"
+
+        def get_num_tokens(self, text: str) -> int:
+            return len(text) // 4
+
+        def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+            if "Observation:" in prompt.rsplit("Current Question:", 1)[-1]:
+                text = "Thought: I have the guide\nFinal Answer: Open the app, tap +, pick Snip, record and post."
+            else:
+                text = "Thought: the user wants a guide\nAction: content_creation_guide\nAction Input: snip"
+            time.sleep(prefill_ms / 1000)
+            for word in text.split(" "):
+                time.sleep(token_ms / 1000)
+                yield GenerationChunk(text=word + " ")
+
+        def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> str:
+            return "".join(chunk.text for chunk in self._stream(prompt, stop))
+
+    return lambda **kwargs: SimulatedLlama()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_sessions(url: str, sessions: int, queries: int) -> Dict:
+    import aiohttp
+
+    latency = LatencyHistogram()
+    ttft = LatencyHistogram()
+    failures = 0
+
+    async def session(index: int):
+        nonlocal failures
+        async with aiohttp.ClientSession() as client:
+            async with client.ws_connect(f"{url}/ws/bench-{index}", timeout=600, max_msg_size=0) as ws:
+                for turn in range(queries):
+                    started = time.perf_counter()
+                    first_frame = None
+                    await ws.send_str(f"{QUESTIONS[(index + turn) % len(QUESTIONS)]} ({index}-{turn})")
+                    while True:
+                        frame = await ws.receive_json()
+                        if first_frame is None:
+                            first_frame = time.perf_counter()
+                        if frame.get("final"):
+                            break
+                    if frame.get("type") == "error":
+                        failures += 1
+                        continue
+                    latency.record(time.perf_counter() - started)
+                    ttft.record(first_frame - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(index) for index in range(sessions)))
+    elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 2),
+        "queries_per_second": round(latency.count / elapsed, 2),
+        "failures": failures,
+        "latency_seconds": latency.summary(),
+        "first_frame_seconds": ttft.summary()
+    }
+
+
+async def run_child(args) -> Dict:
+    import uvicorn
+    import advanced_bigshorts_agent
+    import api_server
+
+    if args.model is None:
+        advanced_bigshorts_agent.LlamaCpp = simulated_llama(args.prefill_ms, args.token_ms)
+    api_server.agent = advanced_bigshorts_agent.AdvancedBigShortsAgent(args.model or "simulated", enable_rag=False)
+
+    port = free_port()
+    # lifespan off: the startup hook would load the production model
+    server = uvicorn.Server(uvicorn.Config(api_server.app, host="127.0.0.1", port=port,
+                                           lifespan="off", log_level="warning", ws_max_size=1 << 20))
+    serving = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    peak_threads = threading.active_count()
+
+    async def sample():
+        nonlocal peak_threads
+        while True:
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.ensure_future(sample())
+    result = await run_sessions(f"ws://127.0.0.1:{port}", args.sessions, args.queries)
+    sampler.cancel()
+    server.should_exit = True
+    await serving
+
+    analytics = api_server.agent.get_analytics()
+    return {
+        "mode": "async" if api_server.AGENT_ASYNC else "sync",
+        "sessions": args.sessions,
+        "queries": args.sessions * args.queries,
+        **result,
+        "peak_threads": peak_threads,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "inference_worker": analytics["inference_worker"],
+        "avg_iterations": analytics["agent_runs"]["avg_iterations"]
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=2, help="questions per session, sent one after another")
+    parser.add_argument("--sync-threads", type=int, default=None,
+                        help="AGENT_CONCURRENCY for the blocking path (default: one per session)")
+    parser.add_argument("--model", default=None, help="GGUF model to load instead of the simulated one")
+    parser.add_argument("--prefill-ms", type=float, default=20.0)
+    parser.add_argument("--token-ms", type=float, default=2.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_child(args))))
+        return
+
+    child_args = [sys.executable, __file__, "--child", "--sessions", str(args.sessions),
+                  "--queries", str(args.queries), "--prefill-ms", str(args.prefill_ms),
+                  "--token-ms", str(args.token_ms)]
+    if args.model:
+        child_args += ["--model", args.model]
+    # Admit every session at once, so neither mode sheds load
+    env = dict(os.environ, AGENT_MAX_PENDING=str(args.sessions), AGENT_QUEUE_TIMEOUT="600",
+               AGENT_STREAM_STDOUT="0")
+    modes = {"0": str(args.sync_threads or args.sessions), "1": "1"}
+    results = []
+    for agent_async, concurrency in modes.items():
+        proc = subprocess.run(child_args, env=dict(env, AGENT_ASYNC=agent_async, AGENT_CONCURRENCY=concurrency),
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr, file=sys.stderr)
+            sys.exit(proc.returncode)
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    for result in results:
+        latency = result["latency_seconds"]
+        print(f"{result['mode']:>5}: {result['queries_per_second']:>6} queries/s, "
+              f"p50 {latency['p50_median']}s p99 {latency['p99']}s, "
+              f"first frame p50 {result['first_frame_seconds']['p50_median']}s, "
+              f"{result['peak_threads']} threads, {result['peak_rss_mb']} MB RSS, "
+              f"{result['failures']} failures")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
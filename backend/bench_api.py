@@ -0,0 +1,120 @@
+# Requests/sec benchmark for the deterministic (non-LLM) API routes
+#
+# Runs the FastAPI app in-process over httpx's ASGI transport, so the numbers
+# cover routing, validation and JSON serialization but not the socket layer.
+# Reports one absolute req/s figure, plus a microbenchmark of the payload
+# encoding: jsonable_encoder + json.dumps (what FastAPI does without a
+# response_model) against pydantic's dump_json (what the response_model
+# routes use now).
+#
+#   python bench_api.py
+#   python bench_api.py --requests 5000 --concurrency 50
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+# Queries answered by the rule-based paths in BigShortsChatbot.process_query
+CHAT_QUERIES = ["hello", "what can you do", "how to create a snip", "what are bigcoins"]
+FAQ_TYPES = ["shot", "ssup", "snip", "collab"]
+
+
+def install_offline_chatbot(main_module):
+    """Publish a chatbot on the fake backend so no model is loaded"""
+    from Chatbot2 import BigShortsChatbot
+    from llm_backends import FakeBackend
+
+    main_module.chatbot_instance = BigShortsChatbot(backend=FakeBackend())
+
+
+async def run_load(total: int, concurrency: int) -> dict:
+    import httpx
+    import main
+
+    install_offline_chatbot(main)
+    # Rate limiting would dominate the measurement; lift it for the run
+    main.RATE_LIMIT_REQUESTS = total + 1
+
+    transport = httpx.ASGITransport(app=main.app)
+    counter = iter(range(total))
+    failures = 0
+    response_bytes = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            nonlocal failures, response_bytes
+            for i in counter:
+                session_id = str(uuid.uuid4())
+                if i % 2:
+                    payload = {"content_type": FAQ_TYPES[i % len(FAQ_TYPES)], "session_id": session_id}
+                    resp = await client.post("/api/select-faq", json=payload)
+                else:
+                    payload = {"content": CHAT_QUERIES[i % len(CHAT_QUERIES)], "session_id": session_id}
+                    resp = await client.post("/api/chat", json=payload)
+                if resp.status_code != 200:
+                    failures += 1
+                response_bytes += len(resp.content)
+
+        # Warm up imports, route compilation and the session dicts
+        await client.post("/api/select-faq", json={"content_type": "snip"})
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    main.executor.shutdown(wait=True)
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1),
+        "avg_response_bytes": round(response_bytes / total)
+    }
+
+
+def serialization_microbench(iterations: int) -> dict:
+    """Encode a content_guide payload the old way and the way FastAPI now does for response_model routes"""
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from Chatbot2 import content_creation_guide
+    from main import ChatResponse
+
+    payload = dict(content_creation_guide("snip"), session_id=str(uuid.uuid4()), rate_limit_remaining=29, response_time=0.004)
+    results = {}
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        json.dumps(jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    results["jsonable_encoder+json_us"] = round((time.perf_counter() - started) / iterations * 1e6, 2)
+
+    adapter = TypeAdapter(ChatResponse)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        adapter.dump_json(adapter.validate_python(payload), exclude_unset=True)
+    results["pydantic_dump_json_us"] = round((time.perf_counter() - started) / iterations * 1e6, 2)
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    # Keep benchmark output clean and skip trace export; read when main is imported
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+    result = asyncio.run(run_load(args.requests, args.concurrency))
+    result["serialization"] = serialization_microbench(2000)
+
+    print(f"{result['requests_per_second']} req/s "
+          f"({result['failures']} failures, {result['avg_response_bytes']} bytes avg)")
+    for name, micros in result["serialization"].items():
+        print(f"  {name}: {micros}")
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -7,7 +7,6 @@ from dataclasses import dataclass
 # LangChain imports
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.tools import Tool, StructuredTool
-from langchain.memory import ConversationBufferMemory
 from langchain_community.llms import LlamaCpp
 from langchain.prompts import PromptTemplate
 from langchain.callbacks.manager import CallbackManager
@@ -15,7 +14,18 @@ from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 from langchain.schema import AgentAction, AgentFinish
 from pydantic import BaseModel, Field
 
+from agent_memory import TokenWindowMemory, IdleSummarizer, token_counter
+from agent_metrics import AgentRunMetrics, AgentMetrics
+from agent_router import PreRouter, history_text
+from tool_cache import ToolCache, TRENDING_TTL_SECONDS
+from react_grammar import build_react_grammar, constrained_llm, IterationHistogram
+
 # Configuration constants
+
+# Echo generated tokens and agent steps to stdout (the interactive demos turn
+# this on; servers leave it off and read metrics instead)
+STREAM_TO_STDOUT = os.environ.get("AGENT_STREAM_STDOUT", "0") == "1"
+
 ALLOWED_CONTENT_TYPES = [
     "shot", "snip", "ssup", "collab",
     "editing a shot", "invite friends", "feedback", "multiple accounts", 
@@ -167,18 +177,18 @@ def handle_issue_tool_func(issue_type: str) -> str:
     
     return solution
 
+PLATFORM_SECTIONS = {
+    "shot": "SHOT is our platform's photo sharing feature. Would you like me to show you how to create a SHOT?",
+    "snip": "SNIP is our platform's short video feature (similar to reels). Would you like me to show you how to create a SNIP?",
+    "ssup": "SSUP is our platform's stories feature for temporary 24-hour content. Would you like me to show you how to create a SSUP?",
+    "collab": "Our collaboration features let you create content with other users. Would you like me to show you how to use collaboration features?",
+    "mini": "Mini is our platform's longer video format. Would you like me to show you how to create a Mini?",
+    # Add more sections...
+}
+
 def platform_guide_tool_func(section: str) -> str:
     """Provides guidance about different sections of the platform"""
-    platform_sections = {
-        "shot": "SHOT is our platform's photo sharing feature. Would you like me to show you how to create a SHOT?",
-        "snip": "SNIP is our platform's short video feature (similar to reels). Would you like me to show you how to create a SNIP?",
-        "ssup": "SSUP is our platform's stories feature for temporary 24-hour content. Would you like me to show you how to create a SSUP?",
-        "collab": "Our collaboration features let you create content with other users. Would you like me to show you how to use collaboration features?",
-        "Mini": "Mini is our platform's longer video format. Would you like me to show you how to create a Mini?",
-        # Add more sections...
-    }
-    
-    return platform_sections.get(section.lower(), 
+    return PLATFORM_SECTIONS.get(section.lower(), 
         "I don't have information about that section. Try asking about 'SHOT', 'SNIP', 'SSUP', 'Mini', or 'collab'.")
 
 def generate_interactive_ideas_func() -> str:
@@ -207,13 +217,55 @@ def get_trending_content_func() -> dict:
         }
     }
 
+# Tools whose results are memoized, with their TTL in seconds. None: until
+# the catalog is reloaded. interactive_ideas is random and never reused.
+TOOL_TTLS = {
+    "content_creation_guide": None,
+    "handle_issue": None,
+    "platform_guide": None,
+    "trending_content": TRENDING_TTL_SECONDS,
+    "interactive_ideas": 0,
+}
+CATALOG_TOOLS = [name for name, ttl in TOOL_TTLS.items() if ttl is None]
+
+# Arguments the ReAct grammar allows per tool; other tools take a line of
+# text, or nothing
+TOOL_ARGUMENT_CHOICES = {
+    "content_creation_guide": ALLOWED_CONTENT_TYPES + list(CONTENT_TYPE_MAPPING),
+    "handle_issue": ALLOWED_ISSUE_TYPES,
+    "platform_guide": list(PLATFORM_SECTIONS),
+}
+NO_INPUT_TOOLS = ["interactive_ideas", "trending_content"]
+
+def agent_llm(llm, tools: List[Tool]):
+    """`llm` as the ReAct agent should call it: grammar-constrained when possible
+
+    Returns the runnable and "constrained" or "unconstrained".
+    """
+    grammar = build_react_grammar(tools, TOOL_ARGUMENT_CHOICES, NO_INPUT_TOOLS)
+    bound = constrained_llm(llm, grammar)
+    return bound, "unconstrained" if bound is llm else "constrained"
+
+def build_router(tools: List[Tool]) -> PreRouter:
+    """Pre-router over this module's keyword and alias tables"""
+    return PreRouter(
+        tools={tool.name: getattr(tool.func, "structured", tool.func) for tool in tools},
+        content_types=ALLOWED_CONTENT_TYPES,
+        aliases=CONTENT_TYPE_MAPPING,
+        guides=CONTENT_GUIDES,
+        issue_types=ALLOWED_ISSUE_TYPES,
+        issue_solutions=ISSUE_SOLUTIONS,
+        sections=PLATFORM_SECTIONS
+    )
+
 # Create LangChain Agent
 class BigShortsAgent:
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, stream_stdout: bool = STREAM_TO_STDOUT):
         """Initialize the LangChain-based autonomous agent"""
         
-        # Initialize LLM with callbacks
-        callback_manager = CallbackManager([StreamingStdOutCallbackHandler()])
+        # Initialize LLM; tokens only go to stdout when asked for
+        self.stream_stdout = stream_stdout
+        callback_manager = CallbackManager([StreamingStdOutCallbackHandler()]) if stream_stdout else None
         
         self.llm = LlamaCpp(
             model_path=model_path,
@@ -259,6 +311,13 @@ class BigShortsAgent:
             ),
         ]
         
+        # Cached tool results, rendered once as compact observations
+        self.tool_cache = ToolCache()
+        self.tool_cache.wrap_tools(self.tools, TOOL_TTLS)
+        
+        # Obvious requests go straight to a tool, skipping the LLM
+        self.router = build_router(self.tools)
+        
         # Create custom prompt template
         self.prompt = PromptTemplate(
             template="""You are Gyan.Ai, the helpful assistant for BigShorts social media platform.
@@ -299,15 +358,20 @@ Question: {input}
             }
         )
         
-        # Create memory
-        self.memory = ConversationBufferMemory(
-            memory_key="chat_history",
-            return_messages=True
-        )
+        # Create memory: recent turns within a token budget, older ones
+        # summarized in the background between queries
+        self.count_tokens = token_counter(self.llm)
+        self.memory = TokenWindowMemory(self.count_tokens)
+        self.summarizer = IdleSummarizer(self.llm)
+        self.last_prompt_tokens = 0
         
-        # Create agent
+        # Create agent; its steps are grammar-constrained when llama.cpp
+        # supports it, so they always parse
+        react_llm, self.react_mode = agent_llm(self.llm, self.tools)
+        self.iteration_stats = IterationHistogram()
+        self.metrics = AgentMetrics()
         agent = create_react_agent(
-            llm=self.llm,
+            llm=react_llm,
             tools=self.tools,
             prompt=self.prompt
         )
@@ -316,8 +380,7 @@ Question: {input}
         self.agent_executor = AgentExecutor(
             agent=agent,
             tools=self.tools,
-            memory=self.memory,
-            verbose=True,
+            verbose=stream_stdout,
             handle_parsing_errors=True,
             max_iterations=5
         )
@@ -354,12 +417,34 @@ Question: {input}
             content_type = user_input.split("FAQ:")[1].strip()
             return content_creation_tool_func(content_type)
         
+        # Unambiguous requests: answer from the tool, no LLM calls
+        routed = self.router.route(user_input)
+        if routed is not None:
+            self.memory.add_turn("human", user_input)
+            self.memory.add_turn("ai", history_text(routed))
+            return routed
+        
         # Run through agent
         try:
-            result = self.agent_executor.invoke({"input": user_input})
+            chat_history, _ = self.memory.render()
+            run = AgentRunMetrics(self.count_tokens)
+            with self.summarizer.model_in_use():
+                result = self.agent_executor.invoke(
+                    {"input": user_input, "chat_history": chat_history},
+                    config={"callbacks": [run]}
+                )
+            self.metrics.record(run)
+            self.iteration_stats.record(self.react_mode, run.llm_calls, run.parse_errors)
+            self.last_prompt_tokens = run.prompt_tokens
+            if self.stream_stdout:
+                print(f"Prompt tokens: {run.prompt_tokens} over {run.llm_calls} LLM calls")
             
             # Extract final answer
             output = result.get("output", "I couldn't process that request.")
+            self.memory.add_turn("human", user_input)
+            self.memory.add_turn("ai", output if isinstance(output, str) else str(output))
+            if self.memory.needs_summary():
+                self.summarizer.schedule(self.memory)
             
             # Check if output is already structured
             if isinstance(output, dict):
@@ -374,9 +459,13 @@ Question: {input}
                 "content": "I encountered an issue. Can I help you with creating SHOT, SNIP, SSUP, Mini, or Collab content?"
             }
     
+    def reload_catalog(self) -> None:
+        """Forget cached guide and issue answers (call after changing the catalog)"""
+        self.tool_cache.invalidate(CATALOG_TOOLS)
+    
     def get_conversation_history(self) -> List[Dict[str, Any]]:
-        """Get conversation history"""
-        return self.memory.chat_memory.messages
+        """Get conversation history (turns not yet folded into the summary)"""
+        return [{"role": role, "content": text} for role, text in self.memory.messages()]
 
 
 # Interactive demo
@@ -391,7 +480,7 @@ def run_agent():
     
     try:
         print("Initializing BigShorts Agent...")
-        agent = BigShortsAgent(model_path)
+        agent = BigShortsAgent(model_path, stream_stdout=True)
         print("\nBigShorts Agent ready! Type 'exit' to quit.\n")
         
         print("Agent: Hi! I'm Gyan.Ai, your BigShorts assistant. How can I help you today?")
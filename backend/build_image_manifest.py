@@ -0,0 +1,162 @@
+# Build step: scan the guide image directory and write image_manifest.json
+#
+#   python build_image_manifest.py --images ../frontend/public/guides \
+#       --base-url https://cdn.example.com/guides/ --copy-to dist/guides
+#
+# Each image gets a content-hashed file name (Group_1449.3f9a0c21b7.webp), so
+# the URL can be served with "Cache-Control: public, max-age=31536000, immutable"
+# and a changed image always gets a new URL.
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import struct
+import sys
+import time
+from typing import Dict, Optional, Tuple
+
+IMAGE_EXTENSIONS = (".webp", ".png", ".jpg", ".jpeg", ".gif")
+
+# Hex digits of the SHA-256 kept in the file name
+HASH_LENGTH = 10
+
+
+def _webp_size(data: bytes) -> Optional[Tuple[int, int]]:
+    if data[:4] != b"RIFF" or data[8:12] != b"WEBP":
+        return None
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30:
+        # Lossy: 14-bit width/height after the 3-byte frame start code
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25:
+        # Lossless: 14-bit width-1 and height-1 packed after the 0x2f signature
+        bits = struct.unpack("<I", data[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(data) >= 30:
+        # Extended: 24-bit canvas width-1 and height-1
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def _png_size(data: bytes) -> Optional[Tuple[int, int]]:
+    if data[:8] != b"\x89PNG\r\n\x1a\n" or data[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", data[16:24])
+
+
+def _gif_size(data: bytes) -> Optional[Tuple[int, int]]:
+    if data[:6] not in (b"GIF87a", b"GIF89a"):
+        return None
+    return struct.unpack("<HH", data[6:10])
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    if data[:2] != b"\xff\xd8":
+        return None
+    offset = 2
+    while offset + 9 < len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        length = struct.unpack(">H", data[offset + 2:offset + 4])[0]
+        # Start-of-frame markers (excluding DHT/JPG/DAC) carry the dimensions
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) read from the image header, or None if unrecognised"""
+    for reader in (_webp_size, _png_size, _jpeg_size, _gif_size):
+        size = reader(data)
+        if size:
+            return size
+    return None
+
+
+def hashed_name(relative_path: str, digest: str) -> str:
+    stem, ext = os.path.splitext(relative_path)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def build_manifest(images_dir: str, base_url: str, copy_to: Optional[str] = None) -> Dict:
+    """Hash, measure and (optionally) copy every image under `images_dir`"""
+    images = {}
+    for root, _, files in os.walk(images_dir):
+        for name in sorted(files):
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            full_path = os.path.join(root, name)
+            # Keys use forward slashes to match image_path values in the guides
+            relative_path = os.path.relpath(full_path, images_dir).replace(os.sep, "/")
+            with open(full_path, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            target = hashed_name(relative_path, digest)
+            size = image_size(data)
+            if size is None:
+                print(f"warning: could not read dimensions of {relative_path}", file=sys.stderr)
+            images[relative_path] = {
+                "url": base_url + target,
+                "sha256": digest,
+                "bytes": len(data),
+                "width": size[0] if size else None,
+                "height": size[1] if size else None
+            }
+            if copy_to:
+                destination = os.path.join(copy_to, *target.split("/"))
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                shutil.copyfile(full_path, destination)
+    return {"generated_at": int(time.time()), "base_url": base_url, "images": dict(sorted(images.items()))}
+
+
+def referenced_image_paths() -> Optional[set]:
+    """image_path values used by the guides, if Chatbot2 can be imported here"""
+    try:
+        from Chatbot2 import CONTENT_GUIDES
+    except ImportError:
+        return None
+    return {
+        step["image_path"]
+        for guide in CONTENT_GUIDES.values()
+        for step in guide.get("steps", [])
+        if step.get("image_path")
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the guide image manifest")
+    parser.add_argument("--images", required=True, help="Directory containing Shot/... guide images")
+    parser.add_argument("--output", default="image_manifest.json", help="Manifest file to write")
+    parser.add_argument("--base-url", default="/guide-images/", help="URL prefix of the hashed images (CDN or static mount)")
+    parser.add_argument("--copy-to", default=None, help="Also write hashed copies of the images here")
+    args = parser.parse_args()
+
+    base_url = args.base_url if args.base_url.endswith("/") else args.base_url + "/"
+    manifest = build_manifest(args.images, base_url, args.copy_to)
+    images = manifest["images"]
+
+    referenced = referenced_image_paths()
+    if referenced is not None:
+        missing = sorted(referenced - images.keys())
+        for path in missing:
+            print(f"warning: guide image {path} not found under {args.images}", file=sys.stderr)
+        print(f"{len(referenced) - len(missing)}/{len(referenced)} guide images found")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    total_bytes = sum(entry["bytes"] for entry in images.values())
+    print(f"Wrote {args.output}: {len(images)} images, {total_bytes / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
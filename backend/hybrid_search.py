@@ -0,0 +1,208 @@
+# Hybrid knowledge-base retrieval: BM25 over an inverted index fused with FAISS
+#
+# MiniLM embeddings blur exact product terms ("SSUP", "bigcoins", "Mini
+# Series"); BM25 matches them literally. Both rankings are combined with
+# reciprocal rank fusion. The vector search runs under a latency budget: when
+# embedding the query takes too long, the BM25 ranking is used on its own.
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+# Time allowed for the vector half of a search before answering from BM25 alone
+LATENCY_BUDGET_MS = float(os.environ.get("RAG_LATENCY_BUDGET_MS", "250"))
+# Candidates taken from each ranking before fusion
+CANDIDATES = int(os.environ.get("RAG_CANDIDATES", "10"))
+# RRF damping constant; 60 is the value from the original paper
+RRF_K = int(os.environ.get("RAG_RRF_K", "60"))
+# Vector searches queued or running at once; beyond this a search skips the
+# vector half rather than queue behind searches that already missed the budget
+VECTOR_SEARCH_THREADS = 8
+MAX_PENDING_VECTOR_SEARCHES = 2 * VECTOR_SEARCH_THREADS
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Question words and glue that would otherwise give every guide a score
+STOPWORDS = frozenset("""
+a about an and are as at be but by can could do does for from get how i if in into is it its
+me my no not of on or so that the their then there this to was what when where which who why
+will with you your
+""".split())
+
+
+def _normalize(word: str) -> str:
+    # Plain plurals only ("notifications", "stories"); enough for help text
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_normalize(word) for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory inverted index of documents"""
+
+    def __init__(self, documents: Sequence, k1: float = BM25_K1, b: float = BM25_B):
+        self.documents = list(documents)
+        self.k1 = k1
+        self.b = b
+        # term -> [(document position, term frequency)]
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.lengths: List[int] = []
+        for position, doc in enumerate(self.documents):
+            terms = tokenize(doc.page_content)
+            self.lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                self.postings[term].append((position, count))
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        total = len(self.documents)
+        self.idf = {
+            term: math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def search(self, query: str, k: int = CANDIDATES) -> List[Tuple[object, float]]:
+        """Top `k` (document, score) pairs, best first; documents without a query term are left out"""
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for position, count in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[position] / self.average_length)
+                scores[position] += idf * count * (self.k1 + 1) / (count + norm)
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(self.documents[position], score) for position, score in best]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence], k: int = RRF_K) -> List:
+    """Documents of several best-first rankings, ordered by sum of 1 / (k + rank)"""
+    scores: Dict[int, float] = defaultdict(float)
+    documents = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            scores[id(doc)] += 1.0 / (k + rank)
+            documents[id(doc)] = doc
+    return [documents[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def store_documents(vectorstore) -> List:
+    """Documents of a FAISS store in index order (the objects its searches return)"""
+    return [vectorstore.docstore.search(doc_id)
+            for _, doc_id in sorted(vectorstore.index_to_docstore_id.items())]
+
+
+class HybridRetriever:
+    """BM25 and vector search over the same FAISS stores, fused with RRF
+
+    All stores must use `embeddings`, so their distances are comparable and
+    the query is embedded once.
+    """
+
+    def __init__(self, vectorstores: Sequence, embeddings, latency_budget_ms: float = LATENCY_BUDGET_MS,
+                 candidates: int = CANDIDATES, rrf_k: int = RRF_K):
+        self.vectorstores = [store for store in vectorstores if store is not None]
+        self.embeddings = embeddings
+        self.latency_budget = latency_budget_ms / 1000
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        started = time.perf_counter()
+        self.bm25 = BM25Index([doc for store in self.vectorstores for doc in store_documents(store)])
+        self.build_seconds = time.perf_counter() - started
+        # A vector search that misses the budget is cancelled if still queued,
+        # else finishes here in the background. Threads mostly wait on the
+        # query embedder, so several sessions' queries can share one batch.
+        self._pool = ThreadPoolExecutor(max_workers=VECTOR_SEARCH_THREADS, thread_name_prefix="vector_search")
+        self._lock = threading.Lock()
+        self._pending_vector = 0
+        self.searches = 0
+        self.vector_timeouts = 0
+        self.vector_skipped = 0
+        self.vector_errors = 0
+        self.search_seconds = 0.0
+
+    def _vector_ranking(self, query: str) -> List:
+        vector = self.embeddings.embed_query(query)
+        scored = []
+        for store in self.vectorstores:
+            scored += store.similarity_search_with_score_by_vector(vector, k=self.candidates)
+        return [doc for doc, _ in sorted(scored, key=lambda pair: pair[1])[:self.candidates]]
+
+    def _vector_done(self, future) -> None:
+        with self._lock:
+            self._pending_vector -= 1
+
+    def search(self, query: str, k: int = 3) -> List:
+        started = time.perf_counter()
+        with self._lock:
+            skipped = self._pending_vector >= MAX_PENDING_VECTOR_SEARCHES
+            if not skipped:
+                self._pending_vector += 1
+        vector_future = None
+        if not skipped:
+            vector_future = self._pool.submit(self._vector_ranking, query)
+            vector_future.add_done_callback(self._vector_done)
+        lexical = [doc for doc, _ in self.bm25.search(query, self.candidates)]
+        rankings = [lexical]
+        timed_out = failed = False
+        if vector_future is not None:
+            try:
+                remaining = self.latency_budget - (time.perf_counter() - started)
+                rankings.append(vector_future.result(timeout=max(remaining, 0)))
+            except FutureTimeout:
+                timed_out = True
+                # Nobody will read it; drop it if it has not started
+                vector_future.cancel()
+            except Exception as e:
+                failed = True
+                print(f"Vector search failed, using BM25 only: {e}")
+        docs = reciprocal_rank_fusion(rankings, self.rrf_k)[:k]
+        with self._lock:
+            self.searches += 1
+            self.vector_timeouts += timed_out
+            self.vector_skipped += skipped
+            self.vector_errors += failed
+            self.search_seconds += time.perf_counter() - started
+        return docs
+
+    def stats(self) -> Dict:
+        return {
+            "bm25_documents": len(self.bm25.documents),
+            "bm25_terms": len(self.bm25.postings),
+            "bm25_build_seconds": round(self.build_seconds, 3),
+            "latency_budget_ms": round(self.latency_budget * 1000),
+            "searches": self.searches,
+            "vector_timeouts": self.vector_timeouts,
+            "vector_skipped": self.vector_skipped,
+            "pending_vector_searches": self._pending_vector,
+            "vector_errors": self.vector_errors,
+            "avg_search_ms": round(self.search_seconds / self.searches * 1000, 2) if self.searches else 0.0
+        }
+
+
+def snippet(text: str, query: str, width: int = 300) -> str:
+    """`width` characters of text around the first query term it contains"""
+    if len(text) <= width:
+        return text
+    lowered = text.lower()
+    hits = [lowered.find(term) for term in tokenize(query) if len(term) > 2]
+    hits = [hit for hit in hits if hit >= 0]
+    start = max(0, min(hits) - width // 4) if hits else 0
+    start = min(start, len(text) - width)
+    if start:
+        # Begin at a word boundary
+        boundary = text.find(" ", start, start + 20)
+        start = boundary + 1 if boundary >= 0 else start
+    end = start + width
+    return ("..." if start else "") + text[start:end] + ("..." if end < len(text) else "")
@@ -0,0 +1,68 @@
+# Guide image manifest: content-hashed URLs, sizes and dimensions for guide steps
+#
+# The manifest is produced by build_image_manifest.py and maps each guide
+# `image_path` (e.g. "Shot/Group_1449.webp") to an immutable URL plus the
+# metadata the frontend needs to reserve layout space before the image loads.
+import json
+import os
+from typing import Dict, List, Optional
+
+from structured_log import get_logger
+
+logger = get_logger("images")
+
+# Manifest location; a missing manifest leaves guides with bare image_path values
+IMAGE_MANIFEST_PATH = os.environ.get("IMAGE_MANIFEST", "image_manifest.json")
+
+# Number of leading guide steps whose images are announced with Link: preload
+PRELOAD_STEPS = int(os.environ.get("IMAGE_PRELOAD_STEPS", "2"))
+
+
+def load_manifest(path: str = IMAGE_MANIFEST_PATH) -> Dict[str, Dict]:
+    """Return the manifest's image map, or {} if it is missing or unreadable"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring unreadable image manifest %s: %s", path, e)
+        return {}
+    images = manifest.get("images", {})
+    logger.info("Loaded image manifest %s (%d images)", path, len(images))
+    return images
+
+
+def annotate_guides(guides: Dict[str, Dict], images: Dict[str, Dict]) -> int:
+    """Add image_url/width/height/bytes to every guide step found in the manifest
+
+    image_path is kept so older clients keep working. Returns the number of
+    steps whose image is missing from the manifest.
+    """
+    missing = 0
+    for guide in guides.values():
+        for step in guide.get("steps", []):
+            path = step.get("image_path")
+            if not path:
+                continue
+            entry = images.get(path)
+            if entry is None:
+                missing += 1
+                continue
+            step["image_url"] = entry["url"]
+            step["image_width"] = entry.get("width")
+            step["image_height"] = entry.get("height")
+            step["image_bytes"] = entry.get("bytes")
+    return missing
+
+
+def preload_links(guide: Dict, limit: int = PRELOAD_STEPS) -> Optional[str]:
+    """Link header value preloading the images of the first `limit` steps"""
+    links: List[str] = []
+    for step in guide.get("steps", []):
+        if len(links) >= limit:
+            break
+        url = step.get("image_url")
+        if url:
+            links.append(f"<{url}>; rel=preload; as=image")
+    return ", ".join(links) or None
@@ -0,0 +1,131 @@
+# Priority admission for query processing: interactive requests before bulk jobs
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Tuple
+
+INTERACTIVE = 0
+BULK = 1
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+
+class InferenceScheduler:
+    """A counting semaphore whose waiters are served by priority, then arrival
+
+    At most `capacity` holders run at once. BULK holders are further capped at
+    `bulk_limit`, and a BULK waiter is only admitted when no INTERACTIVE
+    request is waiting, so a large batch never takes more than `bulk_limit`
+    worker threads or inference slots away from live users.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, capacity: int, bulk_limit: int):
+        self.capacity = capacity
+        self.bulk_limit = max(1, min(bulk_limit, capacity))
+        self._active = {INTERACTIVE: 0, BULK: 0}
+        # (priority, seq, future); cancelled futures are skipped when they surface
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._waiting = {INTERACTIVE: 0, BULK: 0}
+        self._seq = itertools.count()
+        self.admitted_total = {INTERACTIVE: 0, BULK: 0}
+        self.wait_seconds_total = {INTERACTIVE: 0.0, BULK: 0.0}
+
+    def _can_admit(self, priority: int) -> bool:
+        if sum(self._active.values()) >= self.capacity:
+            return False
+        return priority != BULK or self._active[BULK] < self.bulk_limit
+
+    def _grant(self, priority: int, queued_at: float):
+        self._active[priority] += 1
+        self.admitted_total[priority] += 1
+        self.wait_seconds_total[priority] += time.perf_counter() - queued_at
+
+    async def acquire(self, priority: int = INTERACTIVE) -> None:
+        queued_at = time.perf_counter()
+        if not self._waiters and self._can_admit(priority):
+            self._grant(priority, queued_at)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._waiting[priority] += 1
+        # Only BULK waiters held at their cap may be ahead of us
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled: hand the slot on
+                self.release(priority)
+            raise
+        finally:
+            self._waiting[priority] -= 1
+        self.wait_seconds_total[priority] += time.perf_counter() - queued_at
+
+    def release(self, priority: int = INTERACTIVE) -> None:
+        self._active[priority] -= 1
+        self._wake()
+
+    def _wake(self):
+        waiters = self._waiters
+        while waiters:
+            priority, _, future = waiters[0]
+            if future.done():
+                heapq.heappop(waiters)
+                continue
+            if not self._can_admit(priority):
+                # The head is BULK at its cap (or we are full); everything
+                # behind it is BULK too, so nobody else can go either
+                return
+            heapq.heappop(waiters)
+            self._active[priority] += 1
+            self.admitted_total[priority] += 1
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = INTERACTIVE):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    async def run_batch(self, jobs: Iterable[Callable[[], Awaitable]], priority: int = BULK) -> AsyncIterator:
+        """Queue every job at `priority` at once and yield results as they finish
+
+        Each job is a zero-argument coroutine function run while holding a
+        slot. Leaving the iteration early cancels the jobs still queued.
+        """
+        async def run(job):
+            async with self.slot(priority):
+                return await job()
+
+        tasks = [asyncio.ensure_future(run(job)) for job in jobs]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def waiting(self, priority: int) -> int:
+        return self._waiting[priority]
+
+    def active(self, priority: int) -> int:
+        return self._active[priority]
+
+    def stats(self) -> Dict:
+        result = {"capacity": self.capacity, "bulk_limit": self.bulk_limit}
+        for priority, name in PRIORITY_NAMES.items():
+            admitted = self.admitted_total[priority]
+            result[name] = {
+                "active": self._active[priority],
+                "waiting": self._waiting[priority],
+                "admitted_total": admitted,
+                "avg_wait_seconds": round(self.wait_seconds_total[priority] / admitted, 4) if admitted else 0.0
+            }
+        return result
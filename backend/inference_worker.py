@@ -0,0 +1,156 @@
+# One thread that owns the llama.cpp model, and an LLM adapter in front of it
+#
+# LlamaCpp is blocking and must not be called from two threads at once.
+# LangChain's default async path (LLM._acall) pushes each call onto the
+# default thread pool, so every waiting session still holds a thread.
+# WorkerLLM queues each generation on a single InferenceWorker thread instead.
+# Async callers await the streamed chunks on the event loop. Sync callers block
+# as before, but are serialized on the same thread, so both paths can share one
+# model.
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+# Queued by the worker after a generation's last chunk
+_DONE = object()
+
+
+class InferenceWorker:
+    """Runs generations one at a time on a dedicated thread, in arrival order"""
+
+    def __init__(self, name: str = "llm_inference"):
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.generations = 0
+        self.skipped = 0
+        self.errors = 0
+        self.wait_seconds = 0.0
+        self.busy_seconds = 0.0
+
+    def _produce(self, llm: LLM, prompt: str, stop: Optional[List[str]], kwargs: Dict,
+                 emit: Callable[[Any], None], cancelled: threading.Event, submitted: float) -> None:
+        started = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.wait_seconds += started - submitted
+        try:
+            if cancelled.is_set():
+                # The caller went away while queued; don't spend the model on it
+                with self._lock:
+                    self.skipped += 1
+                return
+            for chunk in llm._stream(prompt, stop=stop, **kwargs):
+                if cancelled.is_set():
+                    break
+                emit(chunk)
+            with self._lock:
+                self.generations += 1
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.busy_seconds += time.perf_counter() - started
+            emit(_DONE)
+
+    def submit(self, llm: LLM, prompt: str, stop: Optional[List[str]], kwargs: Dict,
+               emit: Callable[[Any], None], cancelled: threading.Event):
+        """Queue one streamed generation; `emit` gets each chunk, then _DONE, on the worker thread"""
+        with self._lock:
+            self.queued += 1
+        return self._pool.submit(self._produce, llm, prompt, stop, kwargs, emit, cancelled, time.perf_counter())
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            started = self.generations + self.errors + self.skipped
+            return {
+                "queued": self.queued,
+                "generations": self.generations,
+                "skipped": self.skipped,
+                "errors": self.errors,
+                "avg_wait_seconds": round(self.wait_seconds / started, 3) if started else 0.0,
+                "busy_seconds": round(self.busy_seconds, 2)
+            }
+
+
+class WorkerLLM(LLM):
+    """Wraps a streaming LLM (LlamaCpp) so every generation runs on `worker`
+
+    Extra invocation kwargs, such as the ReAct grammar bound by agent_llm(),
+    are passed through to the wrapped model. Closing the stream early (a
+    client disconnect, a cancelled task) stops the generation at its next
+    token, or skips it if it has not started yet.
+    """
+
+    llm: Any
+    worker: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "inference_worker"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"llm": getattr(self.llm, "_identifying_params", {})}
+
+    def get_num_tokens(self, text: str) -> int:
+        # Tokenizing only reads the vocabulary; no need to queue for it
+        return self.llm.get_num_tokens(text)
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[GenerationChunk]:
+        chunks: queue.SimpleQueue = queue.SimpleQueue()
+        cancelled = threading.Event()
+        future = self.worker.submit(self.llm, prompt, stop, kwargs, chunks.put, cancelled)
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is _DONE:
+                    break
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        finally:
+            cancelled.set()
+        future.result()
+
+    async def _astream(self, prompt: str, stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[GenerationChunk]:
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
+        future = self.worker.submit(self.llm, prompt, stop, kwargs,
+                                    partial(loop.call_soon_threadsafe, chunks.put_nowait), cancelled)
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is _DONE:
+                    break
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+        finally:
+            cancelled.set()
+        await asyncio.wrap_future(future)
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None,
+              run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        return "".join(chunk.text for chunk in self._stream(prompt, stop, run_manager, **kwargs))
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None,
+                     run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> str:
+        return "".join([chunk.text async for chunk in self._astream(prompt, stop, run_manager, **kwargs)])
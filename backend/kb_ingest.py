@@ -0,0 +1,257 @@
+# Incremental help-center ingestion into the agent's RAG knowledge base
+#
+#   python kb_ingest.py --source ../help_center            # add/update/delete changed articles
+#   python kb_ingest.py --source ../help_center --workers 6 --batch-size 128
+#
+# Articles (.md, .txt, .html) are chunked with RecursiveCharacterTextSplitter
+# and embedded in batches on a process pool. A manifest of per-file content
+# hashes lives with the index, so a run only embeds new or changed files and
+# removes the chunks of changed or deleted ones; unchanged articles are never
+# re-embedded. At most two batches per worker are in flight, so memory stays
+# bounded however large the corpus is.
+import argparse
+import hashlib
+import html
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Tuple
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.embeddings import Embeddings
+
+from rag_index import HELP_CENTER_DIR, load_index, save_index
+
+ARTICLE_EXTENSIONS = (".md", ".markdown", ".txt", ".html", ".htm")
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 150
+EMBED_BATCH_SIZE = int(os.environ.get("KB_EMBED_BATCH_SIZE", "64"))
+EMBED_WORKERS = int(os.environ.get("KB_EMBED_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+_TAG = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_HEADING = re.compile(r"^\s*#+\s*(.+)$|<h1[^>]*>(.*?)</h1>", re.IGNORECASE | re.MULTILINE)
+
+
+# Embedding worker processes: each loads the model once
+
+_worker_embeddings = None
+
+
+def _init_worker(model_name: str):
+    global _worker_embeddings
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    _worker_embeddings = HuggingFaceEmbeddings(model_name=model_name)
+
+
+def _embed_batch(texts: List[str]) -> List[List[float]]:
+    return _worker_embeddings.embed_documents(texts)
+
+
+# Reading and chunking
+
+def article_files(source: str) -> Iterator[str]:
+    """Article paths relative to `source`, in a stable order"""
+    for root, dirs, files in os.walk(source):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(ARTICLE_EXTENSIONS):
+                yield os.path.relpath(os.path.join(root, name), source).replace(os.sep, "/")
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_article(path: str) -> Tuple[str, str]:
+    """(title, plain text) of an article file"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        raw = f.read()
+    heading = _HEADING.search(raw)
+    title = (heading.group(1) or heading.group(2)).strip() if heading else os.path.splitext(os.path.basename(path))[0]
+    if path.lower().endswith((".html", ".htm")):
+        raw = html.unescape(_TAG.sub(" ", raw))
+        title = html.unescape(_TAG.sub("", title))
+    return title, re.sub(r"[ \t]+", " ", raw).strip()
+
+
+class _PrecomputedEmbeddings(Embeddings):
+    """Stands in for the model in the writer: vectors come from the pool"""
+
+    def embed_documents(self, texts):
+        raise NotImplementedError("kb_ingest embeds on its process pool")
+
+    def embed_query(self, text):
+        raise NotImplementedError("kb_ingest embeds on its process pool")
+
+
+class _Batch:
+    def __init__(self):
+        self.texts: List[str] = []
+        self.metadatas: List[Dict] = []
+        self.ids: List[str] = []
+
+
+class HelpCenterIngestor:
+    """Keeps the help-center index in sync with a directory of articles"""
+
+    def __init__(self, source: str, index_dir: str = HELP_CENTER_DIR, model_name: str = EMBEDDING_MODEL,
+                 workers: int = EMBED_WORKERS, batch_size: int = EMBED_BATCH_SIZE,
+                 chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+        self.source = source
+        self.index_dir = index_dir
+        self.model_name = model_name
+        self.workers = workers
+        self.batch_size = batch_size
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.vectorstore = None
+        # relative path -> {"sha256": ..., "ids": [...]}
+        self.manifest: Dict[str, Dict] = {}
+
+    def _load_existing(self):
+        manifest_path = os.path.join(self.index_dir, "manifest.json")
+        meta_path = os.path.join(self.index_dir, "meta.json")
+        if not os.path.isfile(manifest_path):
+            return
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model_name:
+            print(f"Embedding model changed ({meta.get('model')} -> {self.model_name}); re-ingesting everything")
+            return
+        with open(manifest_path, encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if any(entry["ids"] for entry in self.manifest.values()):
+            # Writable copy: the agent memory-maps the saved file read-only
+            self.vectorstore = load_index(self.index_dir, _PrecomputedEmbeddings(), mmap=False)
+
+    def _plan(self) -> Tuple[List[Tuple[str, str]], List[str]]:
+        """Files to (re-)embed with their digests, and chunk ids to delete"""
+        changed, stale_ids, seen = [], [], set()
+        for relative_path in article_files(self.source):
+            seen.add(relative_path)
+            digest = file_digest(os.path.join(self.source, relative_path))
+            entry = self.manifest.get(relative_path)
+            if entry is not None and entry["sha256"] == digest:
+                continue
+            if entry is not None:
+                stale_ids.extend(entry["ids"])
+            changed.append((relative_path, digest))
+        for relative_path in [path for path in self.manifest if path not in seen]:
+            stale_ids.extend(self.manifest.pop(relative_path)["ids"])
+        return changed, stale_ids
+
+    def _chunks(self, changed: List[Tuple[str, str]]) -> Iterator[_Batch]:
+        """Stream the changed articles as embedding batches, updating the manifest"""
+        batch = _Batch()
+        for relative_path, digest in changed:
+            title, text = read_article(os.path.join(self.source, relative_path))
+            ids = []
+            for number, chunk in enumerate(self.splitter.split_text(text)):
+                chunk_id = f"{relative_path}#{number}"
+                ids.append(chunk_id)
+                # Later chunks lose the article heading; prefix the title so
+                # they still match questions about it
+                batch.texts.append(f"{title}\n\n{chunk}" if number else chunk)
+                batch.metadatas.append({"type": "help_article", "source": relative_path,
+                                        "title": title, "chunk": number})
+                batch.ids.append(chunk_id)
+                if len(batch.texts) >= self.batch_size:
+                    yield batch
+                    batch = _Batch()
+            self.manifest[relative_path] = {"sha256": digest, "ids": ids}
+        if batch.texts:
+            yield batch
+
+    def _add(self, batch: _Batch, vectors: List[List[float]]):
+        from langchain_community.vectorstores import FAISS
+        pairs = list(zip(batch.texts, vectors))
+        if self.vectorstore is None:
+            self.vectorstore = FAISS.from_embeddings(pairs, _PrecomputedEmbeddings(), metadatas=batch.metadatas, ids=batch.ids)
+        else:
+            self.vectorstore.add_embeddings(pairs, metadatas=batch.metadatas, ids=batch.ids)
+
+    def run(self) -> Dict:
+        started = time.perf_counter()
+        self._load_existing()
+        changed, stale_ids = self._plan()
+        if stale_ids and self.vectorstore is not None:
+            # One delete: FAISS re-packs its id mapping on every call
+            self.vectorstore.delete(stale_ids)
+        planned = time.perf_counter()
+
+        chunks = 0
+        if changed:
+            context = multiprocessing.get_context("spawn")  # torch is not fork-safe
+            with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(self.model_name,)) as pool:
+                in_flight = {}
+                for batch in self._chunks(changed):
+                    if len(in_flight) >= self.workers * 2:
+                        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            chunks += self._finish(in_flight.pop(future), future)
+                    in_flight[pool.submit(_embed_batch, batch.texts)] = batch
+                for future in wait(in_flight).done:
+                    chunks += self._finish(in_flight.pop(future), future)
+
+        if changed or stale_ids:
+            if self.vectorstore is not None and self.vectorstore.index.ntotal:
+                save_index(self.vectorstore, self.index_dir, self.model_name, extra={"manifest": self.manifest})
+            elif os.path.isdir(self.index_dir):
+                shutil.rmtree(self.index_dir)
+        elapsed = time.perf_counter() - started
+        embed_seconds = time.perf_counter() - planned
+        return {
+            "articles": len(self.manifest),
+            "ingested": len(changed),
+            "unchanged": len(self.manifest) - len(changed),
+            "chunks_embedded": chunks,
+            "chunks_deleted": len(stale_ids),
+            "seconds": round(elapsed, 2),
+            "docs_per_second": round(len(changed) / embed_seconds, 1) if changed and embed_seconds else 0.0,
+            "chunks_per_second": round(chunks / embed_seconds, 1) if chunks and embed_seconds else 0.0
+        }
+
+    def _finish(self, batch: _Batch, future) -> int:
+        self._add(batch, future.result())
+        return len(batch.texts)
+
+
+def load_help_center(embeddings, index_dir: str = HELP_CENTER_DIR):
+    """The ingested help-center store (memory-mapped), or None if there is none"""
+    if not os.path.isfile(os.path.join(index_dir, "index.faiss")):
+        return None
+    return load_index(index_dir, embeddings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest help-center articles into the RAG knowledge base")
+    parser.add_argument("--source", required=True, help="Directory of .md/.txt/.html articles")
+    parser.add_argument("--index-dir", default=HELP_CENTER_DIR)
+    parser.add_argument("--workers", type=int, default=EMBED_WORKERS, help="Embedding processes")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Chunks per embedding batch")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP)
+    args = parser.parse_args()
+
+    result = HelpCenterIngestor(
+        args.source, args.index_dir, workers=args.workers, batch_size=args.batch_size,
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap
+    ).run()
+    print(f"{result['ingested']} articles ingested ({result['unchanged']} unchanged), "
+          f"{result['chunks_embedded']} chunks embedded, {result['chunks_deleted']} deleted "
+          f"in {result['seconds']}s: {result['docs_per_second']} docs/sec, "
+          f"{result['chunks_per_second']} chunks/sec")
+
+
+if __name__ == "__main__":
+    main()
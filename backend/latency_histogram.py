@@ -0,0 +1,259 @@
+# Fixed-memory latency histograms for the BigShorts API
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Relative accuracy of every percentile estimate (1%)
+RELATIVE_ACCURACY = 0.01
+
+# Smallest and largest latencies we track, in seconds. Anything outside the
+# range is clamped into the first or last bucket.
+MIN_TRACKED_SECONDS = 0.0001
+MAX_TRACKED_SECONDS = 3600.0
+
+# Time windows kept per route/lane (window length in seconds, number of windows)
+WINDOW_SECONDS = 60
+WINDOW_COUNT = 60
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+_BUCKET_COUNT = int(math.ceil(math.log(MAX_TRACKED_SECONDS / MIN_TRACKED_SECONDS) / _LOG_GAMMA)) + 1
+
+
+class LatencyHistogram:
+    """Log-bucketed histogram with O(1) updates and mergeable state
+
+    Bucket i covers (MIN * gamma^(i-1), MIN * gamma^i], so any percentile read
+    from it is within RELATIVE_ACCURACY of the true sample value.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    @staticmethod
+    def _bucket_index(value: float) -> int:
+        if value <= MIN_TRACKED_SECONDS:
+            return 0
+        index = int(math.ceil(math.log(value / MIN_TRACKED_SECONDS) / _LOG_GAMMA))
+        return min(index, _BUCKET_COUNT - 1)
+
+    @staticmethod
+    def _bucket_value(index: int) -> float:
+        # Midpoint (in log space) of the bucket, which bounds the relative error
+        if index == 0:
+            return MIN_TRACKED_SECONDS
+        return MIN_TRACKED_SECONDS * 2 * _GAMMA ** index / (_GAMMA + 1)
+
+    def record(self, value: float) -> None:
+        """Add one sample (seconds)"""
+        self.counts[self._bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Fold another histogram's samples into this one"""
+        if other.count == 0:
+            return
+        counts = self.counts
+        for index, bucket_count in enumerate(other.counts):
+            if bucket_count:
+                counts[index] += bucket_count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, fraction: float) -> float:
+        """Return the value below which `fraction` (0.0-1.0) of samples fall"""
+        if self.count == 0:
+            return 0.0
+        rank = max(1, int(math.ceil(fraction * self.count)))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                # Never report outside the observed range
+                return min(max(self._bucket_value(index), self.min), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        """Summary used by the stats endpoints"""
+        return {
+            "count": self.count,
+            "average": round(self.mean(), 4),
+            "p50_median": round(self.percentile(0.50), 4),
+            "p95": round(self.percentile(0.95), 4),
+            "p99": round(self.percentile(0.99), 4),
+            "min": round(self.min, 4) if self.count else 0,
+            "max": round(self.max, 4),
+        }
+
+    def to_dict(self) -> Dict:
+        """Serialize to a sparse dict so other workers can merge it"""
+        return {
+            "relative_accuracy": RELATIVE_ACCURACY,
+            "buckets": {str(i): c for i, c in enumerate(self.counts) if c},
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else None,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "LatencyHistogram":
+        """Rebuild a histogram from to_dict() output; raises ValueError for anything malformed"""
+        if not isinstance(data, dict):
+            raise ValueError("Histogram snapshot must be an object")
+        if data.get("relative_accuracy", RELATIVE_ACCURACY) != RELATIVE_ACCURACY:
+            raise ValueError("Cannot merge histograms built with a different relative accuracy")
+        buckets = data.get("buckets", {})
+        if not isinstance(buckets, dict):
+            raise ValueError("Histogram buckets must be an object of index -> count")
+        histogram = cls()
+        for index, bucket_count in buckets.items():
+            try:
+                index = int(index)
+            except (TypeError, ValueError):
+                raise ValueError(f"Bad bucket index {index!r}") from None
+            if not 0 <= index < _BUCKET_COUNT:
+                raise ValueError(f"Bucket index {index} out of range")
+            if not _is_count(bucket_count):
+                raise ValueError(f"Bad count {bucket_count!r} for bucket {index}")
+            histogram.counts[index] = bucket_count
+        count = data.get("count", 0)
+        if not _is_count(count) or count != sum(histogram.counts):
+            raise ValueError("Histogram count does not match its buckets")
+        total, low, high = data.get("total", 0.0), data.get("min"), data.get("max", 0.0)
+        if not _is_seconds(total) or not _is_seconds(high) or not (low is None or _is_seconds(low)):
+            raise ValueError("Histogram total, min and max must be non-negative numbers")
+        histogram.count = count
+        histogram.total = float(total)
+        histogram.min = float(low) if low is not None else math.inf
+        histogram.max = float(high)
+        return histogram
+
+
+def _is_count(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def _is_seconds(value) -> bool:
+    return (isinstance(value, (int, float)) and not isinstance(value, bool)
+            and math.isfinite(value) and value >= 0)
+
+
+class WindowedHistogram:
+    """Ring of per-window histograms plus an all-time histogram"""
+
+    def __init__(self, window_seconds: int = WINDOW_SECONDS, window_count: int = WINDOW_COUNT):
+        self.window_seconds = window_seconds
+        self.window_count = window_count
+        self.all_time = LatencyHistogram()
+        # slot -> (window start, histogram)
+        self.windows: List[Optional[Tuple[int, LatencyHistogram]]] = [None] * window_count
+
+    def _window_start(self, now: float) -> int:
+        return int(now // self.window_seconds) * self.window_seconds
+
+    def record(self, value: float, now: float) -> None:
+        start = self._window_start(now)
+        slot = (start // self.window_seconds) % self.window_count
+        entry = self.windows[slot]
+        if entry is None or entry[0] != start:
+            # Slot holds a window that has aged out; reuse it
+            entry = (start, LatencyHistogram())
+            self.windows[slot] = entry
+        entry[1].record(value)
+        self.all_time.record(value)
+
+    def recent(self, seconds: int, now: float) -> LatencyHistogram:
+        """Merge the windows that overlap the last `seconds` seconds"""
+        oldest = self._window_start(now) - (max(1, int(math.ceil(seconds / self.window_seconds))) - 1) * self.window_seconds
+        merged = LatencyHistogram()
+        for entry in self.windows:
+            if entry is not None and entry[0] >= oldest:
+                merged.merge(entry[1])
+        return merged
+
+
+class LatencyTracker:
+    """Thread-safe latency histograms keyed by (route, lane)
+
+    lane is "deterministic" for rule-based answers and "llm" when the query
+    reached the model.
+    """
+
+    def __init__(self, window_seconds: int = WINDOW_SECONDS, window_count: int = WINDOW_COUNT):
+        self.window_seconds = window_seconds
+        self.window_count = window_count
+        self._series: Dict[Tuple[str, str], WindowedHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, route: str, lane: str, value: float) -> None:
+        now = time.time()
+        with self._lock:
+            series = self._series.get((route, lane))
+            if series is None:
+                series = WindowedHistogram(self.window_seconds, self.window_count)
+                self._series[(route, lane)] = series
+            series.record(value, now)
+
+    def histogram(self, route: Optional[str] = None, lane: Optional[str] = None,
+                  window_seconds: Optional[int] = None) -> LatencyHistogram:
+        """Merged histogram filtered by route/lane, all-time or over a recent window"""
+        now = time.time()
+        merged = LatencyHistogram()
+        with self._lock:
+            for (series_route, series_lane), series in self._series.items():
+                if route is not None and series_route != route:
+                    continue
+                if lane is not None and series_lane != lane:
+                    continue
+                if window_seconds is None:
+                    merged.merge(series.all_time)
+                else:
+                    merged.merge(series.recent(window_seconds, now))
+        return merged
+
+    def series_keys(self) -> List[Tuple[str, str]]:
+        with self._lock:
+            return sorted(self._series.keys())
+
+    def snapshot(self) -> Dict:
+        """All-time histograms per route/lane, in a form `merge_snapshot` accepts"""
+        with self._lock:
+            return {
+                f"{route}|{lane}": series.all_time.to_dict()
+                for (route, lane), series in self._series.items()
+            }
+
+
+def merge_snapshots(snapshots: List[Dict]) -> Dict[str, LatencyHistogram]:
+    """Merge `LatencyTracker.snapshot()` outputs from several workers
+
+    Raises ValueError when a snapshot is not a mapping of series key to
+    histogram.
+    """
+    if not isinstance(snapshots, list):
+        raise ValueError("Expected a list of snapshots")
+    merged: Dict[str, LatencyHistogram] = {}
+    for snapshot in snapshots:
+        if not isinstance(snapshot, dict):
+            raise ValueError("Each snapshot must be an object of series -> histogram")
+        for key, data in snapshot.items():
+            merged.setdefault(key, LatencyHistogram()).merge(LatencyHistogram.from_dict(data))
+    return merged
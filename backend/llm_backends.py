@@ -0,0 +1,568 @@
+# Pluggable text-generation backends for BigShortsChatbot
+#
+#   LlamaCppBackend    in-process llama.cpp (llama_cpp.Llama), the default
+#   OpenAIHTTPBackend  OpenAI-compatible /v1/completions server, e.g. llama.cpp's llama-server
+#   AsyncOpenAIHTTPBackend  the same over a pooled async client, awaited on the event loop
+#   FakeBackend        deterministic output with configurable latency, or replay of a recording
+#   RecordingBackend   wraps another backend and appends each generation to a JSONL file
+#
+# Select one with create_backend() or the LLM_BACKEND environment variable.
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+from structured_log import get_logger
+
+logger = get_logger("llm")
+
+# Backend used when none is passed explicitly: "llama", "http" or "fake"
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "llama")
+
+# Base URL of the OpenAI-compatible server for the "http" backend
+LLM_SERVER_URL = os.environ.get("LLM_SERVER_URL", "http://127.0.0.1:8080/v1")
+
+# Append every generation to this JSONL file (any backend)
+LLM_RECORD_PATH = os.environ.get("LLM_RECORD_PATH")
+
+# Replay generations from this JSONL file (fake backend)
+LLM_REPLAY_PATH = os.environ.get("LLM_REPLAY_PATH")
+
+# Async HTTP backend: pooled keep-alive connections, generation slots on the
+# server (llama-server --parallel) and retries before the first token
+LLM_POOL_SIZE = int(os.environ.get("LLM_POOL_SIZE", "16"))
+LLM_SLOTS = int(os.environ.get("LLM_SLOTS", "4"))
+LLM_RETRIES = int(os.environ.get("LLM_RETRIES", "2"))
+LLM_RETRY_BACKOFF = float(os.environ.get("LLM_RETRY_BACKOFF", "0.25"))
+
+# Fake backend latency: time to first token and decode throughput. With
+# FAKE_ASYNC=0 it only offers the blocking interface (exercises the thread pool).
+FAKE_PREFILL_SECONDS = float(os.environ.get("FAKE_PREFILL_SECONDS", "0.2"))
+FAKE_TOKENS_PER_SECOND = float(os.environ.get("FAKE_TOKENS_PER_SECOND", "20"))
+FAKE_ASYNC = os.environ.get("FAKE_ASYNC", "1") != "0"
+
+# Server responses worth retrying (overloaded or restarting)
+RETRYABLE_STATUS = (429, 502, 503, 504)
+
+# Rough characters-per-token ratio when a backend cannot tokenize
+CHARS_PER_TOKEN = 4
+
+
+def prompt_fingerprint(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class LLMBackend:
+    """Interface used by BigShortsChatbot to generate text
+
+    stream() yields text pieces (normally one token each) and is called from
+    worker threads, so implementations must be safe to use concurrently or
+    serialize internally. Backends with supports_async also provide
+    astream()/acount_tokens(), which the chatbot awaits on the event loop
+    instead of occupying a worker thread.
+    """
+
+    name = "base"
+    supports_async = False
+
+    def stream(self, prompt: str, max_tokens: int = 128, temperature: float = 0.5,
+               stop: Sequence[str] = ()) -> Iterator[str]:
+        raise NotImplementedError
+
+    def complete(self, prompt: str, max_tokens: int = 128, temperature: float = 0.5,
+                 stop: Sequence[str] = ()) -> str:
+        return "".join(self.stream(prompt, max_tokens, temperature, stop))
+
+    def count_tokens(self, text: str) -> int:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+
+    def stats(self) -> Dict:
+        return {"backend": self.name}
+
+    def close(self) -> None:
+        pass
+
+
+class LlamaCppBackend(LLMBackend):
+    """In-process llama.cpp through llama-cpp-python
+
+    llama_cpp.Llama is not thread-safe, so generations are serialized on a
+    lock; concurrent callers queue here rather than corrupting the context.
+    """
+
+    name = "llama"
+
+    def __init__(self, model_path: str, **llama_kwargs):
+        from llama_cpp import Llama
+        logger.info("Loading model from %s", model_path)
+        self.llm = Llama(model_path=model_path, **llama_kwargs)
+        self._lock = threading.Lock()
+        logger.info("Model loaded successfully")
+
+    def stream(self, prompt: str, max_tokens: int = 128, temperature: float = 0.5,
+               stop: Sequence[str] = ()) -> Iterator[str]:
+        with self._lock:
+            chunks = self.llm(prompt, max_tokens=max_tokens, temperature=temperature,
+                              stop=list(stop), stream=True)
+            for chunk in chunks:
+                yield chunk["choices"][0]["text"]
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.llm.tokenize(text.encode("utf-8")))
+
+
+class OpenAIHTTPBackend(LLMBackend):
+    """Streaming client for an OpenAI-compatible completions endpoint
+
+    Uses /v1/completions with stream=true. Token counts come from llama.cpp's
+    /tokenize endpoint when the server has one, else from a length estimate.
+    """
+
+    name = "http"
+
+    def __init__(self, base_url: str = LLM_SERVER_URL, model: str = "local", api_key: Optional[str] = None,
+                 timeout: float = 120.0):
+        self.base_url = base_url.rstrip("/")
+        self.model = model
+        self.api_key = api_key or os.environ.get("LLM_API_KEY")
+        self.timeout = timeout
+        self._can_tokenize = True
+        self.requests = 0
+        self.failures = 0
+
+    def _request(self, url: str, payload: Dict) -> urllib.request.Request:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), headers=headers, method="POST")
+
+    def stream(self, prompt: str, max_tokens: int = 128, temperature: float = 0.5,
+               stop: Sequence[str] = ()) -> Iterator[str]:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stop": list(stop),
+            "stream": True
+        }
+        self.requests += 1
+        try:
+            with urllib.request.urlopen(self._request(f"{self.base_url}/completions", payload), timeout=self.timeout) as resp:
+                for raw_line in resp:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    text = json.loads(data)["choices"][0].get("text", "")
+                    if text:
+                        yield text
+        except Exception:
+            self.failures += 1
+            raise
+
+    def count_tokens(self, text: str) -> int:
+        if self._can_tokenize:
+            # llama.cpp serves /tokenize next to /v1, not under it
+            root = self.base_url[:-3] if self.base_url.endswith("/v1") else self.base_url
+            try:
+                with urllib.request.urlopen(self._request(f"{root}/tokenize", {"content": text}), timeout=self.timeout) as resp:
+                    return len(json.loads(resp.read())["tokens"])
+            except Exception:
+                # Not a llama.cpp server; don't ask again
+                self._can_tokenize = False
+        return super().count_tokens(text)
+
+    def stats(self) -> Dict:
+        return {"backend": self.name, "base_url": self.base_url, "requests": self.requests, "failures": self.failures}
+
+
+class AsyncOpenAIHTTPBackend(OpenAIHTTPBackend):
+    """OpenAIHTTPBackend with an async, pooled httpx client
+
+    Generations hold one of `slots` permits for their whole duration, matching
+    the parallel slots of the inference server, so excess requests wait here
+    instead of queueing invisibly on the server. Connection or overload errors
+    are retried with exponential backoff until the first token arrives; after
+    that an error is final. Cancelling the awaiting task closes the response,
+    which makes llama-server stop generating for it.
+    """
+
+    name = "http_async"
+    supports_async = True
+
+    def __init__(self, base_url: str = LLM_SERVER_URL, model: str = "local", api_key: Optional[str] = None,
+                 timeout: float = 120.0, pool_size: int = LLM_POOL_SIZE, slots: int = LLM_SLOTS,
+                 retries: int = LLM_RETRIES, retry_backoff: float = LLM_RETRY_BACKOFF):
+        import httpx
+        super().__init__(base_url, model, api_key, timeout)
+        self._httpx = httpx
+        self.pool_size = pool_size
+        self.slots = slots
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self._client = None
+        self._client_loop = None
+        self._slot_sem = None
+        self.retried = 0
+        self.cancelled = 0
+        self.slots_busy = 0
+        self.slot_wait_seconds = 0.0
+        self._busy_since = time.monotonic()
+        self._busy_integral = 0.0
+        self._started_at = time.monotonic()
+
+    def _ensure_client(self):
+        # httpx clients and asyncio primitives belong to one event loop. A
+        # second live loop would need its own client and slot semaphore,
+        # leaking the first and letting requests past the slot limit, so
+        # only rebind once the old loop is closed (its requests went with it).
+        loop = asyncio.get_running_loop()
+        if self._client_loop is not None and self._client_loop is not loop and not self._client_loop.is_closed():
+            raise RuntimeError(f"{type(self).__name__} is bound to another running event loop")
+        if self._client is None or self._client_loop is not loop:
+            limits = self._httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            timeout = self._httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0))
+            headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+            self._client = self._httpx.AsyncClient(limits=limits, timeout=timeout, headers=headers)
+            self._client_loop = loop
+            self._slot_sem = asyncio.Semaphore(self.slots)
+        return self._client
+
+    def _set_busy(self, delta: int) -> None:
+        now = time.monotonic()
+        self._busy_integral += self.slots_busy * (now - self._busy_since)
+        self._busy_since = now
+        self.slots_busy += delta
+
+    async def astream(self, prompt: str, max_tokens: int = 128, temperature: float = 0.5,
+                      stop: Sequence[str] = ()) -> AsyncIterator[str]:
+        client = self._ensure_client()
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stop": list(stop),
+            "stream": True
+        }
+        wait_started = time.monotonic()
+        async with self._slot_sem:
+            self.slot_wait_seconds += time.monotonic() - wait_started
+            self._set_busy(1)
+            self.requests += 1
+            try:
+                attempt = 0
+                while True:
+                    yielded = False
+                    try:
+                        async with client.stream("POST", f"{self.base_url}/completions", json=payload) as resp:
+                            if resp.status_code in RETRYABLE_STATUS and attempt < self.retries:
+                                raise _Retryable(f"HTTP {resp.status_code}")
+                            resp.raise_for_status()
+                            async for line in resp.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if data == "[DONE]":
+                                    break
+                                text = json.loads(data)["choices"][0].get("text", "")
+                                if text:
+                                    yielded = True
+                                    yield text
+                        return
+                    except (_Retryable, self._httpx.TransportError) as e:
+                        # Only safe to retry while the caller has seen nothing
+                        if yielded or attempt >= self.retries:
+                            raise
+                        attempt += 1
+                        self.retried += 1
+                        logger.warning("LLM request failed (%s), retry %d/%d", e, attempt, self.retries)
+                        await asyncio.sleep(self.retry_backoff * 2 ** (attempt - 1))
+            except (asyncio.CancelledError, GeneratorExit):
+                self.cancelled += 1
+                raise
+            except Exception:
+                self.failures += 1
+                raise
+            finally:
+                self._set_busy(-1)
+
+    async def acount_tokens(self, text: str) -> int:
+        if self._can_tokenize:
+            root = self.base_url[:-3] if self.base_url.endswith("/v1") else self.base_url
+            try:
+                resp = await self._ensure_client().post(f"{root}/tokenize", json={"content": text})
+                resp.raise_for_status()
+                return len(resp.json()["tokens"])
+            except Exception:
+                self._can_tokenize = False
+        return LLMBackend.count_tokens(self, text)
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        busy_integral = self._busy_integral + self.slots_busy * (now - self._busy_since)
+        elapsed = now - self._started_at
+        return {
+            **super().stats(),
+            "backend": self.name,
+            "pool_size": self.pool_size,
+            "slots": self.slots,
+            "slots_busy": self.slots_busy,
+            "slot_utilization": round(busy_integral / (self.slots * elapsed), 4) if elapsed > 0 else 0.0,
+            "slot_wait_seconds": round(self.slot_wait_seconds, 3),
+            "retries": self.retried,
+            "cancelled": self.cancelled
+        }
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class _Retryable(Exception):
+    """Raised internally for retryable HTTP statuses"""
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic stand-in for the model
+
+    Output depends only on the prompt. Latency is FAKE_PREFILL_SECONDS before
+    the first token plus 1/FAKE_TOKENS_PER_SECOND per token, unless a
+    recording is replayed, in which case the recorded tokens and timings are
+    reproduced (scaled by `speed`). Prompts missing from the recording fall
+    back to the synthetic output.
+    """
+
+    name = "fake"
+
+    SENTENCES = [
+        "BigShorts lets you share SHOTs, SNIPs and SSUPs with your followers.",
+        "Post consistently and keep the first three seconds of every SNIP engaging.",
+        "Use trending audio and clear captions to reach more viewers.",
+        "Collab posts are a great way to grow together with other creators.",
+        "You can earn Bigcoins by creating content and staying active every day.",
+        "Check the creation guides for step-by-step help with each content type."
+    ]
+
+    def __init__(self, prefill_seconds: float = FAKE_PREFILL_SECONDS, tokens_per_second: float = FAKE_TOKENS_PER_SECOND,
+                 response: Optional[str] = None, replay_path: Optional[str] = None, speed: float = 1.0,
+                 async_mode: bool = FAKE_ASYNC):
+        self.supports_async = async_mode
+        self.prefill_seconds = prefill_seconds
+        self.tokens_per_second = tokens_per_second
+        self.response = response
+        self.speed = speed
+        self.recordings: Dict[str, Dict] = {}
+        if replay_path:
+            self.recordings = load_recordings(replay_path)
+            logger.info("Replaying %d recorded generations from %s", len(self.recordings), replay_path)
+        self.generations = 0
+        self.replayed = 0
+
+    def synthetic_text(self, prompt: str) -> str:
+        if self.response is not None:
+            return self.response
+        rng = random.Random(prompt_fingerprint(prompt))
+        return " ".join(rng.sample(self.SENTENCES, 2))
+
+    def stream(self, prompt: str, max_tokens: int = 128, temperature: float = 0.5,
+               stop: Sequence[str] = ()) -> Iterator[str]:
+        self.generations += 1
+        recording = self.recordings.get(prompt_fingerprint(prompt))
+        if recording is not None:
+            self.replayed += 1
+            yield from self._replay(recording, max_tokens)
+            return
+
+        if self.prefill_seconds > 0:
+            time.sleep(self.prefill_seconds)
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for index, token in enumerate(split_tokens(self.synthetic_text(prompt))):
+            if index >= max_tokens:
+                break
+            if index and delay:
+                time.sleep(delay)
+            yield token
+
+    async def astream(self, prompt: str, max_tokens: int = 128, temperature: float = 0.5,
+                      stop: Sequence[str] = ()) -> AsyncIterator[str]:
+        """Same output and timing as stream(), sleeping on the event loop"""
+        self.generations += 1
+        recording = self.recordings.get(prompt_fingerprint(prompt))
+        if recording is not None:
+            self.replayed += 1
+            started = time.perf_counter()
+            for index, (token, offset) in enumerate(zip(recording["tokens"], recording["token_offsets"])):
+                if index >= max_tokens:
+                    break
+                wait = offset / self.speed - (time.perf_counter() - started)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                yield token
+            return
+
+        if self.prefill_seconds > 0:
+            await asyncio.sleep(self.prefill_seconds)
+        delay = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for index, token in enumerate(split_tokens(self.synthetic_text(prompt))):
+            if index >= max_tokens:
+                break
+            if index and delay:
+                await asyncio.sleep(delay)
+            yield token
+
+    async def acount_tokens(self, text: str) -> int:
+        return self.count_tokens(text)
+
+    def _replay(self, recording: Dict, max_tokens: int) -> Iterator[str]:
+        started = time.perf_counter()
+        for index, (token, offset) in enumerate(zip(recording["tokens"], recording["token_offsets"])):
+            if index >= max_tokens:
+                break
+            # Sleep until the token's recorded offset from the request start
+            wait = offset / self.speed - (time.perf_counter() - started)
+            if wait > 0:
+                time.sleep(wait)
+            yield token
+
+    def count_tokens(self, text: str) -> int:
+        recording = self.recordings.get(prompt_fingerprint(text))
+        if recording is not None and recording.get("prompt_tokens"):
+            return recording["prompt_tokens"]
+        return super().count_tokens(text)
+
+    def stats(self) -> Dict:
+        return {
+            "backend": self.name,
+            "prefill_seconds": self.prefill_seconds,
+            "tokens_per_second": self.tokens_per_second,
+            "recordings": len(self.recordings),
+            "generations": self.generations,
+            "replayed": self.replayed
+        }
+
+
+class RecordingBackend(LLMBackend):
+    """Passes generations through to `inner` and appends them to a JSONL file
+
+    Each line holds the prompt fingerprint, prompt token count, tokens and the
+    offset of each token from the start of the request, which is what
+    FakeBackend needs to replay it.
+    """
+
+    def __init__(self, inner: LLMBackend, path: str):
+        self.inner = inner
+        self.path = path
+        self.name = f"{inner.name}+record"
+        self.supports_async = inner.supports_async
+        self._lock = threading.Lock()
+        self.recorded = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def stream(self, prompt: str, max_tokens: int = 128, temperature: float = 0.5,
+               stop: Sequence[str] = ()) -> Iterator[str]:
+        started = time.perf_counter()
+        tokens: List[str] = []
+        offsets: List[float] = []
+        for token in self.inner.stream(prompt, max_tokens, temperature, stop):
+            offsets.append(round(time.perf_counter() - started, 6))
+            tokens.append(token)
+            yield token
+        self._write(prompt, self.inner.count_tokens(prompt), max_tokens, temperature, tokens, offsets)
+
+    async def astream(self, prompt: str, max_tokens: int = 128, temperature: float = 0.5,
+                      stop: Sequence[str] = ()) -> AsyncIterator[str]:
+        started = time.perf_counter()
+        tokens: List[str] = []
+        offsets: List[float] = []
+        async for token in self.inner.astream(prompt, max_tokens, temperature, stop):
+            offsets.append(round(time.perf_counter() - started, 6))
+            tokens.append(token)
+            yield token
+        prompt_tokens = await self.inner.acount_tokens(prompt)
+        self._write(prompt, prompt_tokens, max_tokens, temperature, tokens, offsets)
+
+    def _write(self, prompt: str, prompt_tokens: int, max_tokens: int, temperature: float,
+               tokens: List[str], offsets: List[float]) -> None:
+        entry = {
+            "prompt_sha256": prompt_fingerprint(prompt),
+            "prompt_tokens": prompt_tokens,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "tokens": tokens,
+            "token_offsets": offsets,
+            "recorded_at": time.time()
+        }
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.recorded += 1
+
+    def count_tokens(self, text: str) -> int:
+        return self.inner.count_tokens(text)
+
+    async def acount_tokens(self, text: str) -> int:
+        return await self.inner.acount_tokens(text)
+
+    def stats(self) -> Dict:
+        return {**self.inner.stats(), "backend": self.name, "record_path": self.path, "recorded": self.recorded}
+
+    def close(self) -> None:
+        self.inner.close()
+
+    async def aclose(self) -> None:
+        if hasattr(self.inner, "aclose"):
+            await self.inner.aclose()
+
+
+def split_tokens(text: str) -> List[str]:
+    """Split text into word-sized pieces that join back to the original"""
+    return re.findall(r"\s*\S+", text)
+
+
+def load_recordings(path: str) -> Dict[str, Dict]:
+    """Read a RecordingBackend file; later generations of a prompt win"""
+    recordings = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entry = json.loads(line)
+                recordings[entry["prompt_sha256"]] = entry
+    return recordings
+
+
+def create_backend(kind: Optional[str] = None, model_path: Optional[str] = None, **llama_kwargs) -> LLMBackend:
+    """Build the backend named by `kind` (default LLM_BACKEND)
+
+    llama_kwargs are passed to llama_cpp.Llama for the "llama" backend. When
+    LLM_RECORD_PATH is set the backend is wrapped in a RecordingBackend.
+    """
+    kind = (kind or LLM_BACKEND).lower()
+    if kind == "llama":
+        backend = LlamaCppBackend(model_path, **llama_kwargs)
+    elif kind == "http":
+        try:
+            backend = AsyncOpenAIHTTPBackend(LLM_SERVER_URL)
+        except ImportError:
+            logger.warning("httpx is not installed; using the blocking HTTP backend")
+            backend = OpenAIHTTPBackend(LLM_SERVER_URL)
+    elif kind == "fake":
+        backend = FakeBackend(replay_path=LLM_REPLAY_PATH)
+    else:
+        raise ValueError(f"Unknown LLM backend {kind!r}; expected llama, http or fake")
+    if LLM_RECORD_PATH:
+        backend = RecordingBackend(backend, LLM_RECORD_PATH)
+    return backend
@@ -0,0 +1,338 @@
+# Async load generator for the BigShorts APIs
+#
+# Drives /api/chat, /api/chat/stream and /api/select-faq (main.py) and the
+# /ws/{session_id} WebSocket (api_server.py) with a weighted traffic mix, at
+# either a fixed arrival rate (open loop) or a fixed number of concurrent users
+# (closed loop), and prints a JSON report. Nothing leaves the machine unless
+# you point --base-url/--ws-url elsewhere.
+#
+#   python loadtest.py --rate 20 --duration 60
+#   python loadtest.py --concurrency 50 --duration 30 --mix greeting=5,faq=5,issue=2,open=3
+#   python loadtest.py --rate 5 --mix ws=1 --ws-url ws://127.0.0.1:8000/ws
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from latency_histogram import LatencyHistogram
+
+# Scenario name -> relative weight
+DEFAULT_MIX = {"greeting": 30, "faq": 35, "issue": 15, "open": 20, "ws": 0}
+
+GREETINGS = ["hi", "hello", "hey there", "good morning", "hello bigshorts"]
+FAQ_TYPES = ["shot", "ssup", "snip", "collab", "mini", "bigcoins_reward"]
+ISSUES = [
+    "my video is not uploading",
+    "the app keeps crashing when I open it",
+    "I can't log in to my account",
+    "my bigcoins are not showing",
+    "audio is out of sync in my snip"
+]
+OPEN_QUESTIONS = [
+    "how can I grow my audience on bigshorts",
+    "what kind of content performs best for a cooking channel",
+    "give me ideas for a travel snip",
+    "how often should I post to keep my followers engaged",
+    "what makes a good hook in the first three seconds"
+]
+
+
+class ScenarioStats:
+    """Outcome counters and latency histograms for one scenario"""
+
+    def __init__(self):
+        self.sent = 0
+        self.ok = 0
+        self.shed = 0
+        self.errors = 0
+        self.latency = LatencyHistogram()
+        self.ttft = LatencyHistogram()
+        self.error_samples: List[str] = []
+
+    def record_error(self, message: str) -> None:
+        self.errors += 1
+        if len(self.error_samples) < 5:
+            self.error_samples.append(message[:200])
+
+    def report(self) -> Dict:
+        result = {
+            "sent": self.sent,
+            "ok": self.ok,
+            "shed": self.shed,
+            "errors": self.errors,
+            "latency_seconds": self.latency.summary()
+        }
+        if self.ttft.count:
+            result["ttft_seconds"] = self.ttft.summary()
+        if self.error_samples:
+            result["error_samples"] = self.error_samples
+        return result
+
+
+def is_shed(status: int, body: Optional[Dict]) -> bool:
+    """True when the server refused the request (rate limit, full queue, or api_server admission)"""
+    if status in (429, 503):
+        return True
+    return isinstance(body, dict) and bool(body.get("rate_limit_exceeded") or body.get("queue_full")
+                                           or body.get("busy"))
+
+
+class LoadTest:
+    def __init__(self, args, aiohttp_module):
+        self.args = args
+        self.aiohttp = aiohttp_module
+        self.mix = parse_mix(args.mix)
+        self.names = list(self.mix)
+        self.weights = [self.mix[name] for name in self.names]
+        self.stats: Dict[str, ScenarioStats] = {name: ScenarioStats() for name in self.names}
+        self.sessions = [str(uuid.uuid4()) for _ in range(args.sessions)]
+        self.in_flight = 0
+        self.client_dropped = 0
+        self.session = None
+
+    def pick_session(self) -> str:
+        return random.choice(self.sessions)
+
+    async def post_json(self, path: str, payload: Dict, stats: ScenarioStats) -> None:
+        started = time.perf_counter()
+        async with self.session.post(self.args.base_url + path, json=payload) as resp:
+            body = await resp.json(content_type=None)
+            elapsed = time.perf_counter() - started
+        if is_shed(resp.status, body):
+            stats.shed += 1
+        elif resp.status != 200 or (isinstance(body, dict) and body.get("type") == "error"):
+            stats.record_error(f"{resp.status}: {body}")
+        else:
+            stats.ok += 1
+            stats.latency.record(elapsed)
+
+    async def stream_chat(self, content: str, stats: ScenarioStats) -> None:
+        """POST /api/chat/stream; TTFT is the first `token` event (or `done` if none)"""
+        started = time.perf_counter()
+        first_event = None
+        event = None
+        done = None
+        payload = {"content": content, "session_id": self.pick_session()}
+        async with self.session.post(self.args.base_url + "/api/chat/stream", json=payload) as resp:
+            if resp.content_type != "text/event-stream":
+                # Rejected before streaming started; the body is plain JSON
+                body = await resp.json(content_type=None)
+                if is_shed(resp.status, body):
+                    stats.shed += 1
+                else:
+                    stats.record_error(f"{resp.status}: {body}")
+                return
+            async for raw_line in resp.content:
+                line = raw_line.decode("utf-8").rstrip("\r\n")
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif line.startswith("data: "):
+                    if first_event is None:
+                        first_event = time.perf_counter()
+                    if event == "done":
+                        done = json.loads(line[6:])
+        elapsed = time.perf_counter() - started
+        if done is None:
+            stats.record_error("stream ended without a done event")
+        elif is_shed(200, done):
+            stats.shed += 1
+        elif done.get("type") == "error":
+            stats.record_error(str(done.get("content")))
+        else:
+            stats.ok += 1
+            stats.latency.record(elapsed)
+            stats.ttft.record(first_event - started)
+
+    async def websocket_chat(self, content: str, stats: ScenarioStats) -> None:
+        """One message over /ws/{session_id}; TTFT is the first frame, latency the last
+
+        The server may send several frames per message (e.g. intermediate steps);
+        the exchange ends at a frame whose "final" flag is set, or after the
+        first frame when the server sends no such flag.
+        """
+        started = time.perf_counter()
+        first_frame = None
+        url = f"{self.args.ws_url.rstrip('/')}/{self.pick_session()}"
+        async with self.session.ws_connect(url) as ws:
+            await ws.send_str(content)
+            async for message in ws:
+                if message.type != self.aiohttp.WSMsgType.TEXT:
+                    stats.record_error(f"websocket closed: {message.type}")
+                    return
+                if first_frame is None:
+                    first_frame = time.perf_counter()
+                frame = json.loads(message.data)
+                if is_shed(200, frame):
+                    stats.shed += 1
+                    return
+                if frame.get("final", True):
+                    break
+            await ws.close()
+        if first_frame is None:
+            stats.record_error("websocket closed without a reply")
+            return
+        if frame.get("type") == "error":
+            stats.record_error(f"websocket: {frame}")
+            return
+        stats.ok += 1
+        stats.latency.record(time.perf_counter() - started)
+        stats.ttft.record(first_frame - started)
+
+    async def run_one(self) -> None:
+        name = random.choices(self.names, self.weights)[0]
+        stats = self.stats[name]
+        stats.sent += 1
+        self.in_flight += 1
+        try:
+            if name == "greeting":
+                await self.post_json("/api/chat", {"content": random.choice(GREETINGS), "session_id": self.pick_session()}, stats)
+            elif name == "faq":
+                await self.post_json("/api/select-faq", {"content_type": random.choice(FAQ_TYPES), "session_id": self.pick_session()}, stats)
+            elif name == "issue":
+                await self.post_json("/api/chat", {"content": random.choice(ISSUES), "session_id": self.pick_session()}, stats)
+            elif name == "open":
+                if self.args.no_stream:
+                    await self.post_json("/api/chat", {"content": random.choice(OPEN_QUESTIONS), "session_id": self.pick_session()}, stats)
+                else:
+                    await self.stream_chat(random.choice(OPEN_QUESTIONS), stats)
+            elif name == "ws":
+                await self.websocket_chat(random.choice(GREETINGS + ISSUES + OPEN_QUESTIONS), stats)
+        except asyncio.TimeoutError:
+            stats.record_error("timeout")
+        except Exception as e:
+            stats.record_error(f"{type(e).__name__}: {e}")
+        finally:
+            self.in_flight -= 1
+
+    async def open_loop(self, deadline: float) -> None:
+        """Poisson arrivals at --rate per second, whatever the server's speed"""
+        tasks = set()
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(random.expovariate(self.args.rate))
+            if self.in_flight >= self.args.max_in_flight:
+                # Client-side cap so a stalled server can't exhaust our sockets
+                self.client_dropped += 1
+                continue
+            task = asyncio.ensure_future(self.run_one())
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks, timeout=self.args.timeout)
+
+    async def closed_loop(self, deadline: float) -> None:
+        """--concurrency users, each sending its next request when the last returns"""
+        async def user():
+            while time.perf_counter() < deadline:
+                await self.run_one()
+                if self.args.think_time:
+                    await asyncio.sleep(random.expovariate(1 / self.args.think_time))
+        await asyncio.gather(*(user() for _ in range(self.args.concurrency)))
+
+    async def run(self) -> Dict:
+        timeout = self.aiohttp.ClientTimeout(total=self.args.timeout)
+        connector = self.aiohttp.TCPConnector(limit=0)
+        async with self.aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            self.session = session
+            started = time.perf_counter()
+            deadline = started + self.args.duration
+            if self.args.rate:
+                await self.open_loop(deadline)
+            else:
+                await self.closed_loop(deadline)
+            elapsed = time.perf_counter() - started
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> Dict:
+        overall = LatencyHistogram()
+        ttft = LatencyHistogram()
+        totals = {"sent": 0, "ok": 0, "shed": 0, "errors": 0}
+        for stats in self.stats.values():
+            overall.merge(stats.latency)
+            ttft.merge(stats.ttft)
+            for key in totals:
+                totals[key] += getattr(stats, key)
+        return {
+            "config": {
+                "base_url": self.args.base_url,
+                "ws_url": self.args.ws_url if self.mix.get("ws") else None,
+                "mode": "open_loop" if self.args.rate else "closed_loop",
+                "rate": self.args.rate,
+                "concurrency": None if self.args.rate else self.args.concurrency,
+                "duration_seconds": self.args.duration,
+                "mix": self.mix,
+                "sessions": self.args.sessions
+            },
+            "elapsed_seconds": round(elapsed, 3),
+            **totals,
+            "client_dropped": self.client_dropped,
+            "throughput_rps": round(totals["ok"] / elapsed, 2) if elapsed else 0.0,
+            "offered_rps": round(totals["sent"] / elapsed, 2) if elapsed else 0.0,
+            "shed_rate": round(totals["shed"] / totals["sent"], 4) if totals["sent"] else 0.0,
+            "error_rate": round(totals["errors"] / totals["sent"], 4) if totals["sent"] else 0.0,
+            "latency_seconds": overall.summary(),
+            "ttft_seconds": ttft.summary(),
+            "scenarios": {name: stats.report() for name, stats in self.stats.items() if stats.sent}
+        }
+
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    """Parse "greeting=3,faq=5" into weights; unknown scenarios are an error"""
+    if not spec:
+        return {name: weight for name, weight in DEFAULT_MIX.items() if weight}
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown scenario {name!r}; choose from {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight or 1)
+    mix = {name: weight for name, weight in mix.items() if weight > 0}
+    if not mix:
+        raise ValueError("Traffic mix has no scenario with positive weight")
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the BigShorts APIs")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000", help="main.py server")
+    parser.add_argument("--ws-url", default="ws://127.0.0.1:8000/ws", help="api_server.py WebSocket prefix")
+    parser.add_argument("--mix", default=None, help="Weighted scenarios, e.g. greeting=30,faq=35,issue=15,open=20,ws=0")
+    parser.add_argument("--rate", type=float, default=0.0, help="Open-loop arrivals per second (0 = closed loop)")
+    parser.add_argument("--concurrency", type=int, default=20, help="Closed-loop concurrent users")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between a user's requests (closed loop)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load")
+    parser.add_argument("--sessions", type=int, default=200, help="Distinct session ids to spread requests over")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=2000, help="Open-loop cap on outstanding requests")
+    parser.add_argument("--no-stream", action="store_true", help="Send open questions to /api/chat instead of /api/chat/stream")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=None, help="Also write the JSON report here")
+    args = parser.parse_args()
+
+    try:
+        import aiohttp
+    except ImportError as e:
+        raise ImportError(
+            "You must install package `aiohttp` to run the load generator: for instance run `pip install aiohttp`."
+        ) from e
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    try:
+        report = asyncio.run(LoadTest(args, aiohttp).run())
+    except ValueError as e:
+        parser.error(str(e))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    sys.exit(1 if report["sent"] and report["errors"] == report["sent"] else 0)
+
+
+if __name__ == "__main__":
+    main()
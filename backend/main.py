@@ -1,22 +1,51 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Header
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel, ConfigDict
 from typing import Union, Dict, List, Any, Optional
 import os
 import uvicorn
-from Chatbot2 import BigShortsChatbot
+from Chatbot2 import BigShortsChatbot, reset_query_state, get_query_state, content_creation_guide, CATALOG_VERSION, ALLOWED_ISSUE_TYPES
+from singleflight import SingleFlight
+from latency_histogram import LatencyTracker, merge_snapshots
+from metrics import MetricsRegistry, TOKEN_BUCKETS, TOKENS_PER_SECOND_BUCKETS
+from tracing import Tracer
+from image_manifest import preload_links
+from llm_backends import LLM_BACKEND, create_backend
+from session_expiry import SessionExpiry
+from inference_scheduler import InferenceScheduler, INTERACTIVE, BULK
+from structured_log import configure_logging, shutdown_logging, get_logger, bind_context, reset_context, log_stats
 import asyncio
-import traceback
 import json
 import uuid
 import threading
-from datetime import datetime, timedelta
+from datetime import datetime
 from collections import defaultdict, deque
 import time
 from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+import hashlib
+import math
+
+# Optional fast JSON encoding for the bodies we serialize ourselves (NDJSON
+# batch lines, cached guides); set FAST_JSON=0 to fall back to the stdlib
+# encoder. Routes with a response_model need neither: FastAPI dumps them
+# straight to JSON bytes with pydantic, as long as no default_response_class
+# is set.
+try:
+    import orjson
+    FAST_JSON_AVAILABLE = True
+except ImportError:
+    FAST_JSON_AVAILABLE = False
+USE_FAST_JSON = FAST_JSON_AVAILABLE and os.environ.get("FAST_JSON", "1") != "0"
 
 app = FastAPI(title="Bigshorts Chatbot API")
 
+# Structured logs go through a queue to a background writer thread
+configure_logging()
+logger = get_logger("api")
+
 # Enable CORS
 app.add_middleware(
     CORSMiddleware,
@@ -34,24 +63,30 @@ app.add_middleware(
 # Model path
 MODEL_PATH = "models/mistral-7b-instruct-v0.2.Q4_K_M.gguf"
 
-# Check if model exists
-if not os.path.exists(MODEL_PATH):
-    print(f"WARNING: Model not found at {MODEL_PATH}")
-    print("The API will start but chatbot functionality won't work until the model is available")
+# Check if model exists (only the in-process llama.cpp backend loads it)
+if LLM_BACKEND == "llama" and not os.path.exists(MODEL_PATH):
+    logger.warning("Model not found at %s; the API will start but chatbot functionality won't work until the model is available", MODEL_PATH)
 
 # OPTIMIZED FOR 8 vCPUs, 128 GiB RAM
+# Use 6 worker threads (leaving 2 CPUs for system/async tasks)
+EXECUTOR_WORKERS = 6
+
 # Shared chatbot instance
 chatbot_instance = None
 chatbot_lock = threading.Lock()
 
 # Thread pool for CPU-intensive operations
-# Use 6 threads (leaving 2 CPUs for system/async tasks)
-executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="chatbot_worker")
+executor = ThreadPoolExecutor(max_workers=EXECUTOR_WORKERS, thread_name_prefix="chatbot_worker")
 
 # Request Queue Configuration - Aggressive settings for powerful hardware
 MAX_QUEUE_SIZE = 500  # Large queue to handle traffic spikes
 MAX_CONCURRENT_REQUESTS = 20  # Higher concurrency with 8 vCPUs
-request_semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+# Bulk work from /api/chat/batch shares the same slots but holds at most
+# BATCH_MAX_CONCURRENCY of them, and only when no interactive request waits
+BATCH_MAX_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "2"))
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "1000"))
+inference_scheduler = InferenceScheduler(MAX_CONCURRENT_REQUESTS, BATCH_MAX_CONCURRENCY)
 request_queue_size = 0
 queue_lock = threading.Lock()
 
@@ -60,10 +95,32 @@ RATE_LIMIT_REQUESTS = 30  # 30 requests per window (up from 10)
 RATE_LIMIT_WINDOW = 60  # 60 seconds
 rate_limit_data = defaultdict(lambda: deque())  # session_id -> deque of timestamps
 
+# Stage tracing: fraction of requests exported to the rotating JSONL file.
+# Every response still carries a Server-Timing header.
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_FILE = os.environ.get("TRACE_FILE", "logs/traces.jsonl")
+tracer = Tracer(sample_rate=TRACE_SAMPLE_RATE, path=TRACE_FILE)
+
+# HTTP caching of static guide responses. Guides only change with a deploy, so
+# devices and CDNs may reuse them for GUIDE_MAX_AGE seconds and revalidate with
+# If-None-Match after that.
+GUIDE_MAX_AGE = int(os.environ.get("GUIDE_MAX_AGE", "3600"))
+GUIDE_CACHE_CONTROL = f"public, max-age={GUIDE_MAX_AGE}, stale-while-revalidate=86400"
+
+# Directory of content-hashed guide images (build_image_manifest.py --copy-to).
+# Unset when the images are served by a CDN or the frontend host.
+GUIDE_IMAGE_DIR = os.environ.get("GUIDE_IMAGE_DIR")
+
 # Session management
 last_access = {}
 SESSION_TIMEOUT = 60  # Increased to 60 minutes with more RAM
 
+# Expiry runs every SESSION_SWEEP_INTERVAL seconds and frees at most
+# SESSION_SWEEP_BATCH sessions per lock hold, yielding to the event loop between batches
+SESSION_SWEEP_INTERVAL = 5
+SESSION_SWEEP_BATCH = 200
+session_expiry = SessionExpiry(SESSION_TIMEOUT * 60)
+
 # Stats tracking
 request_stats = {
     "total_requests": 0,
@@ -72,10 +129,76 @@ request_stats = {
     "rate_limited_requests": 0,
     "queue_full_requests": 0,
     "average_response_time": 0.0,
-    "response_times": deque(maxlen=1000)  # Keep last 1000 response times
+    "total_response_time": 0.0,
+    "recent_response_times": deque(maxlen=10)  # Last 10 response times for /api/health
 }
 stats_lock = threading.Lock()
 
+# Latency histograms per route and lane (deterministic vs llm), see latency_histogram.py
+latency_tracker = LatencyTracker()
+
+# Prometheus metrics served at /metrics
+metrics_registry = MetricsRegistry()
+requests_total = metrics_registry.counter(
+    "bigshorts_requests_total", "Requests handled, by route and outcome", ("route", "outcome"))
+query_path_total = metrics_registry.counter(
+    "bigshorts_query_path_total", "Queries answered by each branch of process_query", ("path", "lane"))
+request_duration = metrics_registry.histogram(
+    "bigshorts_request_duration_seconds", "End-to-end request latency", labelnames=("route", "lane"))
+queue_wait = metrics_registry.histogram(
+    "bigshorts_queue_wait_seconds", "Time spent waiting for a concurrency slot")
+executor_wait = metrics_registry.histogram(
+    "bigshorts_executor_wait_seconds", "Time between submitting to the thread pool and a worker starting")
+prompt_tokens = metrics_registry.histogram(
+    "bigshorts_llm_prompt_tokens", "Prompt tokens per LLM generation", TOKEN_BUCKETS)
+prefill_time = metrics_registry.histogram(
+    "bigshorts_llm_prefill_seconds", "Time to first token per LLM generation")
+decode_time = metrics_registry.histogram(
+    "bigshorts_llm_decode_seconds", "Time from first to last token per LLM generation")
+decode_rate = metrics_registry.histogram(
+    "bigshorts_llm_tokens_per_second", "Decode throughput per LLM generation", TOKENS_PER_SECOND_BUCKETS)
+coalesced_total = metrics_registry.counter(
+    "bigshorts_llm_coalesced_total", "LLM queries answered by sharing an identical in-flight generation")
+busy_workers = metrics_registry.gauge(
+    "bigshorts_executor_busy_workers", "Thread-pool workers currently running a query")
+metrics_registry.gauge(
+    "bigshorts_executor_max_workers", "Thread-pool size", lambda: EXECUTOR_WORKERS)
+metrics_registry.gauge(
+    "bigshorts_executor_queued_tasks", "Tasks waiting for a thread-pool worker", lambda: executor._work_queue.qsize())
+metrics_registry.gauge(
+    "bigshorts_request_queue_size", "Requests admitted and not yet finished", lambda: request_queue_size)
+metrics_registry.gauge(
+    "bigshorts_active_sessions", "Sessions seen within the session timeout", lambda: len(last_access))
+llm_cancelled = metrics_registry.counter(
+    "bigshorts_llm_cancelled_total", "Streaming requests whose client disconnected before the answer finished")
+
+def backend_stat(key: str) -> float:
+    """Read a numeric field from the LLM backend's stats (NaN if it has none)"""
+    chatbot = chatbot_instance
+    if chatbot is None:
+        return math.nan
+    return chatbot.backend.stats().get(key, math.nan)
+
+metrics_registry.gauge(
+    "bigshorts_llm_slots_busy", "Inference server slots currently generating", lambda: backend_stat("slots_busy"))
+metrics_registry.gauge(
+    "bigshorts_llm_slot_utilization", "Time-averaged fraction of inference server slots in use", lambda: backend_stat("slot_utilization"))
+metrics_registry.gauge(
+    "bigshorts_llm_backend_retries", "Requests to the inference server retried before the first token", lambda: backend_stat("retries"))
+
+metrics_registry.gauge(
+    "bigshorts_scheduler_interactive_waiting", "Interactive requests waiting for a processing slot",
+    lambda: inference_scheduler.waiting(INTERACTIVE))
+metrics_registry.gauge(
+    "bigshorts_scheduler_bulk_waiting", "Batch items waiting for a processing slot",
+    lambda: inference_scheduler.waiting(BULK))
+metrics_registry.gauge(
+    "bigshorts_scheduler_bulk_active", "Batch items currently holding a processing slot",
+    lambda: inference_scheduler.active(BULK))
+
+sessions_expired = metrics_registry.counter(
+    "bigshorts_sessions_expired_total", "Sessions freed after SESSION_TIMEOUT minutes of inactivity")
+
 def get_chatbot():
     """Get the shared chatbot instance (lazy loading) - optimized for high RAM"""
     global chatbot_instance
@@ -84,16 +207,11 @@ def get_chatbot():
         with chatbot_lock:
             # Double-check after acquiring lock
             if chatbot_instance is None:
-                print("Initializing shared chatbot instance with optimized settings...")
+                logger.info("Initializing shared chatbot instance with optimized settings")
                 try:
-                    # Initialize with settings optimized for your hardware
-                    from llama_cpp import Llama
-                    
-                    # Create a custom initialized chatbot
-                    chatbot_instance = BigShortsChatbot.__new__(BigShortsChatbot)
-                    
                     # Initialize the LLM with optimized settings for 8 vCPUs
-                    chatbot_instance.llm = Llama(
+                    # (the llama kwargs are ignored by the http and fake backends)
+                    backend = create_backend(
                         model_path=MODEL_PATH,
                         n_ctx=4096,  # Larger context with more RAM
                         n_gpu_layers=0,  # CPU only
@@ -103,38 +221,16 @@ def get_chatbot():
                         use_mmap=True,  # Memory map for efficiency
                         verbose=False
                     )
-                    
-                    # Initialize other attributes
-                    import yaml
-                    try:
-                        with open("prompts.yaml", 'r') as stream:
-                            chatbot_instance.prompt_templates = yaml.safe_load(stream)
-                    except:
-                        chatbot_instance.prompt_templates = {
-                            "final_answer": {
-                                "pre_messages": "You are a helpful social media assistant for the BigShorts platform.",
-                                "post_messages": "Remember to never show your reasoning or thought process to the user."
-                            }
-                        }
-                    
-                    chatbot_instance.sessions = {}
-                    chatbot_instance.off_topic_keywords = [
-                        "politics", "news", "weather", "sports", "dating", "games", "gaming"
-                    ]
-                    chatbot_instance.unsupported_query_response = {
-                        "type": "error",
-                        "content": "I can only help with BigShorts platform features."
-                    }
-                    chatbot_instance.content_explanations = {}
-                    
-                    print("Chatbot initialized successfully with optimized settings!")
+                    # Published only once fully initialized so concurrent
+                    # callers never see a half-built instance
+                    chatbot_instance = BigShortsChatbot(MODEL_PATH, backend=backend)
+                    logger.info("Chatbot initialized successfully with %s backend", backend.name)
                 except Exception as e:
-                    print(f"Error with custom initialization, falling back to default: {e}")
-                    chatbot_instance = BigShortsChatbot(MODEL_PATH)
+                    logger.exception("Error initializing chatbot: %s", e)
     
     return chatbot_instance
 
-def update_stats(response_time: float, success: bool):
+def update_stats(response_time: float, success: bool, route: str = "chat", lane: str = "deterministic"):
     """Update request statistics"""
     with stats_lock:
         request_stats["total_requests"] += 1
@@ -143,17 +239,150 @@ def update_stats(response_time: float, success: bool):
         else:
             request_stats["failed_requests"] += 1
         
-        request_stats["response_times"].append(response_time)
+        request_stats["recent_response_times"].append(response_time)
         
-        # Calculate rolling average
-        if request_stats["response_times"]:
-            request_stats["average_response_time"] = sum(request_stats["response_times"]) / len(request_stats["response_times"])
+        # Running average in O(1)
+        request_stats["total_response_time"] += response_time
+        request_stats["average_response_time"] = request_stats["total_response_time"] / request_stats["total_requests"]
+    
+    # Histograms have their own lock so the stats lock is held only briefly
+    lane = lane if success else "error"
+    latency_tracker.record(route, lane, response_time)
+    request_duration.observe(response_time, route, lane)
+    requests_total.inc(route, "success" if success else "failed")
+
+def run_query(chatbot, content: str, session_id: str, submitted_at: float = None, trace=None, on_token=None,
+              routed: bool = False):
+    """Run chatbot.process_query in a worker thread and report which lane answered it
+
+    submitted_at is the time.perf_counter() reading taken when the task was
+    handed to the executor; on_token streams LLM tokens as they are generated.
+    routed=True skips routing for a query chatbot.route_batch already sent to the LLM.
+    """
+    worker_started = time.perf_counter()
+    if submitted_at is not None:
+        executor_wait.observe(worker_started - submitted_at)
+        if trace is not None:
+            trace.add_span("executor_queue", submitted_at, worker_started)
+    busy_workers.inc()
+    log_token = bind_context(session=session_id[:8], trace_id=trace.trace_id if trace is not None else "")
+    try:
+        reset_query_state()
+        answer = chatbot.answer_with_llm if routed else chatbot.process_query
+        response = answer(content, session_id, on_token)
+        state = get_query_state()
+    finally:
+        reset_context(log_token)
+        busy_workers.dec()
+    record_query_state(state, trace, worker_started, time.perf_counter())
+    return response, state["lane"]
+
+async def arun_query(chatbot, content: str, session_id: str, trace=None, on_token=None, routed: bool = False):
+    """run_query for async backends: awaits chatbot.aprocess_query on the event loop"""
+    started = time.perf_counter()
+    # This task's copy of the query state; other requests on the loop keep theirs
+    reset_query_state()
+    answer = chatbot.aanswer_with_llm if routed else chatbot.aprocess_query
+    response = await answer(content, session_id, on_token)
+    state = get_query_state()
+    record_query_state(state, trace, started, time.perf_counter())
+    return response, state["lane"]
+
+async def dispatch_query(chatbot, content: str, session_id: str, trace=None, on_token=None, routed: bool = False):
+    """Answer on the event loop when the backend is async, else in the thread pool"""
+    if chatbot.supports_async:
+        return await arun_query(chatbot, content, session_id, trace, on_token, routed)
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(
+        executor, run_query, chatbot, content, session_id, time.perf_counter(), trace, on_token, routed
+    )
 
-def check_rate_limit(session_id: str) -> tuple[bool, int]:
+def record_query_state(state: dict, trace, started: float, finished: float):
+    """Feed one answered query's path, lane and LLM timings to metrics and the trace"""
+    query_path_total.inc(state["path"], state["lane"])
+    if state["coalesced"]:
+        coalesced_total.inc()
+    generation = state["generation"]
+    if generation:
+        prompt_tokens.observe(generation["prompt_tokens"])
+        prefill_time.observe(generation["prefill_seconds"])
+        decode_time.observe(generation["decode_seconds"])
+        if generation["decode_seconds"] > 0:
+            decode_rate.observe(generation["completion_tokens"] / generation["decode_seconds"])
+    
+    if trace is not None:
+        # Routing covers process_query up to the model call (or all of it for
+        # deterministic answers); the LLM stages follow it
+        routing_end = generation["stage_times"][0][1] if generation else finished
+        trace.add_span("routing", started, routing_end)
+        if generation:
+            for name, start, end in generation["stage_times"]:
+                trace.add_span(name, start, end)
+        trace.set("path", state["path"])
+        trace.set("lane", state["lane"])
+        trace.set("coalesced", state["coalesced"])
+
+_session_size_cache = {}
+
+def estimate_session_store_bytes() -> int:
+    """Approximate size of all conversation histories, in bytes
+
+    Only messages added since the previous call are measured, so a scrape costs
+    O(new messages) rather than re-serializing every session.
+    """
+    chatbot = chatbot_instance
+    if chatbot is None:
+        return 0
+    sessions = list(chatbot.sessions.items())
+    live = set()
+    total = 0
+    for session_id, history in sessions:
+        live.add(session_id)
+        measured, size = _session_size_cache.get(session_id, (0, 0))
+        if measured > len(history):
+            measured, size = 0, 0
+        for entry in history[measured:]:
+            content = entry.get("content")
+            if isinstance(content, str):
+                size += len(content.encode("utf-8"))
+            else:
+                size += len(json.dumps(content, default=str).encode("utf-8"))
+        _session_size_cache[session_id] = (len(history), size)
+        total += size
+    for session_id in list(_session_size_cache):
+        if session_id not in live:
+            del _session_size_cache[session_id]
+    return total
+
+metrics_registry.gauge(
+    "bigshorts_session_store_bytes", "Approximate bytes held in conversation histories", estimate_session_store_bytes)
+
+def coalescing_stats() -> dict:
+    """Single-flight statistics for the shared chatbot"""
+    chatbot = chatbot_instance
+    if chatbot is None or not hasattr(chatbot, "inflight"):
+        return SingleFlight().stats()
+    return chatbot.inflight.stats()
+
+metrics_registry.gauge(
+    "bigshorts_llm_coalescing_ratio", "Fraction of LLM queries served by a shared generation",
+    lambda: coalescing_stats()["coalescing_ratio"])
+metrics_registry.gauge(
+    "bigshorts_llm_decode_tokens_saved", "Decode tokens avoided by sharing generations",
+    lambda: coalescing_stats()["decode_tokens_saved"])
+
+def touch_session(session_id: str):
+    """Record activity for a session (call with chatbot_lock held)"""
+    last_access[session_id] = datetime.now()
+    session_expiry.touch(session_id)
+
+def check_rate_limit(session_id: str, route: str = "chat") -> tuple[bool, int]:
     """
     Check if the session has exceeded rate limits
     Returns: (is_allowed, remaining_requests)
     """
+    # Arm expiry before creating rate-limit state so it is always freed
+    session_expiry.touch(session_id)
     current_time = time.time()
     window_start = current_time - RATE_LIMIT_WINDOW
     
@@ -171,6 +400,7 @@ def check_rate_limit(session_id: str) -> tuple[bool, int]:
     if requests_in_window >= RATE_LIMIT_REQUESTS:
         with stats_lock:
             request_stats["rate_limited_requests"] += 1
+        requests_total.inc(route, "rate_limited")
         return False, 0
     
     # Add current request timestamp
@@ -178,7 +408,7 @@ def check_rate_limit(session_id: str) -> tuple[bool, int]:
     
     return True, remaining
 
-def check_queue_capacity() -> tuple[bool, int]:
+def check_queue_capacity(route: str = "chat") -> tuple[bool, int]:
     """
     Check if the queue has capacity
     Returns: (has_capacity, current_queue_size)
@@ -188,6 +418,7 @@ def check_queue_capacity() -> tuple[bool, int]:
         if request_queue_size >= MAX_QUEUE_SIZE:
             with stats_lock:
                 request_stats["queue_full_requests"] += 1
+            requests_total.inc(route, "queue_full")
             return False, request_queue_size
         request_queue_size += 1
         return True, request_queue_size
@@ -208,9 +439,65 @@ class FAQSelectRequest(BaseModel):
     content_type: str
     session_id: Optional[str] = None
 
-@app.post("/api/chat")
-async def chat(request: ChatRequest):
+# Response model for the chat endpoints. Declaring it lets FastAPI validate and
+# serialize responses in pydantic-core instead of walking them through
+# jsonable_encoder; extra keys (rate_limit_exceeded, queue_full...) pass through.
+class ChatResponse(BaseModel):
+    model_config = ConfigDict(extra="allow")
+    
+    type: str
+    content: Any = None
+    session_id: Optional[str] = None
+    rate_limit_remaining: Optional[int] = None
+    response_time: Optional[float] = None
+
+@lru_cache(maxsize=256)
+def guide_entity(content_type: str) -> Optional[tuple[str, bytes, Optional[str]]]:
+    """ETag, encoded JSON body and Link preload header of the static guide for `content_type`
+
+    Returns None for FAQ selections that are not plain guides (issues, the
+    Bigcoins table) and for unknown content types. The ETag combines the
+    catalog version with a hash of the guide itself, so it changes only when
+    that guide's content does.
+    """
+    key = content_type.strip()
+    lowered = key.lower()
+    if lowered == "bigcoins_reward" or any(issue in lowered for issue in ALLOWED_ISSUE_TYPES):
+        return None
+    guide = content_creation_guide(key)
+    if not guide["content"].get("steps"):
+        return None
+    body = orjson.dumps(guide) if FAST_JSON_AVAILABLE else json.dumps(guide, ensure_ascii=False).encode("utf-8")
+    etag = f'"{CATALOG_VERSION}-{hashlib.sha256(body).hexdigest()[:12]}"'
+    return etag, body, preload_links(guide["content"])
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluate an If-None-Match header (weak comparison, as RFC 9110 requires)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def not_modified(etag: str, cache_control: str, route: str) -> Response:
+    requests_total.inc(route, "not_modified")
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+@app.post("/api/chat", response_model=ChatResponse, response_model_exclude_unset=True)
+async def chat(request: ChatRequest, http_response: Response):
     """API endpoint to process chat messages with rate limiting and queuing"""
+    trace = tracer.start("chat")
+    log_token = bind_context(route="chat", trace_id=trace.trace_id, session=(request.session_id or "")[:8])
+    try:
+        return await _chat(request, trace)
+    finally:
+        reset_context(log_token)
+        trace.close_tail("response")
+        http_response.headers["Server-Timing"] = trace.server_timing()
+        tracer.finish(trace)
+
+async def _chat(request: ChatRequest, trace):
     session_id = request.session_id or str(uuid.uuid4())
     start_time = time.time()
     
@@ -223,7 +510,8 @@ async def chat(request: ChatRequest):
             }
         
         # Check rate limit
-        is_allowed, remaining = check_rate_limit(session_id)
+        with trace.span("rate_limit"):
+            is_allowed, remaining = check_rate_limit(session_id)
         if not is_allowed:
             return {
                 "type": "error",
@@ -246,7 +534,12 @@ async def chat(request: ChatRequest):
         
         try:
             # Acquire semaphore to limit concurrent processing
-            async with request_semaphore:
+            queued_at = time.perf_counter()
+            async with inference_scheduler.slot(INTERACTIVE):
+                acquired_at = time.perf_counter()
+                queue_wait.observe(acquired_at - queued_at)
+                trace.add_span("queue", queued_at, acquired_at)
+                
                 # Get the shared chatbot instance
                 chatbot = get_chatbot()
                 if chatbot is None:
@@ -258,31 +551,25 @@ async def chat(request: ChatRequest):
                     }
                 
                 # Process the request
-                print(f"[Session: {session_id[:8]}...] Processing: {request.content[:50]}...")
-                print(f"Queue: {queue_size}/{MAX_QUEUE_SIZE}, Rate limit remaining: {remaining}/{RATE_LIMIT_REQUESTS}")
+                logger.debug("Processing: %s (queue %d/%d, rate limit remaining %d/%d)",
+                             request.content[:50], queue_size, MAX_QUEUE_SIZE, remaining, RATE_LIMIT_REQUESTS)
                 
-                # Run the blocking chatbot.process_query in thread pool executor
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    executor,
-                    chatbot.process_query, 
-                    request.content, 
-                    session_id
-                )
+                # Blocking backends run in the thread pool; async ones are awaited here
+                response, lane = await dispatch_query(chatbot, request.content, session_id, trace)
                 
                 # Update last access time
                 with chatbot_lock:
-                    last_access[session_id] = datetime.now()
+                    touch_session(session_id)
                 
                 # Calculate response time
                 response_time = time.time() - start_time
-                update_stats(response_time, True)
+                update_stats(response_time, True, "chat", lane)
                 
-                print(f"[Session: {session_id[:8]}...] Completed in {response_time:.2f}s")
+                logger.info("Completed in %.2fs", response_time)
                 
                 # Handle different response types
                 if response is None:
-                    print("WARNING: Chatbot returned None response")
+                    logger.warning("Chatbot returned None response")
                     return {
                         "type": "message", 
                         "content": "I'm sorry, I couldn't process that request.", 
@@ -292,11 +579,11 @@ async def chat(request: ChatRequest):
                 
                 if isinstance(response, dict):
                     if "content" in response and response["content"] is None:
-                        print("WARNING: Response has None content")
+                        logger.warning("Response has None content")
                         response["content"] = "I'm sorry, I encountered an issue processing that request."
                     
                     if "type" not in response:
-                        print("WARNING: Response missing type field")
+                        logger.warning("Response missing type field")
                         response["type"] = "message"
                     
                     # Add metadata to response
@@ -317,8 +604,7 @@ async def chat(request: ChatRequest):
         except Exception as e:
             response_time = time.time() - start_time
             update_stats(response_time, False)
-            print(f"Error processing message: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error processing message: %s", e)
             return {
                 "type": "error", 
                 "content": f"Processing error: {str(e)}", 
@@ -331,8 +617,7 @@ async def chat(request: ChatRequest):
     except Exception as e:
         response_time = time.time() - start_time
         update_stats(response_time, False)
-        print(f"Server error: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Server error: %s", e)
         release_queue_slot()
         return {
             "type": "error", 
@@ -340,15 +625,245 @@ async def chat(request: ChatRequest):
             "session_id": session_id
         }
 
-@app.post("/api/select-faq")
-async def select_faq(request: FAQSelectRequest):
-    """API endpoint to handle FAQ selection with rate limiting and queuing"""
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Server-sent-events variant of /api/chat
+
+    Emits a `token` event per generated LLM token, then a `done` event with the
+    same payload /api/chat would return. Deterministic answers produce only
+    the `done` event. Requests identical to one already generating attach to
+    its token stream.
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+    if not request.content:
+        return {"type": "error", "content": "No message provided", "session_id": session_id}
+    
+    is_allowed, remaining = check_rate_limit(session_id, "chat_stream")
+    if not is_allowed:
+        return {
+            "type": "error",
+            "content": f"Rate limit exceeded. You can make {RATE_LIMIT_REQUESTS} requests per {RATE_LIMIT_WINDOW} seconds.",
+            "session_id": session_id,
+            "rate_limit_exceeded": True,
+            "retry_after": RATE_LIMIT_WINDOW
+        }
+    
+    has_capacity, queue_size = check_queue_capacity("chat_stream")
+    if not has_capacity:
+        return {
+            "type": "error",
+            "content": "Server is at capacity. Please try again in a moment.",
+            "session_id": session_id,
+            "queue_full": True,
+            "queue_size": queue_size
+        }
+    
+    loop = asyncio.get_event_loop()
+    tokens: asyncio.Queue = asyncio.Queue()
+    
+    def on_token(token: str):
+        # Called from the worker thread (or the loop itself for async backends)
+        loop.call_soon_threadsafe(tokens.put_nowait, token)
+    
+    async def events():
+        start_time = time.time()
+        future = None
+        try:
+            async with inference_scheduler.slot(INTERACTIVE):
+                chatbot = get_chatbot()
+                if chatbot is None:
+                    update_stats(time.time() - start_time, False, "chat_stream")
+                    yield _sse("done", {"type": "error", "content": "Failed to initialize chatbot", "session_id": session_id})
+                    return
+                
+                future = asyncio.ensure_future(
+                    dispatch_query(chatbot, request.content, session_id, None, on_token)
+                )
+                while True:
+                    next_token = asyncio.ensure_future(tokens.get())
+                    done, _ = await asyncio.wait({next_token, future}, return_when=asyncio.FIRST_COMPLETED)
+                    if next_token in done:
+                        yield _sse("token", {"token": next_token.result()})
+                        continue
+                    next_token.cancel()
+                    break
+                # Tokens are queued before the future resolves; flush any left
+                while not tokens.empty():
+                    yield _sse("token", {"token": tokens.get_nowait()})
+                
+                response, lane = await future
+                with chatbot_lock:
+                    touch_session(session_id)
+                response_time = time.time() - start_time
+                update_stats(response_time, True, "chat_stream", lane)
+                
+                if not isinstance(response, dict):
+                    response = {"type": "message", "content": str(response)}
+                response["session_id"] = session_id
+                response["rate_limit_remaining"] = remaining
+                response["response_time"] = round(response_time, 2)
+                yield _sse("done", response)
+        except Exception as e:
+            update_stats(time.time() - start_time, False, "chat_stream")
+            logger.exception("Error streaming message: %s", e)
+            yield _sse("done", {"type": "error", "content": f"Processing error: {str(e)}", "session_id": session_id})
+        finally:
+            # Client went away mid-stream: stop the generation (async backends
+            # close the upstream request; the thread pool path runs to completion)
+            if future is not None and not future.done():
+                future.cancel()
+                llm_cancelled.inc()
+            release_queue_slot()
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+def _ndjson(data) -> bytes:
+    if USE_FAST_JSON:
+        return orjson.dumps(data) + b"\n"
+    return (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+
+def _batch_line(index: int, response, session_id: str, response_time: float) -> bytes:
+    if not isinstance(response, dict):
+        response = {"type": "message", "content": str(response)}
+    return _ndjson(dict(response, index=index, session_id=session_id, response_time=round(response_time, 2)))
+
+@app.post("/api/chat/batch")
+async def chat_batch(items: List[ChatRequest]):
+    """Answer a list of chat messages for offline jobs, streamed back as NDJSON
+
+    The batch takes one queue entry and no rate-limit slots. Rule-based
+    answers are routed together in a single worker call and written first;
+    the LLM items are then queued on the inference scheduler as one BULK
+    batch, so interactive requests keep precedence, and each line is written
+    as its answer completes. Every line carries the item's `index`; a final
+    `batch_done` line summarises the run. Session ids must be unique within
+    a batch (omit them to get fresh sessions).
+    """
+    if not items:
+        raise HTTPException(status_code=422, detail="Empty batch")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    session_ids = [item.session_id or str(uuid.uuid4()) for item in items]
+    if len(set(session_ids)) != len(session_ids):
+        raise HTTPException(status_code=422, detail="session_id values must be unique within a batch")
+    
+    has_capacity, queue_size = check_queue_capacity("chat_batch")
+    if not has_capacity:
+        return {
+            "type": "error",
+            "content": "Server is at capacity. Please try again in a moment.",
+            "queue_full": True,
+            "queue_size": queue_size
+        }
+    
+    async def lines():
+        start_time = time.time()
+        counts = {"deterministic": 0, "llm": 0, "failed": 0}
+        
+        def fail(index: int, session_id: str, content: str) -> bytes:
+            counts["failed"] += 1
+            update_stats(time.time() - start_time, False, "chat_batch")
+            return _ndjson({"type": "error", "content": content, "index": index, "session_id": session_id})
+        
+        try:
+            chatbot = get_chatbot()
+            if chatbot is None:
+                yield _ndjson({"type": "error", "content": "Failed to initialize chatbot"})
+                return
+            
+            pending = []
+            for index, (item, session_id) in enumerate(zip(items, session_ids)):
+                if item.content:
+                    pending.append((index, item.content, session_id))
+                else:
+                    yield fail(index, session_id, "No message provided")
+            
+            # One slot and one thread hop for the whole rule-based pass
+            loop = asyncio.get_event_loop()
+            routing_started = time.perf_counter()
+            async with inference_scheduler.slot(BULK):
+                routed = await loop.run_in_executor(
+                    executor, chatbot.route_batch, [(content, session_id) for _, content, session_id in pending]
+                )
+            routing_finished = time.perf_counter()
+            with chatbot_lock:
+                for _, _, session_id in pending:
+                    touch_session(session_id)
+            
+            llm_jobs = []
+            for (index, content, session_id), (response, state) in zip(pending, routed):
+                if response is None:
+                    llm_jobs.append(partial(answer_llm_item, chatbot, index, content, session_id))
+                    continue
+                record_query_state(state, None, routing_started, routing_finished)
+                response_time = time.time() - start_time
+                update_stats(response_time, True, "chat_batch", state["lane"])
+                counts["deterministic"] += 1
+                yield _batch_line(index, response, session_id, response_time)
+            
+            async for index, session_id, response, lane, error in inference_scheduler.run_batch(llm_jobs, BULK):
+                if error is not None:
+                    logger.error("Batch item %d failed: %s", index, error, exc_info=error)
+                    yield fail(index, session_id, f"Processing error: {str(error)}")
+                    continue
+                with chatbot_lock:
+                    touch_session(session_id)
+                response_time = time.time() - start_time
+                update_stats(response_time, True, "chat_batch", lane)
+                counts["llm"] += 1
+                yield _batch_line(index, response, session_id, response_time)
+            
+            yield _ndjson({"type": "batch_done", "items": len(items), **counts,
+                           "response_time": round(time.time() - start_time, 2)})
+        finally:
+            release_queue_slot()
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+async def answer_llm_item(chatbot, index: int, content: str, session_id: str):
+    """Finish one routed batch item on the LLM; errors are returned, not raised"""
+    try:
+        response, lane = await dispatch_query(chatbot, content, session_id, routed=True)
+        return index, session_id, response, lane, None
+    except Exception as e:
+        return index, session_id, None, None, e
+
+@app.post("/api/select-faq", response_model=ChatResponse, response_model_exclude_unset=True)
+async def select_faq(request: FAQSelectRequest, http_response: Response):
+    """API endpoint to handle FAQ selection with rate limiting and queuing
+    
+    Guide selections carry the guide's ETag so clients can revalidate it with
+    GET /api/guide/{content_type}. The POST itself is always answered in full,
+    since it also records the selection in the session.
+    """
+    entity = guide_entity(request.content_type)
+    
+    trace = tracer.start("select_faq")
+    log_token = bind_context(route="select_faq", trace_id=trace.trace_id, session=(request.session_id or "")[:8])
+    try:
+        response = await _select_faq(request, trace)
+        if entity is not None and isinstance(response, dict) and response.get("type") == "content_guide":
+            http_response.headers["ETag"] = entity[0]
+            if entity[2]:
+                http_response.headers["Link"] = entity[2]
+        return response
+    finally:
+        reset_context(log_token)
+        trace.close_tail("response")
+        http_response.headers["Server-Timing"] = trace.server_timing()
+        tracer.finish(trace)
+
+async def _select_faq(request: FAQSelectRequest, trace):
     session_id = request.session_id or str(uuid.uuid4())
     start_time = time.time()
     
     try:
         # Check rate limit
-        is_allowed, remaining = check_rate_limit(session_id)
+        with trace.span("rate_limit"):
+            is_allowed, remaining = check_rate_limit(session_id, "select_faq")
         if not is_allowed:
             return {
                 "type": "error",
@@ -359,7 +874,7 @@ async def select_faq(request: FAQSelectRequest):
             }
         
         # Check queue capacity
-        has_capacity, queue_size = check_queue_capacity()
+        has_capacity, queue_size = check_queue_capacity("select_faq")
         if not has_capacity:
             return {
                 "type": "error",
@@ -371,11 +886,16 @@ async def select_faq(request: FAQSelectRequest):
         
         try:
             # Acquire semaphore to limit concurrent processing
-            async with request_semaphore:
+            queued_at = time.perf_counter()
+            async with inference_scheduler.slot(INTERACTIVE):
+                acquired_at = time.perf_counter()
+                queue_wait.observe(acquired_at - queued_at)
+                trace.add_span("queue", queued_at, acquired_at)
+                
                 # Get the shared chatbot instance
                 chatbot = get_chatbot()
                 if chatbot is None:
-                    update_stats(time.time() - start_time, False)
+                    update_stats(time.time() - start_time, False, "select_faq")
                     return {
                         "type": "error", 
                         "content": "Failed to initialize chatbot", 
@@ -385,21 +905,15 @@ async def select_faq(request: FAQSelectRequest):
                 # Format the request
                 formatted_request = f"FAQ: {request.content_type}"
                 
-                # Process the request in thread pool
-                loop = asyncio.get_event_loop()
-                response = await loop.run_in_executor(
-                    executor,
-                    chatbot.process_query,
-                    formatted_request,
-                    session_id
-                )
+                # Process the request (thread pool unless the backend is async)
+                response, lane = await dispatch_query(chatbot, formatted_request, session_id, trace)
                 
                 # Update last access time
                 with chatbot_lock:
-                    last_access[session_id] = datetime.now()
+                    touch_session(session_id)
                 
                 response_time = time.time() - start_time
-                update_stats(response_time, True)
+                update_stats(response_time, True, "select_faq", lane)
                 
                 # Add metadata to response
                 if isinstance(response, dict):
@@ -421,9 +935,8 @@ async def select_faq(request: FAQSelectRequest):
         
     except Exception as e:
         response_time = time.time() - start_time
-        update_stats(response_time, False)
-        print(f"Error selecting FAQ: {str(e)}")
-        traceback.print_exc()
+        update_stats(response_time, False, "select_faq")
+        logger.exception("Error selecting FAQ: %s", e)
         release_queue_slot()
         return {
             "type": "error", 
@@ -431,43 +944,75 @@ async def select_faq(request: FAQSelectRequest):
             "session_id": session_id
         }
 
-def clean_old_sessions():
-    """Remove conversation history for sessions that haven't been accessed in a while"""
-    chatbot = get_chatbot()
-    if chatbot is None:
-        return
-        
+@app.get("/api/guide/{content_type}")
+async def get_guide(content_type: str, if_none_match: Optional[str] = Header(None)):
+    """Static guide for a content type, cacheable by devices and CDNs
+    
+    Serves the same `content_guide` payload as /api/select-faq without session
+    state, so it needs no rate limit or worker and the body is encoded once.
+    """
+    entity = guide_entity(content_type)
+    if entity is None:
+        raise HTTPException(status_code=404, detail=f"No guide for {content_type}")
+    etag, body, link = entity
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag, GUIDE_CACHE_CONTROL, "guide")
+    requests_total.inc("guide", "success")
+    headers = {"ETag": etag, "Cache-Control": GUIDE_CACHE_CONTROL}
+    if link:
+        headers["Link"] = link
+    return Response(content=body, media_type="application/json", headers=headers)
+
+class ImmutableStaticFiles(StaticFiles):
+    """Static files whose names carry a content hash, so they never change"""
+    
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+if GUIDE_IMAGE_DIR and os.path.isdir(GUIDE_IMAGE_DIR):
+    app.mount("/guide-images", ImmutableStaticFiles(directory=GUIDE_IMAGE_DIR), name="guide-images")
+
+def clean_old_sessions(limit: int = SESSION_SWEEP_BATCH) -> int:
+    """Free up to `limit` sessions that haven't been accessed in SESSION_TIMEOUT minutes
+    
+    Only sessions that are due are visited, so the lock is held for O(limit)
+    work however many sessions are alive. Returns the number freed.
+    """
+    expired = session_expiry.pop_expired(limit)
+    if not expired:
+        return 0
+    
+    # Don't force a model load just to drop state; without an instance there is no history
+    chatbot = chatbot_instance
     with chatbot_lock:
-        current_time = datetime.now()
-        sessions_to_remove = []
-        
-        for session_id, access_time in list(last_access.items()):
-            if current_time - access_time > timedelta(minutes=SESSION_TIMEOUT):
-                sessions_to_remove.append(session_id)
-        
-        for session_id in sessions_to_remove:
+        for session_id in expired:
             # Remove conversation history from chatbot
-            if session_id in chatbot.sessions:
-                del chatbot.sessions[session_id]
-            if session_id in last_access:
-                del last_access[session_id]
+            if chatbot is not None:
+                chatbot.sessions.pop(session_id, None)
+            last_access.pop(session_id, None)
             # Clean up rate limit data
-            if session_id in rate_limit_data:
-                del rate_limit_data[session_id]
-            print(f"Cleaned up inactive session: {session_id[:8]}...")
+            rate_limit_data.pop(session_id, None)
+            _session_size_cache.pop(session_id, None)
+    sessions_expired.inc(amount=len(expired))
+    logger.debug("Cleaned up %d inactive sessions", len(expired))
+    return len(expired)
 
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint with detailed stats"""
-    model_loaded = os.path.exists(MODEL_PATH)
-    chatbot = get_chatbot() if model_loaded else None
+    # Only the in-process llama.cpp backend needs the GGUF file; the http and
+    # fake backends (or an already-built chatbot) can always initialize
+    model_available = chatbot_instance is not None or LLM_BACKEND != "llama" or os.path.exists(MODEL_PATH)
+    chatbot = get_chatbot() if model_available else None
     
     with queue_lock:
         current_queue_size = request_queue_size
     
     with stats_lock:
         stats_copy = request_stats.copy()
-        stats_copy["response_times"] = list(stats_copy["response_times"])[-10:]  # Last 10
+        stats_copy["recent_response_times"] = list(stats_copy["recent_response_times"])
     
     # Calculate success rate
     total = stats_copy["total_requests"]
@@ -475,7 +1020,8 @@ async def health_check():
     
     return {
         "status": "ok", 
-        "model_loaded": model_loaded,
+        "llm_backend": chatbot.backend.name if chatbot is not None else LLM_BACKEND,
+        "model_loaded": chatbot is not None,
         "chatbot_initialized": chatbot is not None,
         "active_sessions": len(last_access),
         "queue_size": current_queue_size,
@@ -492,12 +1038,12 @@ async def health_check():
             "queue_full_requests": stats_copy["queue_full_requests"],
             "success_rate_percent": round(success_rate, 2),
             "average_response_time_seconds": round(stats_copy["average_response_time"], 2),
-            "recent_response_times": stats_copy["response_times"]
+            "recent_response_times": stats_copy["recent_response_times"]
         },
         "hardware": {
             "vcpus": 8,
             "ram_gb": 128,
-            "worker_threads": 6,
+            "worker_threads": EXECUTOR_WORKERS,
             "model_context_size": 4096
         }
     }
@@ -554,6 +1100,7 @@ async def clear_session(session_id: str):
         if session_id in rate_limit_data:
             del rate_limit_data[session_id]
             cleared_items.append("rate_limit_data")
+        session_expiry.discard(session_id)
         
         if cleared_items:
             return {"status": "success", "message": f"Session cleared: {', '.join(cleared_items)}"}
@@ -593,19 +1140,22 @@ async def get_stats():
     """Get detailed server statistics"""
     with stats_lock:
         stats_copy = request_stats.copy()
-        response_times_list = list(stats_copy["response_times"])
     
     total = stats_copy["total_requests"]
     success_rate = (stats_copy["successful_requests"] / total * 100) if total > 0 else 0
     
-    # Calculate percentiles
-    if response_times_list:
-        sorted_times = sorted(response_times_list)
-        p50 = sorted_times[int(len(sorted_times) * 0.5)]
-        p95 = sorted_times[int(len(sorted_times) * 0.95)]
-        p99 = sorted_times[int(len(sorted_times) * 0.99)]
-    else:
-        p50 = p95 = p99 = 0
+    # Percentiles come from the histograms, so reading them never sorts samples
+    overall = latency_tracker.histogram()
+    
+    # Per route/lane breakdown over the last minute, 5 minutes, hour and all time
+    breakdown = {}
+    for route, lane in latency_tracker.series_keys():
+        breakdown.setdefault(route, {})[lane] = {
+            "last_1m": latency_tracker.histogram(route, lane, 60).summary(),
+            "last_5m": latency_tracker.histogram(route, lane, 300).summary(),
+            "last_1h": latency_tracker.histogram(route, lane, 3600).summary(),
+            "all_time": latency_tracker.histogram(route, lane).summary()
+        }
     
     return {
         "total_requests": total,
@@ -616,42 +1166,105 @@ async def get_stats():
         "success_rate_percent": round(success_rate, 2),
         "response_times": {
             "average": round(stats_copy["average_response_time"], 2),
-            "p50_median": round(p50, 2),
-            "p95": round(p95, 2),
-            "p99": round(p99, 2),
-            "min": round(min(response_times_list), 2) if response_times_list else 0,
-            "max": round(max(response_times_list), 2) if response_times_list else 0
+            "p50_median": round(overall.percentile(0.50), 2),
+            "p95": round(overall.percentile(0.95), 2),
+            "p99": round(overall.percentile(0.99), 2),
+            "min": round(overall.min, 2) if overall.count else 0,
+            "max": round(overall.max, 2)
+        },
+        "latency_by_route": breakdown,
+        "coalescing": coalescing_stats(),
+        "tracing": tracer.stats(),
+        "logging": log_stats(),
+        "session_expiry": session_expiry.stats(),
+        "scheduler": inference_scheduler.stats(),
+        "llm_backend": chatbot_instance.backend.stats() if chatbot_instance is not None else None,
+        "guide_cache": {
+            "catalog_version": CATALOG_VERSION,
+            "max_age": GUIDE_MAX_AGE,
+            "encoded_guides": guide_entity.cache_info().currsize
         }
     }
 
+@app.get("/api/stats/histograms")
+async def get_stats_histograms():
+    """Raw latency histograms for this worker, for merging across workers"""
+    return {
+        "pid": os.getpid(),
+        "histograms": latency_tracker.snapshot()
+    }
+
+@app.post("/api/stats/merge")
+async def merge_stats_histograms(snapshots: List[Dict[str, Any]]):
+    """Merge histogram snapshots collected from several workers into one summary"""
+    try:
+        merged = merge_snapshots(snapshots)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {key: histogram.summary() for key, histogram in merged.items()}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus text-format metrics"""
+    return Response(content=metrics_registry.render(), media_type=metrics_registry.content_type)
+
 # Background task to clean old sessions periodically
 @app.on_event("startup")
 async def startup_event():
     """Start background tasks on server startup"""
-    print(f"Starting BigShorts Chatbot API")
-    print(f"Hardware: 8 vCPUs, 128 GiB RAM")
-    print(f"Configuration: {MAX_CONCURRENT_REQUESTS} concurrent, {MAX_QUEUE_SIZE} queue size")
-    print(f"Rate limit: {RATE_LIMIT_REQUESTS} requests per {RATE_LIMIT_WINDOW}s")
+    logger.info("Starting BigShorts Chatbot API")
+    logger.info("Hardware: 8 vCPUs, 128 GiB RAM")
+    logger.info("Configuration: %d concurrent, %d queue size", MAX_CONCURRENT_REQUESTS, MAX_QUEUE_SIZE)
+    logger.info("Rate limit: %d requests per %ds", RATE_LIMIT_REQUESTS, RATE_LIMIT_WINDOW)
     
     async def periodic_cleanup():
         while True:
-            await asyncio.sleep(300)  # Run every 5 minutes
+            await asyncio.sleep(SESSION_SWEEP_INTERVAL)
             try:
-                clean_old_sessions()
-                print(f"Periodic cleanup: {len(last_access)} active sessions")
+                freed = 0
+                # Keep going while batches come back full, letting requests run in between
+                while True:
+                    batch = clean_old_sessions(SESSION_SWEEP_BATCH)
+                    freed += batch
+                    if batch < SESSION_SWEEP_BATCH:
+                        break
+                    await asyncio.sleep(0)
+                if freed:
+                    logger.info("Periodic cleanup: freed %d sessions, %d active", freed, len(last_access))
             except Exception as e:
-                print(f"Error in periodic cleanup: {e}")
+                logger.exception("Error in periodic cleanup: %s", e)
     
     asyncio.create_task(periodic_cleanup())
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
-    print("Shutting down server...")
+    logger.info("Shutting down server")
     executor.shutdown(wait=True)
-    print("Executor shutdown complete")
+    logger.info("Executor shutdown complete")
+    if chatbot_instance is not None and hasattr(chatbot_instance.backend, "aclose"):
+        await chatbot_instance.backend.aclose()
+    tracer.close()
+    shutdown_logging()
+
+def _server_implementations() -> tuple[str, str]:
+    """Pick uvloop/httptools when installed, otherwise uvicorn's pure-Python defaults"""
+    try:
+        import uvloop  # noqa: F401
+        loop_impl = "uvloop"
+    except ImportError:
+        loop_impl = "asyncio"
+    try:
+        import httptools  # noqa: F401
+        http_impl = "httptools"
+    except ImportError:
+        http_impl = "h11"
+    return loop_impl, http_impl
 
 if __name__ == "__main__":
+    loop_impl, http_impl = _server_implementations()
+    logger.info("Event loop: %s, HTTP parser: %s, JSON: %s", loop_impl, http_impl, "orjson" if USE_FAST_JSON else "stdlib")
+    
     # Start the server with optimized settings
     uvicorn.run(
         app, 
@@ -659,5 +1272,7 @@ if __name__ == "__main__":
         port=5000,
         workers=1,  # Single worker since we handle concurrency internally
         limit_concurrency=MAX_CONCURRENT_REQUESTS * 2,
-        timeout_keep_alive=75
+        timeout_keep_alive=75,
+        loop=loop_impl,
+        http=http_impl
     )
\ No newline at end of file
@@ -0,0 +1,136 @@
+# Query embeddings for knowledge_search: an LRU cache in front of micro-batched encoding
+#
+# Concurrent sessions each embed one short query per tool call. Cache misses
+# that arrive within a few milliseconds of each other are encoded together in
+# one embed_documents call, which costs about the same as a single sentence.
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+QUERY_CACHE_SIZE = int(os.environ.get("RAG_QUERY_CACHE_SIZE", "1024"))
+# How long the first miss waits for others to share its batch
+BATCH_WINDOW_MS = float(os.environ.get("RAG_EMBED_BATCH_WINDOW_MS", "5"))
+MAX_BATCH_SIZE = int(os.environ.get("RAG_EMBED_MAX_BATCH", "32"))
+
+
+def normalize_query(text: str) -> str:
+    # all-MiniLM-L6-v2 is uncased and ignores spacing, so this does not
+    # change the vector
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class BatchingQueryEmbedder(Embeddings):
+    """Wraps an embedding model: cached, micro-batched embed_query
+
+    embed_query blocks the calling thread until its batch is encoded. The
+    same query asked twice at once is encoded once. embed_documents goes
+    straight to the wrapped model.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache_size: int = QUERY_CACHE_SIZE,
+                 window_ms: float = BATCH_WINDOW_MS, max_batch: int = MAX_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.cache_size = cache_size
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        # Queued for the next batch, and queued or being encoded
+        self._queued: "OrderedDict[str, Future]" = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.errors = 0
+        self.batch_sizes = Counter()
+        self.encode_seconds = 0.0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        with self._cond:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return vector
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.shared += 1
+            else:
+                self.misses += 1
+                future = Future()
+                self._in_flight[key] = future
+                self._queued[key] = future
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="query_embedder", daemon=True)
+                    self._thread.start()
+                self._cond.notify_all()
+        return future.result()
+
+    def _next_batch(self) -> List[str]:
+        with self._cond:
+            while not self._queued:
+                self._cond.wait()
+            deadline = time.monotonic() + self.window
+            while len(self._queued) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = list(self._queued)[:self.max_batch]
+            for key in batch:
+                del self._queued[key]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            try:
+                vectors = self.embeddings.embed_documents(batch)
+                error = None
+            except Exception as e:
+                vectors, error = None, e
+            with self._cond:
+                self.encode_seconds += time.perf_counter() - started
+                self.batch_sizes[len(batch)] += 1
+                futures = [self._in_flight.pop(key) for key in batch]
+                if error is None:
+                    for key, vector in zip(batch, vectors):
+                        self._cache[key] = vector
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+                else:
+                    self.errors += 1
+            for index, future in enumerate(futures):
+                if error is None:
+                    future.set_result(vectors[index])
+                else:
+                    future.set_exception(error)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.shared
+        batches = sum(self.batch_sizes.values())
+        return {
+            "cached": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared": self.shared,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "batches": batches,
+            "errors": self.errors,
+            "avg_batch_size": round(sum(size * count for size, count in self.batch_sizes.items()) / batches, 2)
+            if batches else 0.0,
+            "batch_sizes": {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            "avg_encode_ms": round(self.encode_seconds / batches * 1000, 2) if batches else 0.0
+        }
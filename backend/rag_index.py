@@ -0,0 +1,154 @@
+# On-disk FAISS index for the agent knowledge base, rebuilt only when its inputs change
+#
+# Layout under RAG_INDEX_DIR:
+#   <key>/index.faiss     raw FAISS index (memory-mapped on load)
+#   <key>/docstore.json   documents in index order, with their metadata
+#   <key>/meta.json       model name, document count, build time
+# where <key> is a hash of the documents and the embedding model name, so a
+# changed guide or a different model never reuses a stale index.
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+RAG_INDEX_DIR = os.environ.get("RAG_INDEX_DIR", "rag_index")
+
+# Incrementally maintained help-center index (kb_ingest.py), kept beside the
+# hash-keyed indexes of the built-in guides
+HELP_CENTER_DIR = os.path.join(RAG_INDEX_DIR, "help_center")
+
+# Bump when the on-disk layout changes
+INDEX_FORMAT_VERSION = 1
+
+# Hex digits of the content hash used as the directory name
+KEY_LENGTH = 24
+
+
+def index_key(documents: List, model_name: str) -> str:
+    """Content hash of the documents, their metadata and the embedding model"""
+    payload = json.dumps(
+        {
+            "format": INDEX_FORMAT_VERSION,
+            "model": model_name,
+            "documents": [[doc.page_content, doc.metadata] for doc in documents]
+        },
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:KEY_LENGTH]
+
+
+def _read_index(path: str):
+    import faiss
+    try:
+        # Pages are loaded on demand and shared between processes
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # Index types without mmap support
+        return faiss.read_index(path)
+
+
+def load_index(directory: str, embeddings, mmap: bool = True):
+    """FAISS vector store from a directory written by save_index
+
+    mmap=False reads the index into memory so it can be modified.
+    """
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain.docstore.document import Document
+
+    with open(os.path.join(directory, "docstore.json"), encoding="utf-8") as f:
+        entries = json.load(f)
+    docstore = InMemoryDocstore({
+        entry["id"]: Document(page_content=entry["page_content"], metadata=entry["metadata"])
+        for entry in entries
+    })
+    index_to_docstore_id = {position: entry["id"] for position, entry in enumerate(entries)}
+    index_path = os.path.join(directory, "index.faiss")
+    if mmap:
+        index = _read_index(index_path)
+    else:
+        import faiss
+        index = faiss.read_index(index_path)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def save_index(vectorstore, directory: str, model_name: str, extra: Optional[Dict[str, Any]] = None) -> None:
+    """Write the index next to a JSON docstore (no pickle), atomically
+
+    Each item of `extra` is written as <name>.json in the same directory.
+    """
+    import faiss
+
+    staging = f"{directory}.tmp-{uuid.uuid4().hex[:8]}"
+    os.makedirs(staging)
+    try:
+        faiss.write_index(vectorstore.index, os.path.join(staging, "index.faiss"))
+        entries = []
+        for position in range(len(vectorstore.index_to_docstore_id)):
+            doc_id = vectorstore.index_to_docstore_id[position]
+            doc = vectorstore.docstore.search(doc_id)
+            entries.append({"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata})
+        with open(os.path.join(staging, "docstore.json"), "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"model": model_name, "documents": len(entries), "built_at": int(time.time()),
+                       "format": INDEX_FORMAT_VERSION}, f)
+        for name, value in (extra or {}).items():
+            with open(os.path.join(staging, f"{name}.json"), "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        os.replace(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def _prune(root: str, keep: str) -> None:
+    """Remove hash-keyed indexes for older content or other models"""
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        # Only hash-named directories: not help_center, and not the staging
+        # directories of another process still writing
+        if name != keep and len(name) == KEY_LENGTH and os.path.isdir(path):
+            try:
+                int(name, 16)
+            except ValueError:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_or_build_index(documents: List, embeddings, model_name: str,
+                        root: str = RAG_INDEX_DIR) -> Tuple[object, Dict]:
+    """Vector store for `documents`, loaded from disk when an index for them exists
+
+    Returns the store and a dict describing where it came from and how long
+    that took.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    key = index_key(documents, model_name)
+    directory = os.path.join(root, key)
+    started = time.perf_counter()
+    if os.path.isfile(os.path.join(directory, "index.faiss")):
+        try:
+            vectorstore = load_index(directory, embeddings)
+            return vectorstore, {"source": "disk", "key": key, "documents": len(documents),
+                                 "seconds": round(time.perf_counter() - started, 3)}
+        except Exception as e:
+            print(f"Saved RAG index {directory} unreadable ({e}); rebuilding")
+
+    vectorstore = FAISS.from_documents(documents, embeddings)
+    built = time.perf_counter()
+    try:
+        os.makedirs(root, exist_ok=True)
+        save_index(vectorstore, directory, model_name)
+        _prune(root, key)
+    except OSError as e:
+        print(f"Could not save RAG index to {directory}: {e}")
+    return vectorstore, {"source": "built", "key": key, "documents": len(documents),
+                         "seconds": round(built - started, 3),
+                         "save_seconds": round(time.perf_counter() - built, 3)}
@@ -0,0 +1,109 @@
+# GBNF grammar for the agents' ReAct steps
+#
+# With handle_parsing_errors=True every malformed "Action / Action Input"
+# block from the 7B model costs a whole extra iteration. Constraining the
+# agent's completions with llama.cpp's grammar sampling makes each step one
+# of exactly two shapes:
+#
+#   Thought: ...            Thought: ...
+#   Action: <tool name>     Final Answer: ...
+#   Action Input: <arg>
+#
+# where the argument is one of the values the tool knows (when a list is
+# given), a single line of text, or "none" for tools that take no input.
+import os
+from typing import Dict, Iterable, List, Optional
+
+# Constrain agent steps when llama-cpp-python is available
+REACT_GRAMMAR_ENABLED = os.environ.get("AGENT_REACT_GRAMMAR", "1") == "1"
+
+try:
+    from llama_cpp import LlamaGrammar
+except ImportError:
+    LlamaGrammar = None
+
+
+def _literal(text: str) -> str:
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+def build_react_grammar(tools: Iterable, choices: Optional[Dict[str, Iterable[str]]] = None,
+                        no_input: Iterable[str] = ()) -> str:
+    """GBNF text for one ReAct step over `tools`
+
+    choices maps a tool name to the only arguments it may be given; tools
+    named in no_input get the literal Action Input "none", which ToolCache
+    drops because those tools take no parameters; every other tool gets one
+    line of free text.
+    """
+    choices = choices or {}
+    no_input = set(no_input)
+    actions: List[str] = []
+    rules: List[str] = []
+    for index, tool in enumerate(tools):
+        rule = f"action{index}"
+        if tool.name in choices:
+            values = sorted(set(choices[tool.name]), key=lambda value: (-len(value), value))
+            argument = " | ".join(_literal(value) for value in values)
+        elif tool.name in no_input:
+            argument = '"none"'
+        else:
+            argument = "line"
+        rules.append(f"{rule} ::= {_literal(tool.name)} \"\\nAction Input: \" ({argument})")
+        actions.append(rule)
+
+    return "\n".join([
+        'root ::= ("Thought: ")? line "\\n" (action | final)',
+        f'action ::= "Action: " ({" | ".join(actions)})',
+        *rules,
+        'final ::= "Final Answer: " line ("\\n" line)*',
+        'line ::= [^\\n]+',
+    ]) + "\n"
+
+
+def constrained_llm(llm, grammar_text: str):
+    """`llm` bound to sample under the grammar, or `llm` itself when that is unavailable
+
+    Only the bound runnable is constrained; the summarizer and other callers
+    of `llm` are not.
+    """
+    if not REACT_GRAMMAR_ENABLED or LlamaGrammar is None:
+        return llm
+    try:
+        return llm.bind(grammar=LlamaGrammar.from_string(grammar_text, verbose=False))
+    except Exception as e:
+        print(f"ReAct grammar rejected, running unconstrained: {e}")
+        return llm
+
+
+class IterationHistogram:
+    """Per-query ReAct iteration counts and parse failures, by mode
+
+    Modes are "constrained" and "unconstrained", so runs with
+    AGENT_REACT_GRAMMAR on and off can be compared.
+    """
+
+    def __init__(self):
+        self.iterations: Dict[str, Dict[int, int]] = {}
+        self.parse_errors: Dict[str, int] = {}
+        self.queries: Dict[str, int] = {}
+
+    def record(self, mode: str, iterations: int, parse_errors: int) -> None:
+        histogram = self.iterations.setdefault(mode, {})
+        histogram[iterations] = histogram.get(iterations, 0) + 1
+        self.parse_errors[mode] = self.parse_errors.get(mode, 0) + parse_errors
+        self.queries[mode] = self.queries.get(mode, 0) + 1
+
+    def stats(self) -> Dict:
+        result = {}
+        for mode, histogram in self.iterations.items():
+            queries = self.queries[mode]
+            result[mode] = {
+                "queries": queries,
+                "iterations": {str(count): histogram[count] for count in sorted(histogram)},
+                "avg_iterations": round(sum(count * n for count, n in histogram.items()) / queries, 2),
+                "parse_errors": self.parse_errors[mode]
+            }
+        return result
+
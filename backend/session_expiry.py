@@ -0,0 +1,76 @@
+# Incremental session expiry driven by a min-heap of deadlines
+import heapq
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class SessionExpiry:
+    """Tracks last activity per session and hands back sessions as they expire
+
+    Each session has one heap entry. touch() only records the new activity
+    time; when an entry reaches the top of the heap and the session was seen
+    since it was armed, it is re-armed with the real deadline instead of
+    expiring. A sweep therefore costs O((expired + re-armed) * log n),
+    independent of how many sessions are alive.
+    """
+
+    def __init__(self, timeout_seconds: float):
+        self.timeout = timeout_seconds
+        # session_id -> [last_seen]; the list identity ties heap entries to it
+        self._records: Dict[str, list] = {}
+        self._heap: List[Tuple[float, str, list]] = []
+        self._lock = threading.Lock()
+        self.expired_total = 0
+        self.rearmed_total = 0
+
+    def touch(self, session_id: str, now: Optional[float] = None) -> None:
+        """Mark the session active at `now` (time.monotonic())"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is None:
+                record = [now]
+                self._records[session_id] = record
+                heapq.heappush(self._heap, (now + self.timeout, session_id, record))
+            else:
+                record[0] = now
+
+    def discard(self, session_id: str) -> None:
+        """Stop tracking a session; its heap entry is dropped when it surfaces"""
+        with self._lock:
+            self._records.pop(session_id, None)
+
+    def pop_expired(self, limit: int, now: Optional[float] = None) -> List[str]:
+        """Remove and return up to `limit` sessions whose timeout has passed"""
+        now = time.monotonic() if now is None else now
+        expired = []
+        with self._lock:
+            heap = self._heap
+            while heap and len(expired) < limit and heap[0][0] <= now:
+                _, session_id, record = heapq.heappop(heap)
+                if self._records.get(session_id) is not record:
+                    continue  # discarded, or discarded and touched again since
+                due = record[0] + self.timeout
+                if due > now:
+                    heapq.heappush(heap, (due, session_id, record))
+                    self.rearmed_total += 1
+                    continue
+                del self._records[session_id]
+                expired.append(session_id)
+            self.expired_total += len(expired)
+        return expired
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            next_due = self._heap[0][0] - time.monotonic() if self._heap else None
+            return {
+                "tracked_sessions": len(self._records),
+                "heap_entries": len(self._heap),
+                "expired_total": self.expired_total,
+                "rearmed_total": self.rearmed_total,
+                "next_check_in_seconds": round(max(0.0, next_due), 1) if next_due is not None else None
+            }
@@ -0,0 +1,178 @@
+# Single-flight coalescing of identical concurrent LLM generations
+import asyncio
+import hashlib
+import re
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so trivially different phrasings share a key"""
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+def flight_key(system_prompt: str, history: str, query: str) -> str:
+    """Key identifying a generation by system prompt, history fingerprint and query"""
+    digest = hashlib.sha256()
+    for part in (system_prompt, history, normalize_query(query)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class Flight:
+    """One in-progress generation shared by a leader and any number of followers
+
+    Leaders and followers may be worker threads or event-loop tasks; threads
+    block on a condition variable, tasks await an asyncio.Event that is set
+    through their loop's call_soon_threadsafe. A failed generation is
+    finished with the leader's fallback reply, so followers never see errors.
+    `subscribers` counts the callers still waiting on the result, the leader
+    included; the generation is only abandoned once it drops to zero.
+    """
+
+    def __init__(self):
+        self.tokens: List[str] = []
+        self.result: Optional[str] = None
+        self.done = False
+        self.followers = 0
+        self.subscribers = 1
+        # The asyncio task decoding the generation, when it runs on an event loop
+        self.task: Optional[asyncio.Future] = None
+        self._cond = threading.Condition()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    def _notify(self) -> None:
+        # Called with self._cond held
+        self._cond.notify_all()
+        for loop, event in self._async_waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def publish(self, token: str) -> None:
+        with self._cond:
+            self.tokens.append(token)
+            self._notify()
+
+    def finish(self, result: str) -> None:
+        with self._cond:
+            self.result = result
+            self.done = True
+            self._notify()
+
+    def wait(self, timeout: Optional[float] = None) -> str:
+        """Block until the leader finishes and return its result"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.done, timeout):
+                raise TimeoutError("Timed out waiting for shared generation")
+            return self.result
+
+    def stream(self, timeout: Optional[float] = None) -> Iterator[str]:
+        """Yield the shared tokens from the start, then live as the leader produces them"""
+        position = 0
+        while True:
+            with self._cond:
+                if not self._cond.wait_for(lambda: len(self.tokens) > position or self.done, timeout):
+                    raise TimeoutError("Timed out waiting for shared generation")
+                pending = self.tokens[position:]
+                finished = self.done
+            for token in pending:
+                yield token
+            position += len(pending)
+            if finished and position >= len(self.tokens):
+                return
+
+    async def astream(self, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Async version of `stream` for followers running on an event loop"""
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        position = 0
+        with self._cond:
+            self._async_waiters.append(waiter)
+        try:
+            while True:
+                with self._cond:
+                    pending = self.tokens[position:]
+                    finished = self.done
+                    if not pending and not finished:
+                        # Cleared under the lock, so a later publish always sets it again
+                        event.clear()
+                for token in pending:
+                    yield token
+                position += len(pending)
+                if finished and position >= len(self.tokens):
+                    return
+                if not pending:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError("Timed out waiting for shared generation")
+                    try:
+                        await asyncio.wait_for(event.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        raise TimeoutError("Timed out waiting for shared generation") from None
+        finally:
+            with self._cond:
+                self._async_waiters.remove(waiter)
+
+    async def await_result(self, timeout: Optional[float] = None) -> str:
+        """Async version of `wait`"""
+        async for _ in self.astream(timeout):
+            pass
+        return self.result
+
+
+class SingleFlight:
+    """Registry of in-flight generations keyed by `flight_key`"""
+
+    def __init__(self):
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+        self.tokens_saved = 0
+
+    def join(self, key: str) -> Tuple[Flight, bool]:
+        """Return (flight, is_leader); the leader must call `complete` when done"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                flight.subscribers += 1
+                self.followers += 1
+                return flight, False
+            flight = Flight()
+            self._flights[key] = flight
+            self.leaders += 1
+            return flight, True
+
+    def leave(self, key: str, flight: Flight) -> int:
+        """Drop one subscriber and return how many remain
+
+        An unfinished flight nobody waits on is unregistered, so later
+        requests start a fresh generation instead of joining one that is
+        about to be abandoned.
+        """
+        with self._lock:
+            flight.subscribers -= 1
+            if flight.subscribers <= 0 and not flight.done and self._flights.get(key) is flight:
+                del self._flights[key]
+            return flight.subscribers
+
+    def complete(self, key: str, flight: Flight, completion_tokens: int = 0) -> None:
+        """Remove the flight so later requests start a fresh generation"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            self.tokens_saved += completion_tokens * flight.followers
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.leaders + self.followers
+            return {
+                "generations": self.leaders,
+                "coalesced_requests": self.followers,
+                "in_flight": len(self._flights),
+                "coalescing_ratio": round(self.followers / total, 4) if total else 0.0,
+                "decode_tokens_saved": self.tokens_saved
+            }
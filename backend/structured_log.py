@@ -0,0 +1,133 @@
+# Queue-based structured logging so log I/O stays off the request path
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from typing import Dict, Optional
+
+# Level for the "bigshorts" loggers; DEBUG enables the verbose dumps
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+# Fraction of DEBUG/INFO records kept (WARNING and above are never sampled)
+LOG_SAMPLE_RATE = float(os.environ.get("LOG_SAMPLE_RATE", "1.0"))
+
+# Records waiting for the writer thread; beyond this they are dropped
+LOG_QUEUE_SIZE = 10000
+
+# Per-request fields (session_id, trace_id, route...) attached to every record
+_log_context: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar("log_context", default={})
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+
+
+def bind_context(**fields) -> contextvars.Token:
+    """Attach fields to every record logged from the current context
+
+    Worker threads do not inherit the event loop's context, so call this at
+    the start of work submitted to an executor too.
+    """
+    return _log_context.set({**_log_context.get(), **fields})
+
+
+def reset_context(token: contextvars.Token) -> None:
+    _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the bound request context onto the record and applies sampling"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING and LOG_SAMPLE_RATE < 1.0 and random.random() >= LOG_SAMPLE_RATE:
+            return False
+        record.context = _log_context.get()
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and defers formatting to the writer thread"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve %-args here; JSON encoding happens on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "context", {}) or {})
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(level: str = LOG_LEVEL, stream=None) -> None:
+    """Route the "bigshorts" loggers through a queue to a background writer"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger("bigshorts")
+    root.setLevel(getattr(logging, level, logging.INFO))
+    root.addHandler(_queue_handler)
+    root.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"bigshorts.{name}")
+
+
+def log_stats() -> Dict:
+    return {
+        "level": logging.getLevelName(logging.getLogger("bigshorts").level),
+        "sample_rate": LOG_SAMPLE_RATE,
+        "pending": _queue_handler.queue.qsize() if _queue_handler else 0,
+        "dropped": _queue_handler.dropped if _queue_handler else 0,
+    }
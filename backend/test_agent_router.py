@@ -0,0 +1,55 @@
+# Regression cases for PreRouter: requests it must route, and look-alikes it must leave to the agent
+#
+#   python -m pytest -q test_agent_router.py
+import pytest
+
+from agent_router import PreRouter
+from bigshorts_langchain_agent import (
+    ALLOWED_CONTENT_TYPES, ALLOWED_ISSUE_TYPES, CONTENT_TYPE_MAPPING, CONTENT_GUIDES,
+    ISSUE_SOLUTIONS, PLATFORM_SECTIONS
+)
+
+
+@pytest.fixture(scope="module")
+def router():
+    return PreRouter({}, ALLOWED_CONTENT_TYPES, CONTENT_TYPE_MAPPING, CONTENT_GUIDES,
+                     ALLOWED_ISSUE_TYPES, ISSUE_SOLUTIONS, PLATFORM_SECTIONS)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("how do I create a snip", ("content_creation_guide", ("snip",))),
+    ("Hi, how do I create a snip?", ("content_creation_guide", ("snip",))),
+    ("what is a snip", ("platform_guide", ("snip",))),
+    ("I can't log in", ("handle_issue", ("login",))),
+    ("notifications are not showing", ("handle_issue", ("notification",))),
+    ("show me trending content", ("trending_content", ())),
+    ("what's popular right now", ("trending_content", ())),
+    ("how do I record a new video", ("content_creation_guide", ("snip",))),
+])
+def test_routes_unambiguous_requests(router, query, expected):
+    assert router.match(query) == expected
+
+
+@pytest.mark.parametrize("query", [
+    # Negation
+    "how do I not create a snip",
+    "I don't think my upload is broken",
+    # A second clause or question
+    "I don't want to create a snip, how do I delete my account",
+    "how do I make a snip? and what is a shot?",
+    "how do I create a snip but without music",
+    "what's trending but not on snips",
+    # Verbs no tool serves
+    "can't cancel my upload",
+    "how do I remove a shot",
+    # Trending words in a question about the user's own content
+    "how do I make my snip go viral",
+    "how to make a snip trending",
+    "is it popular to post snips",
+    # Doing something with a snip other than creating one
+    "how to add music to my snip",
+    "how do I share a snip to instagram",
+    "how do I upload a snip from my gallery",
+])
+def test_leaves_ambiguous_requests_to_the_agent(router, query):
+    assert router.match(query) is None
@@ -0,0 +1,92 @@
+# Single-flight generations: one caller leaving must not fail the others
+#
+#   python -m pytest -q test_singleflight.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from Chatbot2 import BigShortsChatbot, reset_query_state
+from llm_backends import FakeBackend
+
+ANSWER = "Open the app, tap the plus button and pick Snip to start recording."
+FALLBACK = "I encountered a technical issue. Can I help you with creating content on BigShorts instead?"
+
+
+def chatbot(async_mode: bool) -> BigShortsChatbot:
+    # About 0.3s per generation, long enough to leave mid-decode
+    return BigShortsChatbot(backend=FakeBackend(prefill_seconds=0.05, tokens_per_second=50,
+                                                response=ANSWER, async_mode=async_mode))
+
+
+def test_cancelled_async_leader_keeps_generating_for_followers():
+    bot = chatbot(async_mode=True)
+
+    async def ask():
+        reset_query_state()
+        return await bot.agenerate_llm_response("how do snips work", "shared")
+
+    async def scenario():
+        leader = asyncio.ensure_future(ask())
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(ask())
+        await asyncio.sleep(0.1)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == ANSWER
+    assert bot.backend.generations == 1
+
+
+def test_async_generation_is_cancelled_once_every_caller_leaves():
+    bot = chatbot(async_mode=True)
+
+    async def scenario():
+        reset_query_state()
+        leader = asyncio.ensure_future(bot.agenerate_llm_response("how do snips work", "alone"))
+        await asyncio.sleep(0.1)
+        flight = next(iter(bot.inflight._flights.values()))
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        await asyncio.sleep(0)
+        return flight
+
+    flight = asyncio.run(scenario())
+    assert flight.task.cancelled()
+    assert flight.result == FALLBACK
+    assert bot.inflight.stats()["in_flight"] == 0
+
+
+def test_sync_leader_whose_stream_fails_keeps_generating_for_followers():
+    bot = chatbot(async_mode=False)
+    follower_joined = threading.Event()
+    results = {}
+
+    def broken_stream(token):
+        follower_joined.wait(5)
+        raise ConnectionError("client went away")
+
+    def ask(name, on_token):
+        reset_query_state()
+        results[name] = bot.generate_llm_response("how do snips work", "shared", on_token)
+
+    leader = threading.Thread(target=ask, args=("leader", broken_stream))
+    leader.start()
+    while not bot.inflight.stats()["in_flight"]:
+        time.sleep(0.005)
+    streamed = []
+    follower = threading.Thread(target=ask, args=("follower", streamed.append))
+    follower.start()
+    while not bot.inflight.stats()["coalesced_requests"]:
+        time.sleep(0.005)
+    follower_joined.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert results["follower"] == ANSWER
+    assert "".join(streamed).strip() == ANSWER
+    assert bot.backend.generations == 1
@@ -0,0 +1,152 @@
+# Memoized LangChain tools for the agents
+#
+# The guide and issue tools are pure lookups and trending changes slowly, yet
+# the agent re-runs them on every ReAct step. ToolCache keeps each result
+# together with its observation text, rendered once as compact JSON with
+# sorted keys. The agent therefore sees byte-identical text for the same call,
+# which keeps llama.cpp's prompt prefix cache valid across queries.
+#
+# add_coroutines() gives the tools async runners for AgentExecutor.ainvoke.
+import asyncio
+import inspect
+import json
+import os
+import threading
+import time
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+TRENDING_TTL_SECONDS = float(os.environ.get("TOOL_TRENDING_TTL", "60"))
+# Arguments come from the model, so bound the number of distinct calls kept
+MAX_ENTRIES = 1024
+
+# Tool results the model cannot use; dropped from observations to save tokens
+OBSERVATION_DROP_KEYS = frozenset({"image_path"})
+
+
+def _strip(value):
+    if isinstance(value, dict):
+        return {key: _strip(item) for key, item in value.items() if key not in OBSERVATION_DROP_KEYS}
+    if isinstance(value, list):
+        return [_strip(item) for item in value]
+    return value
+
+
+def compact_observation(value: Any) -> str:
+    """Deterministic observation text for a tool result"""
+    if isinstance(value, str):
+        return value.strip()
+    return json.dumps(_strip(value), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+class ToolCache:
+    """Per-tool TTL cache of tool results and their observation text
+
+    A ttl of None keeps results until invalidate(); use it for tools that
+    read the static catalog. A ttl of 0 caches nothing but still renders the
+    observation. Tools not given a TTL are left alone.
+    """
+
+    def __init__(self):
+        # (tool name, args) -> (expires at or None, result, observation)
+        self._entries: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def _get(self, name: str, func: Callable, signature: inspect.Signature, ttl: Optional[float],
+             args: tuple, kwargs: dict) -> tuple:
+        # Single-input Tools always pass the action input; drop what the
+        # function does not take (the trending tool takes nothing)
+        parameters = list(signature.parameters)
+        bound = signature.bind(*args[:len(parameters)], **{k: v for k, v in kwargs.items() if k in parameters})
+        # The catalog tools all lowercase their argument
+        call = tuple(value.strip().lower() if isinstance(value, str) else value
+                     for value in bound.arguments.values())
+        key = (name, call)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > now):
+                self.hits[name] = self.hits.get(name, 0) + 1
+                return entry
+            self.misses[name] = self.misses.get(name, 0) + 1
+        result = func(*call)
+        entry = (None if ttl is None else now + ttl, result, compact_observation(result))
+        if ttl is None or ttl > 0:
+            with self._lock:
+                self._entries.pop(key, None)
+                self._entries[key] = entry
+                if len(self._entries) > MAX_ENTRIES:
+                    # Oldest first: dicts keep insertion order
+                    del self._entries[next(iter(self._entries))]
+        return entry
+
+    def memoize(self, name: str, func: Callable, ttl: Optional[float] = None) -> Callable:
+        """Wrapper returning the cached observation text
+
+        Its `structured` attribute returns the cached result itself, for
+        callers that want the dict rather than the text.
+        """
+        signature = inspect.signature(func)
+
+        def observation(*args, **kwargs) -> str:
+            return self._get(name, func, signature, ttl, args, kwargs)[2]
+
+        def structured(*args, **kwargs):
+            return self._get(name, func, signature, ttl, args, kwargs)[1]
+
+        observation.__name__ = getattr(func, "__name__", name)
+        observation.__doc__ = func.__doc__
+        observation.structured = structured
+        return observation
+
+    def wrap_tools(self, tools: Iterable, ttls: Dict[str, Optional[float]]) -> None:
+        """Memoize, in place, the tools named in `ttls`"""
+        for tool in tools:
+            if tool.name in ttls:
+                tool.func = self.memoize(tool.name, tool.func, ttls[tool.name])
+
+    def invalidate(self, names: Optional[Iterable[str]] = None) -> int:
+        """Drop cached results (of the named tools only, if given); returns how many"""
+        with self._lock:
+            if names is None:
+                dropped = len(self._entries)
+                self._entries.clear()
+                return dropped
+            names = set(names)
+            stale = [key for key in self._entries if key[0] in names]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def stats(self) -> Dict:
+        tools = sorted(set(self.hits) | set(self.misses))
+        return {
+            "entries": len(self._entries),
+            "tools": {
+                name: {"hits": self.hits.get(name, 0), "misses": self.misses.get(name, 0)}
+                for name in tools
+            }
+        }
+
+
+def add_coroutines(tools: Iterable, offload: Iterable[str] = (), executor: Optional[Executor] = None) -> None:
+    """Give each tool, in place, a coroutine for the async agent path
+
+    Without one LangChain runs the tool on the default thread pool. Cached
+    lookups return in microseconds, so they run inline on the event loop.
+    Tools named in `offload` block (knowledge_search waits on embedding and
+    vector search) and run on `executor` instead.
+    """
+    offload = set(offload)
+    for tool in tools:
+        func = tool.func
+        if tool.name in offload:
+            async def coroutine(*args, _func=func, **kwargs):
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(executor, lambda: _func(*args, **kwargs))
+        else:
+            async def coroutine(*args, _func=func, **kwargs):
+                return _func(*args, **kwargs)
+        tool.coroutine = coroutine
@@ -0,0 +1,155 @@
+# Lightweight per-request stage tracing with asynchronous JSONL export
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from structured_log import get_logger
+
+logger = get_logger("tracing")
+
+
+class Trace:
+    """Timed spans for one request
+
+    Timestamps come from time.perf_counter(), which is shared by all threads,
+    so spans recorded in worker threads line up with the event-loop spans.
+    """
+
+    __slots__ = ("trace_id", "route", "sampled", "started_at", "wall_time", "spans", "attributes")
+
+    def __init__(self, route: str, sampled: bool):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.route = route
+        self.sampled = sampled
+        self.started_at = time.perf_counter()
+        self.wall_time = time.time()
+        self.spans: List[tuple] = []
+        self.attributes: Dict[str, object] = {}
+
+    def add_span(self, name: str, start: float, end: float) -> None:
+        """Record a span from two perf_counter() readings"""
+        self.spans.append((name, start, end))
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((name, start, time.perf_counter()))
+
+    def close_tail(self, name: str) -> None:
+        """Record a span from the end of the latest span until now"""
+        start = max((end for _, _, end in self.spans), default=self.started_at)
+        self.spans.append((name, start, time.perf_counter()))
+
+    def set(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def server_timing(self) -> str:
+        """Summarize the spans as a Server-Timing header value"""
+        durations: Dict[str, float] = {}
+        for name, start, end in self.spans:
+            durations[name] = durations.get(name, 0.0) + (end - start)
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in durations.items()]
+        parts.append(f"total;dur={(time.perf_counter() - self.started_at) * 1000:.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> Dict:
+        return {
+            "trace_id": self.trace_id,
+            "route": self.route,
+            "timestamp": self.wall_time,
+            "total_ms": round((time.perf_counter() - self.started_at) * 1000, 3),
+            "spans": [
+                {
+                    "name": name,
+                    "start_ms": round((start - self.started_at) * 1000, 3),
+                    "duration_ms": round((end - start) * 1000, 3)
+                }
+                for name, start, end in self.spans
+            ],
+            **self.attributes
+        }
+
+
+class Tracer:
+    """Creates traces and exports sampled ones to a rotating JSONL file
+
+    Export happens on a background thread; finish() only enqueues, and drops
+    the trace (counting it) if the export queue is full.
+    """
+
+    def __init__(self, sample_rate: float = 0.01, path: str = "logs/traces.jsonl",
+                 max_bytes: int = 50 * 1024 * 1024, backup_count: int = 5, max_pending: int = 10000):
+        self.sample_rate = sample_rate
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.exported = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, route: str) -> Trace:
+        return Trace(route, self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def finish(self, trace: Trace) -> None:
+        if not trace.sampled:
+            return
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(trace.to_dict())
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_writer(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_loop, name="trace_exporter", daemon=True)
+            self._thread.start()
+
+    def _write_loop(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # RotatingFileHandler gives us size-based rotation for free
+        handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        try:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    break
+                try:
+                    handler.handle(logging.makeLogRecord({"msg": json.dumps(record, default=str)}))
+                    self.exported += 1
+                except Exception as e:
+                    logger.warning("Trace export failed: %s", e)
+        finally:
+            handler.close()
+
+    def close(self) -> None:
+        """Flush pending traces and stop the writer thread"""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def stats(self) -> Dict:
+        return {
+            "sample_rate": self.sample_rate,
+            "path": self.path,
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "pending": self._queue.qsize()
+        }